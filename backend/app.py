@@ -1,11 +1,36 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt, get_jwt_identity
+from flask_migrate import Migrate, upgrade
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import flag_modified
 from dotenv import load_dotenv
 import os
-from datetime import datetime, timedelta
+import sys
+import io
+import csv
+import json
+import base64
+from datetime import datetime, timedelta, timezone
 
-from models import db, User, Car, Booking, Review, Favorite, PaymentMethod, CarFeature
+from models import db, User, Car, Booking, Review, Favorite, PaymentMethod, CarFeature, EarningsRollup
+from cache import ResponseCache, cached_response
+from search import search_cars, rebuild_index as rebuild_search_index
+from fleet_import import iter_rows, import_cars
+from concurrency import run_with_retry, is_locked, ConcurrencyConflict
+from db_profile import DatabaseProfile
+from replica import ReplicaRouter, sync_replica, REPLICA_BIND
+from pricing import PricingEngine, MAX_QUOTE_DAYS
+from availability import month_window, day_bitmaps, encode_bitmap, InvalidWindow, MAX_CARS as MAX_AVAILABILITY_CARS
+from query_plans import check_query_plans
+from serialization import Shape, InvalidShape
+from json_provider import json_provider_class
+from identity import UserCache
+from passwords import hasher as password_hasher, HashingBusy
+from ratelimit import RateLimiter, rate_limited
+from metrics import RequestMetrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from querylog import QueryLog
 
 # Load environment variables
 load_dotenv()
@@ -18,13 +43,102 @@ app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'vantage-jwt-secret')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///vantage_car_hire.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)
+app.config['FRONTEND_URL'] = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+# JSON encoder for responses: orjson, stdlib, or auto (orjson when installed)
+app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', 'auto')
+app.config['CATALOGUE_CACHE_SIZE'] = int(os.getenv('CATALOGUE_CACHE_SIZE', 512))
+app.config['CATALOGUE_CACHE_TTL'] = int(os.getenv('CATALOGUE_CACHE_TTL', 30))
+# File whose mtime is the catalogue version, so a write in any worker
+# invalidates every worker's cached catalogue (empty: per-process versions)
+app.config['CATALOGUE_CACHE_VERSION_FILE'] = os.getenv(
+    'CATALOGUE_CACHE_VERSION_FILE', os.path.join(app.instance_path, 'catalogue_cache.version')
+) or None
+app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 1024))
+app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 60))
+# Password hashing policy (pbkdf2, scrypt or bcrypt; cost defaults per algorithm)
+# and the per-process hashing pool: workers plus queued hashes before 503s
+app.config['PASSWORD_HASH_ALGORITHM'] = os.getenv('PASSWORD_HASH_ALGORITHM', 'scrypt')
+app.config['PASSWORD_HASH_COST'] = int(os.getenv('PASSWORD_HASH_COST')) if os.getenv('PASSWORD_HASH_COST') else None
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS')) if os.getenv('PASSWORD_HASH_WORKERS') else None
+app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+# Pre-hash with SHA-256 so bcrypt doesn't reject passwords over 72 bytes
+app.config['BCRYPT_HANDLE_LONG_PASSWORDS'] = True
+# Token-bucket limits ('N/second|minute|hour', empty to disable one); buckets
+# are per worker unless RATE_LIMIT_STORAGE names a SQLite file to share
+app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+app.config['RATE_LIMIT_STORAGE'] = os.getenv('RATE_LIMIT_STORAGE')
+app.config['RATE_LIMIT_LOGIN'] = os.getenv('RATE_LIMIT_LOGIN', '10/minute')
+app.config['RATE_LIMIT_SIGNUP'] = os.getenv('RATE_LIMIT_SIGNUP', '5/minute')
+app.config['RATE_LIMIT_BOOKINGS'] = os.getenv('RATE_LIMIT_BOOKINGS', '30/minute')
+# Reverse proxies in front of the app whose X-Forwarded-* headers are trusted
+# (0 ignores the headers), so remote_addr and the per-IP limits see the client
+app.config['PROXY_FIX_X_FOR'] = int(os.getenv('PROXY_FIX_X_FOR', 0))
+app.config['PROXY_FIX_X_PROTO'] = int(os.getenv('PROXY_FIX_X_PROTO', 0))
+app.config['PROXY_FIX_X_HOST'] = int(os.getenv('PROXY_FIX_X_HOST', 0))
+# Shared snapshot directory so /api/metrics covers every gunicorn worker
+app.config['METRICS_DIR'] = os.getenv('METRICS_DIR')
+# Opt-in slow query / N+1 logging and per-request query budget
+app.config['QUERY_LOG'] = os.getenv('QUERY_LOG', 'false').lower() == 'true'
+app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 100))
+app.config['N_PLUS_ONE_THRESHOLD'] = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+app.config['QUERY_BUDGET'] = int(os.getenv('QUERY_BUDGET')) if os.getenv('QUERY_BUDGET') else None
+app.config['QUERY_BUDGET_RAISE'] = os.getenv('QUERY_BUDGET_RAISE', 'false').lower() == 'true'
+# SQLite pragmas applied to every new connection (unset keeps the WAL profile
+# in db_profile.py) and connection pool sizing
+app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE')
+app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS')
+app.config['SQLITE_CACHE_SIZE'] = int(os.getenv('SQLITE_CACHE_SIZE')) if os.getenv('SQLITE_CACHE_SIZE') else None
+app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE')) if os.getenv('SQLITE_MMAP_SIZE') else None
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.getenv('SQLITE_BUSY_TIMEOUT')) if os.getenv('SQLITE_BUSY_TIMEOUT') else None
+app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE')) if os.getenv('DB_POOL_SIZE') else None
+app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 10))
+app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE')) if os.getenv('DB_POOL_RECYCLE') else None
+app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT')) if os.getenv('DB_POOL_TIMEOUT') else None
+# Optional read replica for GET requests; a client that just wrote reads from
+# the primary for REPLICA_READ_YOUR_WRITES_SECONDS
+app.config['REPLICA_DATABASE_URL'] = os.getenv('REPLICA_DATABASE_URL')
+app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = float(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
+# Rental pricing: weekend multiplier, seasons ('MM-DD:MM-DD:multiplier,...')
+# and long-rental discounts ('min_days:fraction,...'); numpy, python or auto
+app.config['PRICING_WEEKEND_MULTIPLIER'] = float(os.getenv('PRICING_WEEKEND_MULTIPLIER', 1.0))
+app.config['PRICING_SEASONS'] = os.getenv('PRICING_SEASONS', '')
+app.config['PRICING_LONG_RENTAL_DISCOUNTS'] = os.getenv('PRICING_LONG_RENTAL_DISCOUNTS', '')
+app.config['PRICING_BACKEND'] = os.getenv('PRICING_BACKEND', 'auto')
+
+app.json = json_provider_class(app.config['JSON_PROVIDER'])(app)
 
 # Initialize extensions
+db_profile = DatabaseProfile(app)
+replica_router = ReplicaRouter(app)
 db.init_app(app)
+with app.app_context():
+    for engine in db.engines.values():
+        db_profile.attach(engine)
+    replica_router.attach(db)
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
 jwt = JWTManager(app)
+metrics = RequestMetrics()
+metrics.init_app(app, db)
+query_log = QueryLog(app)
+password_hasher.init_app(app)
+rate_limiter = RateLimiter(app)
+if app.config['PROXY_FIX_X_FOR'] or app.config['PROXY_FIX_X_PROTO'] or app.config['PROXY_FIX_X_HOST']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'],
+                            x_proto=app.config['PROXY_FIX_X_PROTO'], x_host=app.config['PROXY_FIX_X_HOST'])
+pricing = PricingEngine(app)
+catalogue_cache = ResponseCache(
+    max_entries=app.config['CATALOGUE_CACHE_SIZE'],
+    ttl=app.config['CATALOGUE_CACHE_TTL'],
+    version_file=app.config['CATALOGUE_CACHE_VERSION_FILE']
+)
+user_cache = UserCache(
+    max_entries=app.config['USER_CACHE_SIZE'],
+    ttl=app.config['USER_CACHE_TTL']
+)
+user_cache.watch()
 CORS(app, resources={
     r"/api/*": {
-        "origins": os.getenv('FRONTEND_URL', 'http://localhost:5173'),
+        "origins": app.config['FRONTEND_URL'],
         "allow_headers": ["Content-Type", "Authorization"],
         "expose_headers": ["Content-Type", "Authorization"],
         "supports_credentials": True
@@ -44,9 +158,143 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({'error': 'Authorization token is missing', 'message': str(error)}), 401
 
+# ===================== HELPERS =====================
+
+def parse_datetime(value):
+    # Accept ISO 8601 strings (including a trailing 'Z') and normalize to naive
+    # UTC, which is how booking dates are stored and compared
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item):
+    payload = json.dumps([item.created_at.isoformat(), item.id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def page_criteria(model, args):
+    # Page size and keyset condition from ?limit= and ?cursor=; shared with
+    # the async routes in asgi.py, which build their own SELECT
+    limit = args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    criteria = []
+    cursor = args.get('cursor')
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        criteria.append(db.or_(
+            model.created_at < created_at,
+            db.and_(model.created_at == created_at, model.id < item_id)
+        ))
+    return criteria, limit
+
+
+def finish_page(items, limit):
+    # Rows were fetched with limit + 1; the extra one says there is a next page
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+def paginate(query, model):
+    # Keyset pagination on (created_at, id), newest first. The cursor carries
+    # the last row's key so every page is an index seek, unlike OFFSET.
+    criteria, limit = page_criteria(model, request.args)
+    items = query.filter(*criteria).order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    return finish_page(items, limit)
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def car_list_criteria(args):
+    # WHERE clauses for the /api/cars filters (also used by asgi.py)
+    category = args.get('category')
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+    location = args.get('location')
+    pickup_date = args.get('pickup_date')
+    return_date = args.get('return_date')
+    
+    if pickup_date or return_date:
+        # Availability search: cars with no booking overlapping the range
+        if not (pickup_date and return_date):
+            raise InvalidFilter('pickup_date and return_date are both required')
+        
+        try:
+            pickup = parse_datetime(pickup_date)
+            return_at = parse_datetime(return_date)
+        except ValueError as e:
+            raise InvalidFilter(f'Invalid date: {e}')
+        if return_at <= pickup:
+            raise InvalidFilter('return_date must be after pickup_date')
+        
+        busy_until = Booking.busy_until(return_at)
+        criteria = [Car.status != 'Maintenance', db.func.coalesce(busy_until, pickup) <= pickup]
+    else:
+        criteria = [Car.status == 'Available']
+    
+    if category and category != 'All':
+        criteria.append(Car.category == category)
+    if min_price:
+        criteria.append(Car.daily_rate >= min_price)
+    if max_price:
+        criteria.append(Car.daily_rate <= max_price)
+    if location:
+        criteria.append(Car.location.ilike(f'%{location}%'))
+    return criteria
+
+
+def issue_access_token(user):
+    # The role rides along as a claim so authorization needs no user lookup
+    return create_access_token(identity=user.id, additional_claims={'user_type': user.user_type})
+
+
+def current_user_type():
+    # Role of the authenticated user: the token's claim, or for tokens issued
+    # before role claims, the user cache (one query on a miss)
+    claims = get_jwt()
+    if 'user_type' in claims:
+        return claims['user_type']
+    return user_cache.user_type(get_jwt_identity())
+
+
+def hashing_busy(error):
+    # Password hashing pool is saturated; shed the request rather than queue it
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+
+def request_shape(model):
+    # Sparse fieldsets and nesting from ?fields=id,status,car.name&expand=car;
+    # without either the serializers return their full default shape
+    return Shape.parse(model, request.args.get('fields'), request.args.get('expand'))
+
+
 # ===================== AUTH ROUTES =====================
 
 @app.route('/api/auth/signup', methods=['POST'])
+@rate_limited(rate_limiter, app.config['RATE_LIMIT_SIGNUP'])
 def signup():
     try:
         data = request.get_json()
@@ -71,11 +319,14 @@ def signup():
         )
         user.set_password(data['password'])
         
-        db.session.add(user)
-        db.session.commit()
+        def save_user():
+            db.session.add(user)
+            db.session.commit()
+        
+        run_with_retry(save_user, retry_if=is_locked)
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = issue_access_token(user)
         
         return jsonify({
             'message': 'User created successfully',
@@ -83,12 +334,18 @@ def signup():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusy as e:
+        db.session.rollback()
+        return hashing_busy(e)
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/auth/login', methods=['POST'])
+@rate_limited(rate_limiter, app.config['RATE_LIMIT_LOGIN'])
 def login():
     try:
         data = request.get_json()
@@ -101,7 +358,16 @@ def login():
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
-        access_token = create_access_token(identity=user.id)
+        # Upgrade hashes made under an older algorithm or cost while the
+        # plaintext is at hand; if the pool is busy, try on a later login
+        if user.password_needs_rehash():
+            try:
+                user.set_password(data['password'])
+                db.session.commit()
+            except HashingBusy:
+                db.session.rollback()
+        
+        access_token = issue_access_token(user)
         
         return jsonify({
             'message': 'Login successful',
@@ -109,6 +375,8 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except HashingBusy as e:
+        return hashing_busy(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -118,55 +386,118 @@ def login():
 def get_current_user():
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        shape = request_shape(User)
+        user = User.query.options(*shape.loader_options()).get(current_user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        return jsonify(user.to_dict()), 200
+        return jsonify(user.to_dict(shape)), 200
         
+    except InvalidShape as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 # ===================== CAR ROUTES =====================
 
+# Columns an owner can't set through PUT /api/cars/<id>: keys, the optimistic
+# lock version, and the review and booking aggregates the server maintains
+CAR_READ_ONLY_FIELDS = (
+    'id', 'owner_id', 'created_at', 'version',
+    'rating', 'rating_sum', 'rating_count', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+    'total_bookings', 'total_earnings',
+)
+
+
 @app.route('/api/cars', methods=['GET'])
+@cached_response(catalogue_cache)
 def get_cars():
     try:
-        # Get query parameters for filtering
-        category = request.args.get('category')
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        location = request.args.get('location')
-        
-        query = Car.query.filter_by(status='Available')
-        
-        if category and category != 'All':
-            query = query.filter_by(category=category)
-        if min_price:
-            query = query.filter(Car.daily_rate >= min_price)
-        if max_price:
-            query = query.filter(Car.daily_rate <= max_price)
-        if location:
-            query = query.filter(Car.location.ilike(f'%{location}%'))
-        
-        cars = query.all()
-        return jsonify([car.to_dict() for car in cars]), 200
+        query = Car.query.filter(*car_list_criteria(request.args))
+        shape = request_shape(Car)
+        cars, next_cursor = paginate(query.options(*shape.loader_options()), Car)
+        return jsonify({'items': Car.to_dict_many(cars, shape), 'next_cursor': next_cursor}), 200
+        
+    except (InvalidCursor, InvalidShape, InvalidFilter) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/cars/search', methods=['GET'])
+@cached_response(catalogue_cache)
+def car_search():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'q is required'}), 400
+        
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        # Results are ranked best match first
+        shape = request_shape(Car)
+        cars = search_cars(q, limit)
+        return jsonify({'items': Car.to_dict_many(cars, shape)}), 200
+        
+    except InvalidShape as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/cars/availability', methods=['GET'])
+@cached_response(catalogue_cache)
+def get_car_availability():
+    # Booked days per car for ?month=YYYY-MM and up to two following months
+    # (?months=), as base64 bitmaps; ?car_ids=1,2,3 or the whole fleet
+    try:
+        start, days = month_window(request.args.get('month'), request.args.get('months', 1, type=int))
+        # Bookings are stored as naive UTC datetimes
+        start_at = datetime.combine(start, datetime.min.time())
+        end_at = start_at + timedelta(days=days)
+        
+        car_ids = request.args.get('car_ids')
+        if car_ids:
+            try:
+                car_ids = sorted({int(car_id) for car_id in car_ids.split(',')})
+            except ValueError:
+                raise InvalidWindow('car_ids must be a comma-separated list of ids')
+            if len(car_ids) > MAX_AVAILABILITY_CARS:
+                raise InvalidWindow(f'car_ids may list at most {MAX_AVAILABILITY_CARS} cars')
+            bookings = Booking.overlapping(start_at, end_at, car_ids)
+        else:
+            car_ids = [car_id for car_id, in db.session.query(Car.id).order_by(Car.id)]
+            bookings = Booking.overlapping(start_at, end_at)
+        
+        bitmaps = day_bitmaps(car_ids, bookings, start, days)
+        return jsonify({
+            'start': start.isoformat(),
+            'days': days,
+            'cars': {str(car_id): encode_bitmap(bits, days) for car_id, bits in bitmaps.items()}
+        }), 200
         
+    except InvalidWindow as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/cars/<int:car_id>', methods=['GET'])
+@cached_response(catalogue_cache)
 def get_car(car_id):
     try:
-        car = Car.query.get(car_id)
+        shape = request_shape(Car)
+        car = Car.query.options(*shape.loader_options()).get(car_id)
         if not car:
             return jsonify({'error': 'Car not found'}), 404
         
-        return jsonify(car.to_dict()), 200
+        return jsonify(car.to_dict(shape)), 200
         
+    except InvalidShape as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -176,44 +507,46 @@ def get_car(car_id):
 def create_car():
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if user.user_type != 'owner':
+        if current_user_type() != 'owner':
             return jsonify({'error': 'Only owners can add cars'}), 403
         
         data = request.get_json()
         
-        car = Car(
-            owner_id=current_user_id,
-            name=data['name'],
-            brand=data['brand'],
-            model_year=data['model_year'],
-            category=data['category'],
-            daily_rate=data['daily_rate'],
-            location=data['location'],
-            transmission=data.get('transmission'),
-            seats=data.get('seats'),
-            fuel_type=data.get('fuel_type'),
-            luggage=data.get('luggage'),
-            description=data.get('description'),
-            image_url=data.get('image_url')
-        )
-        
-        db.session.add(car)
-        db.session.commit()
-        
-        # Add features if provided
-        if 'features' in data:
-            for feature_text in data['features']:
-                feature = CarFeature(car_id=car.id, feature=feature_text)
-                db.session.add(feature)
+        def save_car():
+            car = Car(
+                owner_id=current_user_id,
+                name=data['name'],
+                brand=data['brand'],
+                model_year=data['model_year'],
+                category=data['category'],
+                daily_rate=data['daily_rate'],
+                location=data['location'],
+                transmission=data.get('transmission'),
+                seats=data.get('seats'),
+                fuel_type=data.get('fuel_type'),
+                luggage=data.get('luggage'),
+                description=data.get('description'),
+                image_url=data.get('image_url')
+            )
+            db.session.add(car)
+            db.session.flush()
+            
+            # Add features if provided, in the same transaction as the car
+            for feature_text in data.get('features', []):
+                db.session.add(CarFeature(car_id=car.id, feature=feature_text))
             db.session.commit()
+            return car
+        
+        car = run_with_retry(save_car, retry_if=is_locked)
+        catalogue_cache.bump()
         
         return jsonify({
             'message': 'Car added successfully',
             'car': car.to_dict()
         }), 201
         
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -224,92 +557,232 @@ def create_car():
 def get_owner_cars():
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if user.user_type != 'owner':
+        if current_user_type() != 'owner':
             return jsonify({'error': 'Access denied'}), 403
         
-        cars = Car.query.filter_by(owner_id=current_user_id).all()
-        return jsonify([car.to_dict() for car in cars]), 200
+        shape = request_shape(Car)
+        query = Car.query.filter_by(owner_id=current_user_id).options(*shape.loader_options())
+        cars, next_cursor = paginate(query, Car)
+        return jsonify({'items': Car.to_dict_many(cars, shape), 'next_cursor': next_cursor}), 200
         
+    except (InvalidCursor, InvalidShape) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/cars/<int:car_id>', methods=['PUT'])
+@app.route('/api/owner/cars/import', methods=['POST'])
 @jwt_required()
-def update_car(car_id):
+def import_owner_cars():
     try:
         current_user_id = get_jwt_identity()
-        car = Car.query.get(car_id)
-        
-        if not car:
-            return jsonify({'error': 'Car not found'}), 404
+        if current_user_type() != 'owner':
+            return jsonify({'error': 'Only owners can add cars'}), 403
         
-        if car.owner_id != current_user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        # Accept a raw CSV/NDJSON body or a multipart upload in the 'file' field
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        name = upload.filename if upload else ''
+        mimetype = upload.mimetype if upload else request.mimetype
         
-        data = request.get_json()
+        fmt = request.args.get('format')
+        if not fmt:
+            if mimetype == 'text/csv' or name.endswith('.csv'):
+                fmt = 'csv'
+            elif mimetype in ('application/x-ndjson', 'application/jsonl') or name.endswith(('.ndjson', '.jsonl')):
+                fmt = 'ndjson'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Upload must be CSV or NDJSON'}), 400
         
-        # Update fields
-        for key, value in data.items():
-            if hasattr(car, key) and key not in ['id', 'owner_id', 'created_at']:
-                setattr(car, key, value)
+        report = import_cars(current_user_id, iter_rows(stream, fmt))
+        if report['imported']:
+            catalogue_cache.bump()
         
-        db.session.commit()
+        return jsonify(report), 200
         
-        return jsonify({
-            'message': 'Car updated successfully',
-            'car': car.to_dict()
-        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/cars/<int:car_id>', methods=['PUT'])
+@jwt_required()
+def update_car(car_id):
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
         
+        def apply_update():
+            car = Car.query.get(car_id)
+            
+            if not car:
+                return jsonify({'error': 'Car not found'}), 404
+            
+            if car.owner_id != current_user_id:
+                return jsonify({'error': 'Unauthorized'}), 403
+            
+            # Update fields
+            for key, value in data.items():
+                if hasattr(car, key) and key not in CAR_READ_ONLY_FIELDS:
+                    setattr(car, key, value)
+            
+            db.session.commit()
+            catalogue_cache.bump()
+            
+            return jsonify({
+                'message': 'Car updated successfully',
+                'car': car.to_dict()
+            }), 200
+        
+        # Car rows are versioned: a racing update or booking makes the commit
+        # raise StaleDataError, and the retry reloads the car and re-applies
+        return run_with_retry(apply_update)
+        
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+# ===================== QUOTE ROUTES =====================
+
+MAX_QUOTE_RANGES = 12
+MAX_QUOTE_CARS = 5000
+
+
+def parse_quote_ranges(data):
+    # Either one pickup_date/return_date pair or a list of them under 'ranges'
+    ranges = data.get('ranges') or [{'pickup_date': data.get('pickup_date'), 'return_date': data.get('return_date')}]
+    if not isinstance(ranges, list) or len(ranges) > MAX_QUOTE_RANGES:
+        raise InvalidFilter(f'ranges must be a list of at most {MAX_QUOTE_RANGES} date ranges')
+    parsed = []
+    for item in ranges:
+        if not isinstance(item, dict) or not (item.get('pickup_date') and item.get('return_date')):
+            raise InvalidFilter('pickup_date and return_date are both required')
+        try:
+            pickup = parse_datetime(item['pickup_date'])
+            return_date = parse_datetime(item['return_date'])
+        except ValueError as e:
+            raise InvalidFilter(f'Invalid date: {e}')
+        if return_date <= pickup:
+            raise InvalidFilter('return_date must be after pickup_date')
+        if (return_date - pickup).days > MAX_QUOTE_DAYS:
+            raise InvalidFilter(f'A quote covers at most {MAX_QUOTE_DAYS} days')
+        parsed.append((pickup, return_date))
+    return parsed
+
+
+@app.route('/api/quotes', methods=['POST'])
+def create_quotes():
+    # Price many cars over one or more date ranges in a single pass. Cars are
+    # the given car_ids, or every car matching the /api/cars query filters.
+    try:
+        data = request.get_json()
+        ranges = parse_quote_ranges(data)
+        
+        query = db.session.query(Car.id, Car.daily_rate)
+        car_ids = data.get('car_ids')
+        if car_ids is not None:
+            if not isinstance(car_ids, list) or len(car_ids) > MAX_QUOTE_CARS:
+                raise InvalidFilter(f'car_ids must be a list of at most {MAX_QUOTE_CARS} ids')
+            if not all(isinstance(car_id, int) and not isinstance(car_id, bool) for car_id in car_ids):
+                raise InvalidFilter('car_ids must be integer ids')
+            query = query.filter(Car.id.in_(car_ids))
+        else:
+            query = query.filter(*car_list_criteria(request.args))
+        cars = query.order_by(Car.id).all()
+        
+        rates = [daily_rate for _, daily_rate in cars]
+        quotes = []
+        for (pickup, return_date), (days, discount, totals) in zip(ranges, pricing.quote(rates, ranges)):
+            quotes.append({
+                'pickup_date': pickup,
+                'return_date': return_date,
+                'days': days,
+                'discount': discount,
+                'items': [{'car_id': car_id, 'daily_rate': daily_rate, 'total_amount': total}
+                          for (car_id, daily_rate), total in zip(cars, totals)]
+            })
+        return jsonify({'quotes': quotes}), 200
+        
+    except InvalidFilter as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ===================== BOOKING ROUTES =====================
 
+def book_car(current_user_id, data, pickup, return_date):
+    # One booking attempt as a single transaction. The car row is locked with
+    # SELECT ... FOR UPDATE where the database supports it; elsewhere (SQLite)
+    # the version column makes a racing writer's commit fail with
+    # StaleDataError so run_with_retry re-runs the whole check.
+    car = db.session.get(Car, data['car_id'], with_for_update=True)
+    if not car:
+        return jsonify({'error': 'Car not found'}), 404
+    
+    # Reject bookings that overlap an existing one for this car
+    conflict = Booking.find_conflict(car.id, pickup, return_date)
+    if conflict:
+        return jsonify({
+            'error': 'Car is already booked for the selected dates',
+            'conflict': {
+                'pickup_date': conflict.pickup_date.isoformat(),
+                'return_date': conflict.return_date.isoformat()
+            }
+        }), 409
+    
+    # Same pricing as POST /api/quotes
+    booking = Booking(
+        user_id=current_user_id,
+        car_id=car.id,
+        owner_id=car.owner_id,
+        pickup_date=pickup,
+        return_date=return_date,
+        pickup_location=data['pickup_location'],
+        total_amount=pricing.total(car.daily_rate, pickup, return_date),
+        status='Confirmed'
+    )
+    
+    db.session.add(booking)
+    db.session.flush()
+    EarningsRollup.record(car.owner_id, booking.created_at, booking.total_amount)
+    
+    # Update car stats with SQL-side increments; the car is only marked
+    # rented while the booking runs
+    if pickup <= datetime.utcnow() < return_date:
+        car.status = 'Rented'
+    car.total_bookings = Car.total_bookings + 1
+    car.total_earnings = Car.total_earnings + booking.total_amount
+    
+    db.session.commit()
+    catalogue_cache.bump()
+    
+    return jsonify({
+        'message': 'Booking created successfully',
+        'booking': booking.to_dict()
+    }), 201
+
+
 @app.route('/api/bookings', methods=['POST'])
 @jwt_required()
+@rate_limited(rate_limiter, app.config['RATE_LIMIT_BOOKINGS'], by='user')
 def create_booking():
     try:
         current_user_id = get_jwt_identity()
         data = request.get_json()
         
-        # Calculate total amount
-        car = Car.query.get(data['car_id'])
-        if not car:
-            return jsonify({'error': 'Car not found'}), 404
-        
-        pickup = datetime.fromisoformat(data['pickup_date'].replace('Z', '+00:00'))
-        return_date = datetime.fromisoformat(data['return_date'].replace('Z', '+00:00'))
-        days = (return_date - pickup).days
-        
-        booking = Booking(
-            user_id=current_user_id,
-            car_id=data['car_id'],
-            pickup_date=pickup,
-            return_date=return_date,
-            pickup_location=data['pickup_location'],
-            total_amount=car.daily_rate * days,
-            status='Confirmed'
-        )
-        
-        db.session.add(booking)
-        
-        # Update car stats
-        car.status = 'Rented'
-        car.total_bookings += 1
-        car.total_earnings += booking.total_amount
-        
-        db.session.commit()
+        pickup = parse_datetime(data['pickup_date'])
+        return_date = parse_datetime(data['return_date'])
+        if return_date <= pickup:
+            return jsonify({'error': 'return_date must be after pickup_date'}), 400
         
-        return jsonify({
-            'message': 'Booking created successfully',
-            'booking': booking.to_dict()
-        }), 201
+        return run_with_retry(lambda: book_car(current_user_id, data, pickup, return_date))
         
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -320,9 +793,16 @@ def create_booking():
 def get_user_bookings():
     try:
         current_user_id = get_jwt_identity()
-        bookings = Booking.query.filter_by(user_id=current_user_id).order_by(Booking.created_at.desc()).all()
-        return jsonify([booking.to_dict() for booking in bookings]), 200
+        shape = request_shape(Booking)
+        query = Booking.query.filter_by(user_id=current_user_id).options(*shape.loader_options())
+        bookings, next_cursor = paginate(query, Booking)
+        return jsonify({
+            'items': Booking.to_dict_many(bookings, shape),
+            'next_cursor': next_cursor
+        }), 200
         
+    except (InvalidCursor, InvalidShape) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -332,17 +812,105 @@ def get_user_bookings():
 def get_owner_bookings():
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if user.user_type != 'owner':
+        if current_user_type() != 'owner':
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get all bookings for owner's cars
-        owner_cars = Car.query.filter_by(owner_id=current_user_id).all()
-        car_ids = [car.id for car in owner_cars]
+        # Get bookings for owner's cars
+        shape = request_shape(Booking)
+        query = Booking.query.filter(Booking.owner_id == current_user_id).options(*shape.loader_options())
+        bookings, next_cursor = paginate(query, Booking)
+        return jsonify({
+            'items': Booking.to_dict_many(bookings, shape),
+            'next_cursor': next_cursor
+        }), 200
+        
+    except (InvalidCursor, InvalidShape) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+EXPORT_COLUMNS = [
+    ('booking_id', Booking.id),
+    ('status', Booking.status),
+    ('payment_status', Booking.payment_status),
+    ('pickup_date', Booking.pickup_date),
+    ('return_date', Booking.return_date),
+    ('pickup_location', Booking.pickup_location),
+    ('total_amount', Booking.total_amount),
+    ('created_at', Booking.created_at),
+    ('car_id', Car.id),
+    ('car_name', Car.name),
+    ('car_brand', Car.brand),
+    ('renter_id', User.id),
+    ('renter_name', User.full_name),
+    ('renter_email', User.email),
+    ('renter_phone', User.phone),
+]
+EXPORT_CHUNK_ROWS = 1000
+
+
+def export_rows(query, fmt):
+    # Stream rows off a server-side cursor on a dedicated connection, encoding
+    # them a chunk at a time so memory stays flat however long the export is
+    names = [name for name, _ in EXPORT_COLUMNS]
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(query)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(names)
+        
+        for rows in result.partitions():
+            for row in rows:
+                values = [v.isoformat() if isinstance(v, datetime) else v for v in row]
+                if fmt == 'csv':
+                    writer.writerow(values)
+                else:
+                    buffer.write(app.json.dumps(dict(zip(names, values))) + '\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        if fmt == 'csv' and buffer.tell():
+            yield buffer.getvalue()
+
+
+@app.route('/api/owner/bookings/export', methods=['GET'])
+@jwt_required()
+def export_owner_bookings():
+    try:
+        current_user_id = get_jwt_identity()
+        if current_user_type() != 'owner':
+            return jsonify({'error': 'Access denied'}), 403
         
-        bookings = Booking.query.filter(Booking.car_id.in_(car_ids)).order_by(Booking.created_at.desc()).all()
-        return jsonify([booking.to_dict() for booking in bookings]), 200
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+        
+        query = db.select(*[column for _, column in EXPORT_COLUMNS]).join(
+            Car, Booking.car_id == Car.id
+        ).join(
+            User, Booking.user_id == User.id
+        ).where(Booking.owner_id == current_user_id)
+        
+        # Optional booking creation date range: from inclusive, to exclusive
+        try:
+            created_from = parse_datetime(request.args['from']) if request.args.get('from') else None
+            created_to = parse_datetime(request.args['to']) if request.args.get('to') else None
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date: {e}'}), 400
+        if created_from:
+            query = query.where(Booking.created_at >= created_from)
+        if created_to:
+            query = query.where(Booking.created_at < created_to)
+        query = query.order_by(Booking.created_at, Booking.id)
+        
+        mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = Response(stream_with_context(export_rows(query, fmt)), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename=bookings.{fmt}'
+        return response
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -353,24 +921,56 @@ def get_owner_bookings():
 def update_booking_status(booking_id):
     try:
         data = request.get_json()
-        booking = Booking.query.get(booking_id)
-        
-        if not booking:
-            return jsonify({'error': 'Booking not found'}), 404
-        
-        booking.status = data['status']
         
-        # Update car status if booking is completed or cancelled
-        if data['status'] in ['Completed', 'Cancelled']:
-            booking.car.status = 'Available'
+        def apply_status():
+            booking = db.session.get(Booking, booking_id)
+            if not booking:
+                return jsonify({'error': 'Booking not found'}), 404
+            
+            was_cancelled = booking.status == 'Cancelled'
+            is_cancelled = data['status'] == 'Cancelled'
+            
+            # A reinstated booking must not overlap one made while it was
+            # cancelled. Lock the car and bump its version like book_car, so a
+            # racing booking of the same car conflicts and retries.
+            if was_cancelled and not is_cancelled:
+                car = db.session.get(Car, booking.car_id, with_for_update=True)
+                conflict = Booking.find_conflict(car.id, booking.pickup_date, booking.return_date,
+                                                 exclude_id=booking.id)
+                if conflict:
+                    return jsonify({
+                        'error': 'Car is already booked for the selected dates',
+                        'conflict': {
+                            'pickup_date': conflict.pickup_date.isoformat(),
+                            'return_date': conflict.return_date.isoformat()
+                        }
+                    }), 409
+                flag_modified(car, 'status')
+            
+            # Keep earnings rollups in step with cancellations and reinstatements
+            if was_cancelled != is_cancelled:
+                sign = -1 if is_cancelled else 1
+                EarningsRollup.record(booking.car.owner_id, booking.created_at,
+                                      sign * booking.total_amount, count=sign)
+            
+            booking.status = data['status']
+            
+            # Update car status if booking is completed or cancelled
+            if data['status'] in ['Completed', 'Cancelled']:
+                booking.car.status = 'Available'
+            
+            db.session.commit()
+            catalogue_cache.bump()
+            
+            return jsonify({
+                'message': 'Booking status updated',
+                'booking': booking.to_dict()
+            }), 200
         
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Booking status updated',
-            'booking': booking.to_dict()
-        }), 200
+        return run_with_retry(apply_status)
         
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -385,28 +985,35 @@ def create_review():
         current_user_id = get_jwt_identity()
         data = request.get_json()
         
-        review = Review(
-            user_id=current_user_id,
-            car_id=data['car_id'],
-            rating=data['rating'],
-            comment=data.get('comment', '')
-        )
-        
-        db.session.add(review)
-        
-        # Update car rating
-        car = Car.query.get(data['car_id'])
-        reviews = Review.query.filter_by(car_id=data['car_id']).all()
-        avg_rating = sum([r.rating for r in reviews]) / len(reviews) if reviews else 0
-        car.rating = round(avg_rating, 1)
+        rating = float(data['rating'])
+        if not 1 <= rating <= 5:
+            return jsonify({'error': 'rating must be between 1 and 5'}), 400
+        
+        def save_review():
+            review = Review(
+                user_id=current_user_id,
+                car_id=data['car_id'],
+                rating=rating,
+                comment=data.get('comment', '')
+            )
+            
+            # Update car rating aggregates in the same transaction
+            if not Car.apply_review(data['car_id'], rating):
+                return jsonify({'error': 'Car not found'}), 404
+            
+            db.session.add(review)
+            db.session.commit()
+            catalogue_cache.bump()
+            
+            return jsonify({
+                'message': 'Review added successfully',
+                'review': review.to_dict()
+            }), 201
         
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Review added successfully',
-            'review': review.to_dict()
-        }), 201
+        return run_with_retry(save_review, retry_if=is_locked)
         
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -415,9 +1022,16 @@ def create_review():
 @app.route('/api/cars/<int:car_id>/reviews', methods=['GET'])
 def get_car_reviews(car_id):
     try:
-        reviews = Review.query.filter_by(car_id=car_id).order_by(Review.created_at.desc()).all()
-        return jsonify([review.to_dict() for review in reviews]), 200
+        shape = request_shape(Review)
+        query = Review.query.filter_by(car_id=car_id).options(*shape.loader_options())
+        reviews, next_cursor = paginate(query, Review)
+        return jsonify({
+            'items': Review.to_dict_many(reviews, shape),
+            'next_cursor': next_cursor
+        }), 200
         
+    except (InvalidCursor, InvalidShape) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -431,18 +1045,20 @@ def add_favorite():
         current_user_id = get_jwt_identity()
         data = request.get_json()
         
-        # Check if already favorited
-        existing = Favorite.query.filter_by(user_id=current_user_id, car_id=data['car_id']).first()
-        if existing:
-            return jsonify({'error': 'Already in favorites'}), 400
-        
         favorite = Favorite(
             user_id=current_user_id,
             car_id=data['car_id']
         )
         
+        # uq_favorites_user_car rejects duplicates, including racing requests
         db.session.add(favorite)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if Favorite.query.filter_by(user_id=current_user_id, car_id=data['car_id']).first():
+                return jsonify({'error': 'Already in favorites'}), 400
+            raise
         
         return jsonify({
             'message': 'Added to favorites',
@@ -459,9 +1075,16 @@ def add_favorite():
 def get_favorites():
     try:
         current_user_id = get_jwt_identity()
-        favorites = Favorite.query.filter_by(user_id=current_user_id).all()
-        return jsonify([fav.to_dict() for fav in favorites]), 200
+        shape = request_shape(Favorite)
+        query = Favorite.query.filter_by(user_id=current_user_id).options(*shape.loader_options())
+        favorites, next_cursor = paginate(query, Favorite)
+        return jsonify({
+            'items': Favorite.to_dict_many(favorites, shape),
+            'next_cursor': next_cursor
+        }), 200
         
+    except (InvalidCursor, InvalidShape) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -471,16 +1094,22 @@ def get_favorites():
 def remove_favorite(car_id):
     try:
         current_user_id = get_jwt_identity()
-        favorite = Favorite.query.filter_by(user_id=current_user_id, car_id=car_id).first()
         
-        if not favorite:
-            return jsonify({'error': 'Favorite not found'}), 404
-        
-        db.session.delete(favorite)
-        db.session.commit()
+        def delete_favorite():
+            favorite = Favorite.query.filter_by(user_id=current_user_id, car_id=car_id).first()
+            
+            if not favorite:
+                return jsonify({'error': 'Favorite not found'}), 404
+            
+            db.session.delete(favorite)
+            db.session.commit()
+            
+            return jsonify({'message': 'Removed from favorites'}), 200
         
-        return jsonify({'message': 'Removed from favorites'}), 200
+        return run_with_retry(delete_favorite, retry_if=is_locked)
         
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -495,27 +1124,33 @@ def add_payment_method():
         current_user_id = get_jwt_identity()
         data = request.get_json()
         
-        payment_method = PaymentMethod(
-            user_id=current_user_id,
-            card_type=data['card_type'],
-            last_four=data['last_four'],
-            expiry_month=data['expiry_month'],
-            expiry_year=data['expiry_year'],
-            is_default=data.get('is_default', False)
-        )
-        
-        # If this is default, unset other defaults
-        if payment_method.is_default:
-            PaymentMethod.query.filter_by(user_id=current_user_id, is_default=True).update({'is_default': False})
+        def save_payment_method():
+            payment_method = PaymentMethod(
+                user_id=current_user_id,
+                card_type=data['card_type'],
+                last_four=data['last_four'],
+                expiry_month=data['expiry_month'],
+                expiry_year=data['expiry_year'],
+                is_default=data.get('is_default', False)
+            )
+            
+            # If this is default, unset other defaults
+            if payment_method.is_default:
+                PaymentMethod.query.filter_by(user_id=current_user_id, is_default=True).update({'is_default': False})
+            
+            db.session.add(payment_method)
+            db.session.commit()
+            return payment_method
         
-        db.session.add(payment_method)
-        db.session.commit()
+        payment_method = run_with_retry(save_payment_method, retry_if=is_locked)
         
         return jsonify({
             'message': 'Payment method added',
             'payment_method': payment_method.to_dict()
         }), 201
         
+    except ConcurrencyConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -526,9 +1161,12 @@ def add_payment_method():
 def get_payment_methods():
     try:
         current_user_id = get_jwt_identity()
-        methods = PaymentMethod.query.filter_by(user_id=current_user_id).all()
-        return jsonify([method.to_dict() for method in methods]), 200
+        shape = request_shape(PaymentMethod)
+        methods = PaymentMethod.query.filter_by(user_id=current_user_id).options(*shape.loader_options()).all()
+        return jsonify(PaymentMethod.to_dict_many(methods, shape)), 200
         
+    except InvalidShape as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -569,30 +1207,20 @@ def get_owner_dashboard_stats():
     try:
         current_user_id = get_jwt_identity()
         
-        # Get total cars
-        total_cars = Car.query.filter_by(owner_id=current_user_id).count()
+        # Get total cars and average rating
+        total_cars, avg_rating = db.session.query(
+            db.func.count(Car.id), db.func.avg(Car.rating)
+        ).filter(Car.owner_id == current_user_id).one()
         
         # Get active bookings
-        owner_cars = Car.query.filter_by(owner_id=current_user_id).all()
-        car_ids = [car.id for car in owner_cars]
         active_bookings = Booking.query.filter(
-            Booking.car_id.in_(car_ids),
+            Booking.owner_id == current_user_id,
             Booking.status.in_(['Confirmed', 'Active'])
         ).count()
         
-        # Calculate monthly earnings (this month)
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        monthly_earnings = db.session.query(db.func.sum(Booking.total_amount)).filter(
-            Booking.car_id.in_(car_ids),
-            db.extract('month', Booking.created_at) == current_month,
-            db.extract('year', Booking.created_at) == current_year
-        ).scalar() or 0
-        
-        # Calculate average rating
-        avg_rating = db.session.query(db.func.avg(Car.rating)).filter(
-            Car.owner_id == current_user_id
-        ).scalar() or 0
+        # Monthly earnings (this month) from the pre-summed rollup row
+        monthly_earnings = EarningsRollup.total(current_user_id, 'month', datetime.utcnow())
+        avg_rating = avg_rating or 0
         
         return jsonify({
             'total_cars': total_cars,
@@ -605,6 +1233,66 @@ def get_owner_dashboard_stats():
         return jsonify({'error': str(e)}), 500
 
 
+# ===================== CLI COMMANDS =====================
+
+@app.cli.command('backfill-ratings')
+def backfill_ratings_command():
+    """Recompute car rating aggregates from existing reviews."""
+    updated = Car.rebuild_rating_aggregates()
+    db.session.commit()
+    catalogue_cache.bump()
+    print(f'Backfilled rating aggregates for {updated} cars')
+
+
+@app.cli.command('rebuild-earnings-rollups')
+def rebuild_earnings_rollups_command():
+    """Recompute owner daily/monthly earnings rollups from booking history."""
+    rows = EarningsRollup.rebuild()
+    db.session.commit()
+    print(f'Rebuilt {rows} earnings rollup rows')
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the full-text car search index (SQLite only)."""
+    indexed = rebuild_search_index()
+    db.session.commit()
+    catalogue_cache.bump()
+    print(f'Indexed {indexed} cars for search')
+
+
+@app.cli.command('sync-replica')
+def sync_replica_command():
+    """Copy the primary SQLite database over the replica (SQLite only)."""
+    if not replica_router.enabled:
+        print('REPLICA_DATABASE_URL is not set')
+        sys.exit(1)
+    try:
+        pages = sync_replica(db.engines[None], db.engines[REPLICA_BIND])
+    except ValueError as e:
+        print(f'Replica sync only runs between SQLite files: {e}')
+        sys.exit(1)
+    print(f'Copied {pages} pages to the replica')
+
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any hot query scans a whole table, or a page sorts every match (SQLite only)."""
+    results = check_query_plans()
+    if results is None:
+        print('Query plan checks only run against SQLite')
+        return
+    
+    failed = 0
+    for name, plan, problems in results:
+        print(f"{'SLOW' if problems else 'ok':>4}  {name}: {'; '.join(plan)}")
+        failed += bool(problems)
+    if failed:
+        print(f'{failed} hot queries scan a whole table or sort every match')
+        sys.exit(1)
+    print(f'All {len(results)} hot queries use an index')
+
+
 # ===================== HEALTH CHECK =====================
 
 @app.route('/api/health', methods=['GET'])
@@ -612,7 +1300,12 @@ def health_check():
     return jsonify({'status': 'healthy', 'message': 'Vantage Car Hire API is running'}), 200
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade()
     app.run(debug=True, host='0.0.0.0', port=5000)
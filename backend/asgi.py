@@ -0,0 +1,234 @@
+import os
+from urllib.parse import parse_qsl
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from flask_jwt_extended import decode_token
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie, parse_etags
+from werkzeug.routing import Map, Rule
+
+from app import (app as flask_app, db, db_profile, catalogue_cache, user_cache, replica_router, page_criteria,
+                 finish_page, car_list_criteria, InvalidCursor, InvalidFilter)
+from models import User, Car, Booking
+from serialization import Shape, InvalidShape
+
+# Async drivers for each backend; DATABASE_URL keeps naming the sync one
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg', 'mysql': 'aiomysql'}
+
+
+def async_database_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver known for {backend}; set ASYNC_DATABASE_URL')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI call on one shared thread; Flask is thread-safe,
+    # so delegated routes use the executor's thread pool instead
+    run_wsgi_app = sync_to_async(vars(WsgiToAsgiInstance)['run_wsgi_app'].func, thread_sensitive=False)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+class AsyncRequest:
+    # The parts of an HTTP scope the async routes read, parsed like Flask does
+
+    def __init__(self, scope):
+        self.path = scope['path']
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True,
+                                        encoding='utf-8', errors='replace'))
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        self.cookies = parse_cookie(self.headers.get('Cookie'))
+
+
+class AsyncAPI:
+    # ASGI entry point (uvicorn asgi:app). The read-heavy car and booking
+    # listings run as coroutines on an async engine, so a worker keeps
+    # serving other connections while it waits on the database. Every other
+    # request, and any of these a handler declines (a missing or bad token,
+    # so Flask writes the usual 401), is passed to the Flask app on a thread.
+
+    def __init__(self, flask_app, database_url=None):
+        self.flask_app = flask_app
+        self.wsgi = ThreadedWsgiToAsgi(flask_app)
+        if database_url is None:
+            # Flask-SQLAlchemy resolves relative SQLite paths; reuse its URL
+            with flask_app.app_context():
+                database_url = async_database_url(db.engine.url)
+        self.engine = create_async_engine(database_url)
+        db_profile.attach(self.engine.sync_engine)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.routes = Map([
+            Rule('/api/cars', endpoint=self.get_cars, methods=['GET']),
+            Rule('/api/cars/<int:car_id>', endpoint=self.get_car, methods=['GET']),
+            Rule('/api/bookings/user', endpoint=self.get_user_bookings, methods=['GET']),
+            Rule('/api/bookings/owner', endpoint=self.get_owner_bookings, methods=['GET']),
+        ]).bind('')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            try:
+                handler, kwargs = self.routes.match(scope['path'], scope['method'])
+            except HTTPException:
+                handler = None
+            if handler is not None:
+                request = AsyncRequest(scope)
+                response = await self.dispatch(handler, request, kwargs)
+                if response is not None:
+                    return await self.send_response(request, response, send)
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def dispatch(self, handler, request, kwargs):
+        # Same error contract as the Flask routes
+        try:
+            return await handler(request, **kwargs)
+        except (InvalidCursor, InvalidShape, InvalidFilter) as e:
+            return self.json({'error': str(e)}, 400)
+        except Exception as e:
+            return self.json({'error': str(e)}, 500)
+
+    def json(self, obj, status=200):
+        response = self.flask_app.json.response(obj)
+        response.status_code = status
+        return response
+
+    async def send_response(self, request, response, send):
+        # Mirror Flask-CORS for the configured frontend origin
+        origin = request.headers.get('Origin')
+        if origin is None or origin == self.flask_app.config['FRONTEND_URL']:
+            response.headers['Access-Control-Allow-Origin'] = self.flask_app.config['FRONTEND_URL']
+            response.headers['Access-Control-Expose-Headers'] = 'Authorization, Content-Type'
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+        body = response.get_data()
+        response.headers['Content-Length'] = str(len(body))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def cached(self, request, build):
+        # cached_response() for coroutines: the same catalogue cache, which
+        # Flask's write routes in this process keep invalidating. A client
+        # pinned to the primary after a write skips it, like in Flask.
+        if replica_router.pins_primary(request.cookies):
+            return await build()
+        key = catalogue_cache.make_key(request.path, request.args)
+        entry = catalogue_cache.get(key)
+        if entry is None:
+            version = catalogue_cache.version
+            response = await build()
+            if response.status_code != 200:
+                return response
+            entry = catalogue_cache.set(key, response.get_data(), version)
+
+        if parse_etags(request.headers.get('If-None-Match')).contains(entry.etag):
+            response = self.flask_app.response_class(status=304)
+        else:
+            response = self.flask_app.response_class(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def claims(self, request):
+        # Claims of a valid access token, or None to let Flask reject it
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return None
+        try:
+            with self.flask_app.app_context():
+                claims = decode_token(header[len('Bearer '):])
+        except Exception:
+            return None
+        return claims if claims.get('type') == 'access' else None
+
+    async def user_type(self, session, claims, user_id):
+        # current_user_type() without blocking: claim, cache, then one query
+        if 'user_type' in claims:
+            return claims['user_type']
+        user_type = user_cache.get(user_id)
+        if user_type is None:
+            user_type = await session.scalar(select(User.user_type).where(User.id == user_id))
+            if user_type is not None:
+                user_cache.set(user_id, user_type)
+        return user_type
+
+    async def page(self, session, model, statement, args, shape):
+        # paginate() + to_dict_many(); serialization runs under run_sync so
+        # its follow-up queries go through the same async connection
+        criteria, limit = page_criteria(model, args)
+        statement = statement.where(*criteria).options(*shape.loader_options()).order_by(
+            model.created_at.desc(), model.id.desc()
+        ).limit(limit + 1)
+        items = (await session.scalars(statement)).unique().all()
+        items, next_cursor = finish_page(items, limit)
+        rendered = await session.run_sync(lambda _: model.to_dict_many(items, shape))
+        return {'items': rendered, 'next_cursor': next_cursor}
+
+    async def get_cars(self, request):
+        async def build():
+            criteria = car_list_criteria(request.args)
+            shape = Shape.parse(Car, request.args.get('fields'), request.args.get('expand'))
+            async with self.sessions() as session:
+                return self.json(await self.page(session, Car, select(Car).where(*criteria), request.args, shape))
+        return await self.cached(request, build)
+
+    async def get_car(self, request, car_id):
+        async def build():
+            shape = Shape.parse(Car, request.args.get('fields'), request.args.get('expand'))
+            async with self.sessions() as session:
+                car = (await session.scalars(
+                    select(Car).where(Car.id == car_id).options(*shape.loader_options())
+                )).unique().one_or_none()
+                if not car:
+                    return self.json({'error': 'Car not found'}, 404)
+                return self.json(await session.run_sync(lambda _: car.to_dict(shape)))
+        return await self.cached(request, build)
+
+    async def get_user_bookings(self, request):
+        claims = self.claims(request)
+        if claims is None:
+            return None
+        user_id = claims[self.flask_app.config['JWT_IDENTITY_CLAIM']]
+        shape = Shape.parse(Booking, request.args.get('fields'), request.args.get('expand'))
+        async with self.sessions() as session:
+            statement = select(Booking).where(Booking.user_id == user_id)
+            return self.json(await self.page(session, Booking, statement, request.args, shape))
+
+    async def get_owner_bookings(self, request):
+        claims = self.claims(request)
+        if claims is None:
+            return None
+        user_id = claims[self.flask_app.config['JWT_IDENTITY_CLAIM']]
+        async with self.sessions() as session:
+            if await self.user_type(session, claims, user_id) != 'owner':
+                return self.json({'error': 'Access denied'}, 403)
+            shape = Shape.parse(Booking, request.args.get('fields'), request.args.get('expand'))
+            statement = select(Booking).where(Booking.owner_id == user_id)
+            return self.json(await self.page(session, Booking, statement, request.args, shape))
+
+
+app = AsyncAPI(flask_app, os.getenv('ASYNC_DATABASE_URL'))
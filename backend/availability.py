@@ -0,0 +1,45 @@
+import base64
+from datetime import date, timedelta
+
+MAX_MONTHS = 3
+MAX_CARS = 5000
+
+
+class InvalidWindow(ValueError):
+    pass
+
+
+def month_window(month, months=1):
+    # 'YYYY-MM' and a month count -> (first day, number of days)
+    try:
+        year, month_number = (int(part) for part in month.split('-'))
+        start = date(year, month_number, 1)
+    except (AttributeError, ValueError):
+        raise InvalidWindow('month must be given as YYYY-MM')
+    if not 1 <= months <= MAX_MONTHS:
+        raise InvalidWindow(f'months must be between 1 and {MAX_MONTHS}')
+    end_month = month_number - 1 + months
+    if year + end_month // 12 > date.max.year:
+        # The window's exclusive end would be past date.max
+        raise InvalidWindow(f'The window must end before {date.max.year}-12')
+    end = date(year + end_month // 12, end_month % 12 + 1, 1)
+    return start, (end - start).days
+
+
+def day_bitmaps(car_ids, bookings, start, days):
+    # One bitset per car as a Python int: bit i is set when day start + i is
+    # booked for any part of it. A booking returned at midnight leaves that
+    # day free.
+    bitmaps = dict.fromkeys(car_ids, 0)
+    for car_id, pickup, return_date in bookings:
+        first = max(0, (pickup.date() - start).days)
+        last = min(days - 1, ((return_date - timedelta(microseconds=1)).date() - start).days)
+        if first <= last and car_id in bitmaps:
+            bitmaps[car_id] |= ((1 << (last - first + 1)) - 1) << first
+    return bitmaps
+
+
+def encode_bitmap(bits, days):
+    # Base64 of ceil(days / 8) bytes, least significant bit first: day i is
+    # bit i % 8 of byte i // 8
+    return base64.b64encode(bits.to_bytes((days + 7) // 8, 'little')).decode()
@@ -0,0 +1,150 @@
+"""Sync vs async serving comparison for the read-heavy routes.
+
+Seeds a dataset (see endpoints.py), then serves it twice with the same number
+of worker processes: gunicorn with sync workers (app:app) and uvicorn with the
+ASGI entry point (asgi:app). Each read-heavy car and booking route is driven
+at every --concurrency level, and throughput and p50/p99 latency per server
+are reported as JSON. The catalogue response cache is off by default so both
+servers do the database work on every request.
+
+    python benchmarks/asgi_load.py --workers 4 --concurrency 1,16,64 --output asgi.json
+
+Note that SQLite on local disk answers in microseconds; the async workers gain
+most when the database is across a network (ASYNC_DATABASE_URL with asyncpg).
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from endpoints import BACKEND_DIR, load_app, seed, free_port, summarize, http_request, start_gunicorn
+
+
+def start_uvicorn(database_url, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    if args.no_cache:
+        env['CATALOGUE_CACHE_SIZE'] = '0'
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', '--workers', str(args.workers), '--port', str(port),
+         '--log-level', 'warning', 'asgi:app'],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/health', timeout=5).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    process.wait()
+    raise RuntimeError('uvicorn did not start')
+
+
+def build_scenarios(app, owner_ids, renter_ids, args):
+    from flask_jwt_extended import create_access_token
+    from models import Car
+
+    with app.app_context():
+        owner_tokens = [create_access_token(identity=uid, additional_claims={'user_type': 'owner'})
+                        for uid in owner_ids[:50]]
+        renter_tokens = [create_access_token(identity=uid, additional_claims={'user_type': 'renter'})
+                         for uid in renter_ids[:200]]
+        car_ids = [car_id for car_id, in Car.query.with_entities(Car.id)]
+    categories = ['SUV', 'Sedan', 'Compact', 'Luxury', 'Van', 'Pickup']
+
+    def auth(tokens, rng):
+        return {'Authorization': f'Bearer {rng.choice(tokens)}'}
+
+    return [
+        ('GET /api/cars', lambda rng: (f'/api/cars?category={rng.choice(categories)}', None, {})),
+        ('GET /api/cars/:id', lambda rng: (f'/api/cars/{rng.choice(car_ids)}', None, {})),
+        ('GET /api/bookings/user', lambda rng: ('/api/bookings/user', None, auth(renter_tokens, rng))),
+        ('GET /api/bookings/owner', lambda rng: ('/api/bookings/owner?limit=50', None, auth(owner_tokens, rng))),
+    ]
+
+
+def drive(base_url, scenarios, concurrency, args):
+    results = {}
+    for name, factory in scenarios:
+        latencies, statuses = [], {}
+        lock = threading.Lock()
+
+        def one(i):
+            rng = random.Random(args.seed * 100003 + i)
+            path, body, headers = factory(rng)
+            t0 = time.perf_counter()
+            status = http_request(base_url, 'GET', path, body, headers)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(args.requests)))
+        results[name] = summarize(latencies, statuses, time.perf_counter() - started)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--owners', type=int, default=50)
+    parser.add_argument('--renters', type=int, default=500)
+    parser.add_argument('--cars', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=10000)
+    parser.add_argument('--favorites', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=400, help='requests per route per concurrency level')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes for both servers')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--concurrency', default='1,16,64', help='comma-separated client counts')
+    parser.add_argument('--cache', dest='no_cache', action='store_false', help='keep the catalogue cache on')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='vch-asgi-'), 'asgi.db')
+    database_url = f'sqlite:///{path}'
+    app = load_app(database_url, args.no_cache)
+    print(f'Seeding {path}...', file=sys.stderr)
+    owner_ids, renter_ids = seed(app, args)
+    scenarios = build_scenarios(app, owner_ids, renter_ids, args)
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    report = {'workers': args.workers, 'threads': args.threads, 'requests': args.requests,
+              'catalogue_cache': not args.no_cache, 'results': {}}
+    for server, start in (('gunicorn-sync', start_gunicorn), ('uvicorn-asgi', start_uvicorn)):
+        process, base_url = start(database_url, args)
+        try:
+            report['results'][server] = {}
+            for level in levels:
+                results = drive(base_url, scenarios, level, args)
+                report['results'][server][str(level)] = results
+                for name, result in results.items():
+                    print(f'  [{server} x{level}] {name}: {result["throughput_rps"]} req/s, '
+                          f'p50 {result["p50_ms"]}ms, p99 {result["p99_ms"]}ms', file=sys.stderr)
+        finally:
+            process.terminate()
+            process.wait()
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Availability calendar benchmark.
+
+Seeds a dataset (see endpoints.py), then times GET /api/cars/availability for
+the whole fleet over one month and over a quarter through the test client
+(catalogue cache off), next to the per-car approach it replaces: one booking
+query per car per month. Reports p50/p99 milliseconds, SQL statements per
+request and response bytes as JSON.
+
+    python benchmarks/availability.py --cars 5000 --bookings 100000 --output availability.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from endpoints import load_app, seed, percentile
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {'p50_ms': round(statistics.median(samples), 3), 'p99_ms': round(percentile(samples, 99), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--owners', type=int, default=100)
+    parser.add_argument('--renters', type=int, default=2000)
+    parser.add_argument('--cars', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=100000)
+    parser.add_argument('--reviews', type=int, default=1000)
+    parser.add_argument('--favorites', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per case')
+    parser.add_argument('--per-car-sample', type=int, default=200,
+                        help='cars timed for the per-car baseline, scaled up to the fleet')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='vch-availability-'), 'availability.db')
+    app = load_app(f'sqlite:///{path}', no_cache=True)
+    print(f'Seeding {path}...', file=sys.stderr)
+    seed(app, args)
+
+    from sqlalchemy import event
+    from models import db, Car, Booking
+
+    with app.app_context():
+        car_ids = [car_id for car_id, in db.session.query(Car.id).order_by(Car.id)]
+        latest = db.session.query(db.func.max(Booking.pickup_date)).scalar()
+        statements = {'n': 0}
+        event.listen(db.engine, 'before_cursor_execute', lambda *_: statements.__setitem__('n', statements['n'] + 1))
+    # The quarter ending with the last booked month, so every day has bookings
+    month_starts = []
+    year, month_number = divmod(latest.year * 12 + latest.month - 1 - 2, 12)
+    for offset in range(4):
+        month_starts.append(datetime(year + (month_number + offset) // 12, (month_number + offset) % 12 + 1, 1))
+    month = month_starts[0].strftime('%Y-%m')
+    client = app.test_client()
+
+    report = {'cars': len(car_ids), 'bookings': args.bookings, 'month': month, 'results': {}}
+    for months in (1, 3):
+        url = f'/api/cars/availability?month={month}&months={months}'
+        statements['n'] = 0
+        size = len(client.get(url).get_data())
+        count = statements['n']
+        result = dict(timed(lambda: client.get(url), args.repeat), statements=count, bytes=size)
+        report['results'][f'bitmaps, {months} month(s)'] = result
+        print(f"  [bitmaps, {months} month(s)] p50 {result['p50_ms']}ms p99 {result['p99_ms']}ms, "
+              f"{result['statements']} statements, {size} bytes", file=sys.stderr)
+
+    # Baseline: what a client would do without the endpoint, per car per month
+    sample = car_ids[:args.per_car_sample]
+
+    def per_car():
+        with app.app_context():
+            for car_id in sample:
+                for start, end in zip(month_starts, month_starts[1:]):
+                    Booking.query.filter(
+                        Booking.car_id == car_id, Booking.status != 'Cancelled',
+                        Booking.pickup_date < end, Booking.return_date > start
+                    ).all()
+
+    sampled = timed(per_car, max(1, args.repeat // 4))
+    scale = len(car_ids) / max(1, len(sample))
+    result = {'p50_ms': round(sampled['p50_ms'] * scale, 1), 'statements': len(car_ids) * 3}
+    report['results']['per-car queries, 3 months (extrapolated)'] = result
+    print(f"  [per-car queries, 3 months] ~{result['p50_ms']}ms, {result['statements']} statements",
+          file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+"""Endpoint benchmark suite.
+
+Seeds a throwaway SQLite database with a configurable volume of owners, cars,
+bookings, reviews and favorites, then drives every route in app.py through
+the Flask test client (in-process, with SQL statement counts) and through a
+real gunicorn server (over HTTP, with concurrency). Reports throughput and
+p50/p95/p99 latency per route as JSON, so runs can be diffed between commits.
+
+    python benchmarks/endpoints.py --cars 2000 --bookings 50000 --output before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'password123'
+
+
+def load_app(database_url, no_cache=False):
+    os.environ['DATABASE_URL'] = database_url
+    # Measure the routes, not the rate limiter
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    if no_cache:
+        os.environ['CATALOGUE_CACHE_SIZE'] = '0'
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+    return app
+
+
+def seed(app, args):
+    from models import db
+    from init_db import generate_dataset
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        owner_ids, renter_ids, _ = generate_dataset(
+            owners=args.owners, renters=args.renters, cars=args.cars, bookings=args.bookings,
+            reviews=args.reviews, favorites=args.favorites, seed=args.seed
+        )
+    return list(owner_ids), list(renter_ids)
+
+
+def build_scenarios(app, owner_ids, renter_ids, args):
+    # One entry per route: (name, method, request factory). Factories return
+    # (path, json body or raw bytes, headers) and may use a per-thread RNG.
+    from flask_jwt_extended import create_access_token
+    from models import Car, Booking, Favorite
+
+    with app.app_context():
+        owner_tokens = {uid: create_access_token(identity=uid, additional_claims={'user_type': 'owner'}) for uid in owner_ids[:50]}
+        renter_tokens = {uid: create_access_token(identity=uid, additional_claims={'user_type': 'renter'}) for uid in renter_ids[:200]}
+        owner_cars = {}
+        for car_id, owner_id in Car.query.with_entities(Car.id, Car.owner_id).filter(
+                Car.owner_id.in_(list(owner_tokens))).limit(5000):
+            owner_cars.setdefault(owner_id, []).append(car_id)
+        booking_ids = [row[0] for row in Booking.query.with_entities(Booking.id).limit(5000)]
+        # Seeded favorites the DELETE scenario removes, one per request
+        favorites = [tuple(row) for row in Favorite.query.with_entities(Favorite.user_id, Favorite.car_id).filter(
+            Favorite.user_id.in_(list(renter_tokens))).order_by(Favorite.id)]
+
+    counter = {'n': 0}
+    lock = threading.Lock()
+
+    def unique():
+        with lock:
+            counter['n'] += 1
+            return f'{os.getpid()}-{counter["n"]}-{time.time_ns()}'
+
+    def owner(rng):
+        owner_id = rng.choice([uid for uid in owner_tokens if uid in owner_cars] or list(owner_tokens))
+        return owner_id, {'Authorization': f'Bearer {owner_tokens[owner_id]}'}
+
+    def renter(rng):
+        return {'Authorization': f'Bearer {renter_tokens[rng.choice(list(renter_tokens))]}'}
+
+    def seeded_favorite(rng):
+        # A favorite that still exists; once they run out, a random car (404)
+        with lock:
+            if favorites:
+                user_id, favorite_car = favorites.pop(rng.randrange(len(favorites)))
+                return favorite_car, {'Authorization': f'Bearer {renter_tokens[user_id]}'}
+        return car_id(rng), renter(rng)
+
+    def car_id(rng):
+        return rng.randint(1, args.cars)
+
+    def future_range(rng):
+        pickup = datetime(2031, 1, 1) + timedelta(days=rng.randrange(3000), hours=rng.randrange(24))
+        return pickup.isoformat(), (pickup + timedelta(days=rng.randint(1, 5))).isoformat()
+
+    def month(rng):
+        first = datetime.utcnow().replace(day=1) + timedelta(days=31 * rng.randint(-2, 2))
+        return first.strftime('%Y-%m')
+
+    def owned_car(rng):
+        owner_id, headers = owner(rng)
+        return rng.choice(owner_cars.get(owner_id, [1])), headers
+
+    def csv_upload():
+        rows = ''.join(f'Imported {i},Toyota,2022,SUV,5000,Garissa,AC|GPS\n' for i in range(20))
+        return ('name,brand,model_year,category,daily_rate,location,features\n' + rows).encode()
+
+    new_car = {'name': 'Bench Car', 'brand': 'Toyota', 'model_year': 2024, 'category': 'SUV',
+               'daily_rate': 8000, 'location': 'Garissa', 'features': ['AC', 'GPS']}
+
+    return [
+        ('POST /api/auth/signup', 'POST', lambda rng: ('/api/auth/signup', {
+            'full_name': 'Bench User', 'email': f'{unique()}@bench.test', 'phone': '0',
+            'password': PASSWORD, 'user_type': 'renter'}, {})),
+        ('POST /api/auth/login', 'POST', lambda rng: ('/api/auth/login', {
+            'email': f'renter{rng.choice(renter_ids)}@scale.vantage.test', 'password': PASSWORD}, {})),
+        ('GET /api/auth/me', 'GET', lambda rng: ('/api/auth/me', None, renter(rng))),
+        ('GET /api/cars', 'GET', lambda rng: (f'/api/cars?category={rng.choice(["All", "SUV", "Sedan"])}', None, {})),
+        ('GET /api/cars?pickup_date&return_date', 'GET', lambda rng: (
+            '/api/cars?pickup_date={}&return_date={}'.format(*future_range(rng)), None, {})),
+        ('GET /api/cars/search', 'GET', lambda rng: (
+            f'/api/cars/search?q={rng.choice(["toy", "merc", "sunroof", "leather+gps"])}', None, {})),
+        ('GET /api/cars/availability', 'GET', lambda rng: (
+            f'/api/cars/availability?month={month(rng)}&months={rng.randint(1, 3)}', None, {})),
+        ('GET /api/cars/availability?car_ids', 'GET', lambda rng: (
+            '/api/cars/availability?month={}&car_ids={}'.format(
+                month(rng), ','.join(str(car_id(rng)) for _ in range(20))), None, {})),
+        ('GET /api/cars/<id>', 'GET', lambda rng: (f'/api/cars/{car_id(rng)}', None, {})),
+        ('POST /api/cars', 'POST', lambda rng: ('/api/cars', new_car, owner(rng)[1])),
+        ('GET /api/owner/cars', 'GET', lambda rng: ('/api/owner/cars', None, owner(rng)[1])),
+        ('POST /api/owner/cars/import', 'POST', lambda rng: (
+            '/api/owner/cars/import?format=csv', csv_upload(), owner(rng)[1])),
+        ('PUT /api/cars/<id>', 'PUT', lambda rng: (lambda car, headers: (
+            f'/api/cars/{car}', {'description': f'Updated {unique()}'}, headers))(*owned_car(rng))),
+        ('POST /api/quotes', 'POST', lambda rng: (lambda pickup, ret: ('/api/quotes', {
+            'pickup_date': pickup, 'return_date': ret}, {}))(*future_range(rng))),
+        ('POST /api/quotes (car_ids, ranges)', 'POST', lambda rng: ('/api/quotes', {
+            'ranges': [dict(zip(('pickup_date', 'return_date'), future_range(rng))) for _ in range(3)],
+            'car_ids': [car_id(rng) for _ in range(50)]}, {})),
+        ('POST /api/bookings', 'POST', lambda rng: (lambda pickup, ret: ('/api/bookings', {
+            'car_id': car_id(rng), 'pickup_date': pickup, 'return_date': ret,
+            'pickup_location': 'Garissa'}, renter(rng)))(*future_range(rng))),
+        ('GET /api/bookings/user', 'GET', lambda rng: ('/api/bookings/user', None, renter(rng))),
+        ('GET /api/bookings/owner', 'GET', lambda rng: ('/api/bookings/owner', None, owner(rng)[1])),
+        ('GET /api/owner/bookings/export', 'GET', lambda rng: (
+            '/api/owner/bookings/export?format=csv', None, owner(rng)[1])),
+        ('PUT /api/bookings/<id>/status', 'PUT', lambda rng: (
+            f'/api/bookings/{rng.choice(booking_ids or [1])}/status',
+            {'status': rng.choice(['Confirmed', 'Completed'])}, owner(rng)[1])),
+        ('POST /api/reviews', 'POST', lambda rng: ('/api/reviews', {
+            'car_id': car_id(rng), 'rating': rng.randint(1, 5), 'comment': 'Bench review'}, renter(rng))),
+        ('GET /api/cars/<id>/reviews', 'GET', lambda rng: (f'/api/cars/{car_id(rng)}/reviews', None, {})),
+        ('POST /api/favorites', 'POST', lambda rng: ('/api/favorites', {'car_id': car_id(rng)}, renter(rng))),
+        ('GET /api/favorites', 'GET', lambda rng: ('/api/favorites', None, renter(rng))),
+        ('DELETE /api/favorites/<id>', 'DELETE', lambda rng: (lambda car, headers: (
+            f'/api/favorites/{car}', None, headers))(*seeded_favorite(rng))),
+        ('POST /api/payment-methods', 'POST', lambda rng: ('/api/payment-methods', {
+            'card_type': 'Visa', 'last_four': '4242', 'expiry_month': 12, 'expiry_year': 2030}, renter(rng))),
+        ('GET /api/payment-methods', 'GET', lambda rng: ('/api/payment-methods', None, renter(rng))),
+        ('GET /api/dashboard/user/stats', 'GET', lambda rng: ('/api/dashboard/user/stats', None, renter(rng))),
+        ('GET /api/dashboard/owner/stats', 'GET', lambda rng: ('/api/dashboard/owner/stats', None, owner(rng)[1])),
+        ('GET /api/health', 'GET', lambda rng: ('/api/health', None, {})),
+        ('GET /api/metrics', 'GET', lambda rng: ('/api/metrics', None, {})),
+    ]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, statuses, elapsed, queries=None):
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    }
+    if queries is not None:
+        summary['sql_queries_per_request'] = round(sum(queries) / len(queries), 2)
+        summary['sql_queries_max'] = max(queries)
+    return summary
+
+
+def run_test_client(app, scenarios, args):
+    from sqlalchemy import event
+    from models import db
+
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    statements = {'n': 0}
+
+    def count(*_):
+        statements['n'] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+
+    results = {}
+    try:
+        for name, method, factory in scenarios:
+            latencies, statuses, queries = [], {}, []
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                path, body, headers = factory(rng)
+                kwargs = {'data': body, 'content_type': 'text/csv'} if isinstance(body, bytes) else {'json': body}
+                statements['n'] = 0
+                t0 = time.perf_counter()
+                response = client.open(path, method=method, headers=headers, **kwargs)
+                response.get_data()
+                latencies.append(time.perf_counter() - t0)
+                queries.append(statements['n'])
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            results[name] = summarize(latencies, statuses, time.perf_counter() - started, queries)
+            print(f'  [test client] {name}: p50 {results[name]["p50_ms"]}ms, '
+                  f'{results[name]["sql_queries_per_request"]} queries/request', file=sys.stderr)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(database_url, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url)
+    if args.no_cache:
+        env['CATALOGUE_CACHE_SIZE'] = '0'
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/health', timeout=5).read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    process.wait()
+    raise RuntimeError('gunicorn did not start')
+
+
+def http_request(base_url, method, path, body, headers):
+    headers = dict(headers)
+    data = None
+    if isinstance(body, bytes):
+        data = body
+        headers['Content-Type'] = 'text/csv'
+    elif body is not None:
+        data = json.dumps(body).encode()
+        headers['Content-Type'] = 'application/json'
+    request = urllib.request.Request(base_url + path, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def run_gunicorn(database_url, scenarios, args):
+    if shutil.which('gunicorn') is None and subprocess.call(
+            [sys.executable, '-c', 'import gunicorn'], stderr=subprocess.DEVNULL) != 0:
+        print('  gunicorn is not installed, skipping HTTP run', file=sys.stderr)
+        return None
+
+    process, base_url = start_gunicorn(database_url, args)
+    results = {}
+    try:
+        for name, method, factory in scenarios:
+            latencies, statuses = [], {}
+            lock = threading.Lock()
+
+            def one(i):
+                rng = random.Random(args.seed * 100003 + i)
+                path, body, headers = factory(rng)
+                t0 = time.perf_counter()
+                status = http_request(base_url, method, path, body, headers)
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(one, range(args.requests)))
+            results[name] = summarize(latencies, statuses, time.perf_counter() - started)
+            print(f'  [gunicorn] {name}: {results[name]["throughput_rps"]} req/s, '
+                  f'p99 {results[name]["p99_ms"]}ms', file=sys.stderr)
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every API route on a seeded dataset')
+    parser.add_argument('--owners', type=int, default=50)
+    parser.add_argument('--renters', type=int, default=500)
+    parser.add_argument('--cars', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=10000)
+    parser.add_argument('--favorites', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200, help='requests per route per mode')
+    parser.add_argument('--mode', choices=['testclient', 'gunicorn', 'both'], default='both')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent HTTP clients')
+    parser.add_argument('--no-cache', action='store_true', help='disable the catalogue response cache')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file)')
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(prefix='vch-bench-'), 'bench.db')
+    database_url = f'sqlite:///{os.path.abspath(path)}'
+    app = load_app(database_url, args.no_cache)
+
+    print(f'Seeding {path}...', file=sys.stderr)
+    started = time.perf_counter()
+    owner_ids, renter_ids = seed(app, args)
+    seed_seconds = time.perf_counter() - started
+    scenarios = build_scenarios(app, owner_ids, renter_ids, args)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'dataset': {k: getattr(args, k) for k in ('owners', 'renters', 'cars', 'bookings', 'reviews', 'favorites')},
+            'seed_seconds': round(seed_seconds, 2),
+            'requests_per_route': args.requests,
+            'catalogue_cache': not args.no_cache,
+            'gunicorn': {'workers': args.workers, 'threads': args.threads, 'concurrency': args.concurrency},
+        },
+        'results': {},
+    }
+    if args.mode in ('testclient', 'both'):
+        report['results']['testclient'] = run_test_client(app, scenarios, args)
+    if args.mode in ('gunicorn', 'both'):
+        report['results']['gunicorn'] = run_gunicorn(database_url, scenarios, args)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
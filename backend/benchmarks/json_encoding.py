@@ -0,0 +1,113 @@
+"""JSON encoding benchmark for large list payloads.
+
+Seeds one owner with a large booking history and builds the
+/api/bookings/owner payload for all of it (default shape and a sparse
+?fields= shape), then times to_dict_many and encoding with each available
+JSON provider, and reports encoded sizes. Ends with the route itself through
+the test client at its maximum page size.
+
+    python benchmarks/json_encoding.py --bookings 10000 --output json.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPARSE_FIELDS = 'id,status,pickup_date,return_date,total_amount,car.name,user.full_name'
+
+
+def load_app(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+    return app
+
+
+def timed(fn, repeat):
+    # Median of `repeat` runs, in milliseconds, and the last result
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=10000)
+    parser.add_argument('--cars', type=int, default=200)
+    parser.add_argument('--renters', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vch-json-')
+    app = load_app(f"sqlite:///{os.path.join(directory, 'json.db')}")
+    from flask_jwt_extended import create_access_token
+    from init_db import generate_dataset
+    from json_provider import PROVIDERS, orjson
+    from models import db, Booking
+    from serialization import Shape
+
+    print(f'Seeding {args.bookings} bookings for one owner...', file=sys.stderr)
+    with app.app_context():
+        db.create_all()
+        # A single owner, so every booking lands in one owner's history
+        generate_dataset(owners=1, renters=args.renters, cars=args.cars, bookings=args.bookings,
+                         reviews=args.cars, favorites=0, seed=args.seed)
+        token = create_access_token(identity=1, additional_claims={'user_type': 'owner'})
+
+    providers = {name: cls(app) for name, cls in PROVIDERS.items() if name != 'orjson' or orjson is not None}
+    report = {'bookings': args.bookings, 'repeat': args.repeat, 'payloads': {}, 'route': {}}
+
+    for label, fields in (('default', None), ('sparse', SPARSE_FIELDS)):
+        with app.test_request_context():
+            shape = Shape.parse(Booking, fields)
+
+            def load():
+                db.session.expunge_all()
+                return Booking.query.filter(Booking.owner_id == 1).options(
+                    *shape.loader_options()
+                ).order_by(Booking.created_at.desc(), Booking.id.desc()).all()
+
+            load_ms, bookings = timed(load, args.repeat)
+            to_dict_ms, items = timed(lambda: Booking.to_dict_many(bookings, shape), args.repeat)
+            payload = {'items': items, 'next_cursor': None}
+
+            result = {'rows': len(items), 'load_ms': load_ms, 'to_dict_ms': to_dict_ms, 'encode': {}}
+            for name, provider in providers.items():
+                encode_ms, body = timed(lambda: provider.response(payload).get_data(), args.repeat)
+                result['encode'][name] = {'encode_ms': encode_ms, 'bytes': len(body)}
+            report['payloads'][label] = result
+            print(f'  {label}: {len(items)} rows, load {load_ms}ms, to_dict {to_dict_ms}ms, ' + ', '.join(
+                f"{name} {r['encode_ms']}ms/{r['bytes']}B" for name, r in result['encode'].items()
+            ), file=sys.stderr)
+
+    # The route itself, one full page per request, under each provider
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    for name, provider in providers.items():
+        app.json = provider
+        for label, query in (('default', ''), ('sparse', f'&fields={SPARSE_FIELDS}')):
+            url = f'/api/bookings/owner?limit=100{query}'
+            route_ms, response = timed(lambda: client.get(url, headers=headers), args.repeat * 4)
+            report['route'][f'{name}/{label}'] = {'p50_ms': route_ms, 'bytes': len(response.get_data())}
+            print(f'  GET {url[:40]}... [{name}]: p50 {route_ms}ms', file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Login throughput benchmark for each password hashing policy.
+
+For every policy (algorithm:cost) it seeds users whose hashes were made under
+that policy, then drives POST /api/auth/login from --threads client threads
+for --duration seconds through the test client, with the hashing pool sized
+to --workers. Reports logins per second, per core (the pool runs at most one
+hash per core), latency percentiles and how many logins were shed with 503
+(clients then wait out Retry-After).
+
+    python benchmarks/password_hashing.py --workers 2 --threads 8 --output hashing.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_POLICIES = 'pbkdf2:600000,scrypt:32768,scrypt:16384,bcrypt:12,bcrypt:10'
+PASSWORD = 'password123'
+
+
+def load_app(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    # Measure the routes, not the rate limiter
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+    return app
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def drive(client, emails, deadline, latencies, statuses, lock):
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = client.post('/api/auth/login', json={'email': emails[i % len(emails)], 'password': PASSWORD})
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies.append(elapsed)
+        if response.status_code == 503:
+            # Back off the way a well-behaved client would
+            time.sleep(int(response.headers.get('Retry-After', 1)))
+        i += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--policies', default=DEFAULT_POLICIES, help='comma-separated algorithm:cost list')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='hashing pool threads')
+    parser.add_argument('--queue', type=int, default=16, help='hashes queued before 503')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent login clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per policy')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vch-hashing-')
+    app = load_app(f"sqlite:///{os.path.join(directory, 'hashing.db')}")
+    from models import db, User
+    from passwords import hasher
+
+    with app.app_context():
+        db.create_all()
+
+    cores = min(args.workers, os.cpu_count() or 1)
+    report = {'workers': args.workers, 'cores': cores, 'threads': args.threads, 'queue': args.queue,
+              'duration_s': args.duration, 'policies': {}}
+
+    for policy in args.policies.split(','):
+        algorithm, cost = policy.split(':')
+        hasher.configure(algorithm, int(cost), args.workers, args.queue)
+        hasher.shutdown()
+
+        # One hash per policy; every seeded user shares it
+        started = time.perf_counter()
+        password_hash = hasher.hash(PASSWORD)
+        hash_ms = (time.perf_counter() - started) * 1000
+        emails = [f'{algorithm}-{cost}-{i}@hashing.test' for i in range(args.users)]
+        with app.app_context():
+            db.session.add_all(User(full_name='Hashing User', email=email, phone='0', user_type='renter',
+                                    password_hash=password_hash) for email in emails)
+            db.session.commit()
+
+        latencies, statuses, lock = [], {}, threading.Lock()
+        deadline = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=drive, args=(app.test_client(), emails, deadline, latencies, statuses, lock))
+            for _ in range(args.threads)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        throughput = len(latencies) / elapsed
+        result = {
+            'single_hash_ms': round(hash_ms, 2),
+            'logins_per_s': round(throughput, 2),
+            'logins_per_s_per_core': round(throughput / cores, 2),
+            'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        }
+        report['policies'][policy] = result
+        print(f"  {policy}: hash {result['single_hash_ms']}ms, {result['logins_per_s']} logins/s "
+              f"({result['logins_per_s_per_core']}/core), p95 {result['p95_ms']}ms, "
+              f"statuses {result['statuses']}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Fleet-wide price quote benchmark.
+
+Seeds a dataset (see endpoints.py) with a weekend multiplier, two seasons and
+long-rental discounts configured, then times POST /api/quotes for the whole
+fleet through the test client, for one date range and for --ranges ranges,
+with the NumPy and the pure-Python pricing paths. Also times
+PricingEngine.quote() alone, to separate pricing from the query and JSON
+encoding. Reports p50/p99 milliseconds per case as JSON.
+
+    python benchmarks/quotes.py --cars 5000 --ranges 12 --output quotes.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from endpoints import load_app, seed, percentile
+
+PRICING = {
+    'PRICING_WEEKEND_MULTIPLIER': '1.2',
+    'PRICING_SEASONS': '12-15:01-05:1.25,07-01:08-31:1.1',
+    'PRICING_LONG_RENTAL_DISCOUNTS': '7:0.05,28:0.15',
+}
+
+
+def make_ranges(rng, count):
+    ranges = []
+    for _ in range(count):
+        pickup = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 365), hours=rng.randint(0, 23))
+        ranges.append((pickup, pickup + timedelta(days=rng.randint(1, 30))))
+    return ranges
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {'p50_ms': round(statistics.median(samples), 3), 'p99_ms': round(percentile(samples, 99), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--owners', type=int, default=50)
+    parser.add_argument('--renters', type=int, default=100)
+    parser.add_argument('--cars', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=1000)
+    parser.add_argument('--favorites', type=int, default=100)
+    parser.add_argument('--ranges', type=int, default=12, help='date ranges in the multi-range case')
+    parser.add_argument('--repeat', type=int, default=50, help='timed runs per case')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    os.environ.update(PRICING)
+    path = os.path.join(tempfile.mkdtemp(prefix='vch-quotes-'), 'quotes.db')
+    app = load_app(f'sqlite:///{path}')
+    print(f'Seeding {path}...', file=sys.stderr)
+    seed(app, args)
+
+    from app import pricing
+    from models import db, Car
+    from pricing import np
+
+    with app.app_context():
+        cars = db.session.query(Car.id, Car.daily_rate).order_by(Car.id).all()
+    car_ids = [car_id for car_id, _ in cars]
+    rates = [rate for _, rate in cars]
+    rng = random.Random(args.seed)
+    cases = {'1 range': make_ranges(rng, 1), f'{args.ranges} ranges': make_ranges(rng, args.ranges)}
+    client = app.test_client()
+
+    report = {'cars': len(rates), 'numpy': np.__version__ if np else None, 'results': {}}
+    backends = ['numpy', 'python'] if np else ['python']
+    for backend in backends:
+        pricing.use_numpy = backend == 'numpy'
+        for name, ranges in cases.items():
+            body = {'ranges': [{'pickup_date': p.isoformat(), 'return_date': r.isoformat()} for p, r in ranges]}
+            # Every car, not only the Available ones the listing filters to
+            body['car_ids'] = car_ids
+            client.post('/api/quotes', json=body)
+            result = {
+                'pricing': timed(lambda: pricing.quote(rates, ranges), args.repeat),
+                'endpoint': timed(lambda: client.post('/api/quotes', json=body), args.repeat),
+            }
+            report['results'][f'{backend}, {name}'] = result
+            print(f"  [{backend}, {name}] pricing p50 {result['pricing']['p50_ms']}ms, "
+                  f"endpoint p50 {result['endpoint']['p50_ms']}ms p99 {result['endpoint']['p99_ms']}ms",
+                  file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Rate limiter overhead benchmark.
+
+Times a single bucket check for the in-memory store and the shared SQLite
+store (over --keys distinct clients), then the whole-request overhead: a
+trivial route with and without the rate_limited decorator through the test
+client. Finally runs --processes processes against one SQLite store at once,
+the way gunicorn workers share it, and reports checks per second.
+
+    python benchmarks/rate_limiting.py --requests 20000 --processes 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# High enough that no check is ever refused; we time the accounting itself
+RATE = '1000000/second'
+
+
+def load_app(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+    return app
+
+
+def time_checks(store, keys, requests):
+    # Microseconds per check
+    sys.path.insert(0, BACKEND_DIR)
+    from ratelimit import parse_rate
+
+    capacity, refill = parse_rate(RATE)
+    started = time.perf_counter()
+    for i in range(requests):
+        store.hit(f'bench:ip:{i % keys}', capacity, refill)
+    return round((time.perf_counter() - started) / requests * 1e6, 2)
+
+
+def shared_worker(path, keys, requests, results):
+    sys.path.insert(0, BACKEND_DIR)
+    from ratelimit import SQLiteStore
+
+    started = time.perf_counter()
+    time_checks(SQLiteStore(path), keys, requests)
+    results.put(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=1000, help='distinct clients')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vch-ratelimit-')
+    app = load_app(f"sqlite:///{os.path.join(directory, 'ratelimit.db')}")
+    from flask import jsonify
+    from ratelimit import MemoryStore, SQLiteStore, RateLimiter, rate_limited
+
+    report = {'requests': args.requests, 'keys': args.keys, 'check_us': {}, 'route_p50_us': {}}
+    report['check_us']['memory'] = time_checks(MemoryStore(), args.keys, args.requests)
+    report['check_us']['sqlite'] = time_checks(SQLiteStore(os.path.join(directory, 'buckets.db')),
+                                               args.keys, args.requests)
+    print(f"  check: memory {report['check_us']['memory']}us, sqlite {report['check_us']['sqlite']}us",
+          file=sys.stderr)
+
+    # Same trivial view, bare and behind each store
+    def ping():
+        return jsonify({'ok': True})
+
+    app.add_url_rule('/bench/plain', 'bench_plain', ping)
+    limiters = {'memory': RateLimiter(), 'sqlite': RateLimiter()}
+    limiters['sqlite'].store = SQLiteStore(os.path.join(directory, 'route-buckets.db'))
+    for name, limiter in limiters.items():
+        app.add_url_rule(f'/bench/{name}', f'bench_{name}', rate_limited(limiter, RATE)(ping))
+
+    client = app.test_client()
+    for name in ('plain', 'memory', 'sqlite'):
+        samples = []
+        for i in range(args.requests // 4):
+            started = time.perf_counter()
+            client.get(f'/bench/{name}', environ_base={'REMOTE_ADDR': f'10.0.{i % args.keys // 256}.{i % 256}'})
+            samples.append((time.perf_counter() - started) * 1e6)
+        report['route_p50_us'][name] = round(statistics.median(samples), 1)
+    for name in ('memory', 'sqlite'):
+        report['route_p50_us'][f'{name}_overhead'] = round(
+            report['route_p50_us'][name] - report['route_p50_us']['plain'], 1)
+    print(f"  route p50: {report['route_p50_us']}", file=sys.stderr)
+
+    # Several processes sharing one bucket file
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    path = os.path.join(directory, 'shared-buckets.db')
+    SQLiteStore(path).hit('warmup', 1, 1)
+    processes = [ctx.Process(target=shared_worker, args=(path, args.keys, args.requests, results))
+                 for _ in range(args.processes)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    report['shared_sqlite'] = {
+        'processes': args.processes,
+        'checks_per_s': round(args.processes * args.requests / elapsed),
+        'slowest_process_s': round(max(results.get() for _ in processes), 2),
+    }
+    print(f"  shared sqlite x{args.processes}: {report['shared_sqlite']['checks_per_s']} checks/s",
+          file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""SQLite reader/writer contention benchmark.
+
+Seeds a dataset (see endpoints.py) and copies it once per profile: 'legacy'
+(rollback journal, synchronous=FULL, small page cache, the driver's 5s lock
+timeout: the settings before db_profile.py) and 'wal' (its defaults). For each profile one writer process runs
+large write transactions back to back while --readers processes drive the
+car listing and detail routes through the test client. Reports reader p50/p99
+latency and reads/s, "database is locked" errors on either side, and writer
+commits/s as JSON.
+
+    python benchmarks/sqlite_concurrency.py --readers 4 --duration 10 --output sqlite.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+from endpoints import load_app, seed, summarize
+
+PROFILES = {
+    'legacy': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT': '5000',
+               'SQLITE_CACHE_SIZE': '-2000', 'SQLITE_MMAP_SIZE': '0'},
+    'wal': {},
+}
+CATEGORIES = ['SUV', 'Sedan', 'Compact', 'Luxury', 'Van', 'Pickup']
+
+
+def profile_app(database_url, profile):
+    for key in PROFILES['legacy']:
+        os.environ.pop(key, None)
+    os.environ.update(PROFILES[profile])
+    return load_app(database_url, no_cache=True)
+
+
+def reader(database_url, profile, start_at, stop_at, cars, seed_value, results):
+    app = profile_app(database_url, profile)
+    client = app.test_client()
+    rng = random.Random(seed_value)
+    latencies, statuses, locked = [], {}, 0
+    while time.time() < start_at:
+        time.sleep(0.01)
+    while time.time() < stop_at:
+        if rng.random() < 0.5:
+            path = f'/api/cars?category={rng.choice(CATEGORIES)}'
+        else:
+            path = f'/api/cars/{rng.randint(1, cars)}'
+        started = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 500 and 'locked' in response.get_data(as_text=True):
+            locked += 1
+    results.put(('reader', latencies, statuses, locked))
+
+
+def writer(database_url, profile, start_at, stop_at, rows, cars, results):
+    # Each transaction rewrites `rows` cars, touching most pages of the table
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    app = profile_app(database_url, profile)
+    from concurrency import is_locked
+    from models import db
+
+    commits, locked = 0, 0
+    while time.time() < start_at:
+        time.sleep(0.01)
+    with app.app_context():
+        offset = 0
+        while time.time() < stop_at:
+            try:
+                db.session.execute(
+                    text('UPDATE cars SET daily_rate = daily_rate + 0 WHERE id > :low AND id <= :high'),
+                    {'low': offset, 'high': offset + rows}
+                )
+                db.session.commit()
+                commits += 1
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_locked(e):
+                    raise
+                locked += 1
+            offset = (offset + rows) % cars
+    results.put(('writer', commits, locked))
+
+
+def run_profile(database_url, profile, args):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    # Processes import the app first; the clock starts once they all could have
+    start_at = time.time() + args.warmup
+    stop_at = start_at + args.duration
+    processes = [ctx.Process(target=writer, args=(database_url, profile, start_at, stop_at, args.rows,
+                                                   args.cars, results))]
+    processes += [ctx.Process(target=reader, args=(database_url, profile, start_at, stop_at, args.cars,
+                                                   args.seed + i, results))
+                  for i in range(args.readers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies, statuses, reader_locked = [], {}, 0
+    report = {}
+    for outcome in outcomes:
+        if outcome[0] == 'writer':
+            _, commits, locked = outcome
+            report['writer'] = {'commits_per_s': round(commits / args.duration, 1), 'locked_errors': locked}
+        else:
+            _, samples, codes, locked = outcome
+            latencies.extend(samples)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+            reader_locked += locked
+    report['readers'] = summarize(latencies, statuses, args.duration)
+    report['readers']['locked_errors'] = reader_locked
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--owners', type=int, default=50)
+    parser.add_argument('--renters', type=int, default=200)
+    parser.add_argument('--cars', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--favorites', type=int, default=1000)
+    parser.add_argument('--readers', type=int, default=4, help='reader processes')
+    parser.add_argument('--rows', type=int, default=2000, help='cars rewritten per write transaction')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per profile')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds allowed for process startup')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vch-sqlite-')
+    template = os.path.join(directory, 'template.db')
+    app = profile_app(f'sqlite:///{template}', 'legacy')
+    print(f'Seeding {template}...', file=sys.stderr)
+    seed(app, args)
+    with app.app_context():
+        from models import db
+        db.engine.dispose()
+
+    report = {'readers': args.readers, 'rows_per_write': args.rows, 'duration_s': args.duration, 'results': {}}
+    for profile in PROFILES:
+        path = os.path.join(directory, f'{profile}.db')
+        shutil.copyfile(template, path)
+        if profile == 'wal':
+            # Switch the copy up front rather than racing the first connections
+            connection = sqlite3.connect(path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.close()
+        result = run_profile(f'sqlite:///{path}', profile, args)
+        report['results'][profile] = result
+        print(f"  [{profile}] readers p50 {result['readers']['p50_ms']}ms, p99 {result['readers']['p99_ms']}ms, "
+              f"{result['readers']['throughput_rps']} reads/s, {result['readers']['locked_errors']} locked; "
+              f"writer {result['writer']['commits_per_s']} commits/s, {result['writer']['locked_errors']} locked",
+              file=sys.stderr)
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Wrote {args.output}', file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
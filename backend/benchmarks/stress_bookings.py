@@ -0,0 +1,148 @@
+"""Multi-process booking stress test.
+
+Runs several worker processes against one SQLite database, each posting
+bookings for the same few cars through its own copy of the Flask app, the way
+gunicorn workers would. Afterwards it checks that no car is double-booked and
+that the per-car booking/earnings counters match the bookings table.
+
+    python benchmarks/stress_bookings.py --workers 8 --requests 200
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    # Measure the routes, not the rate limiter
+    os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+    return app
+
+
+def seed(database_url, cars, renters):
+    app = load_app(database_url)
+    from models import db, User, Car
+
+    with app.app_context():
+        db.create_all()
+        owner = User(full_name='Stress Owner', email='owner@stress.test', phone='0', user_type='owner')
+        owner.password_hash = 'x'
+        db.session.add(owner)
+        db.session.flush()
+        for i in range(renters):
+            renter = User(full_name=f'Renter {i}', email=f'renter{i}@stress.test', phone='0', user_type='renter')
+            renter.password_hash = 'x'
+            db.session.add(renter)
+        for i in range(cars):
+            db.session.add(Car(owner_id=owner.id, name=f'Car {i}', brand='Toyota', model_year=2024,
+                               category='SUV', daily_rate=1000, location='Garissa'))
+        db.session.commit()
+        renter_ids = [u.id for u in User.query.filter_by(user_type='renter')]
+        car_ids = [c.id for c in Car.query]
+    return renter_ids, car_ids
+
+
+def worker(database_url, renter_ids, car_ids, requests, seed_value, results):
+    app = load_app(database_url)
+    from flask_jwt_extended import create_access_token
+
+    rng = random.Random(seed_value)
+    with app.app_context():
+        tokens = {uid: create_access_token(identity=uid, additional_claims={'user_type': 'renter'}) for uid in renter_ids}
+    client = app.test_client()
+    base = datetime(2030, 1, 1)
+
+    counts = {}
+    for _ in range(requests):
+        # Few cars and a narrow date window, so most requests collide
+        pickup = base + timedelta(days=rng.randrange(60))
+        response = client.post('/api/bookings', json={
+            'car_id': rng.choice(car_ids),
+            'pickup_date': pickup.isoformat(),
+            'return_date': (pickup + timedelta(days=rng.randint(1, 4))).isoformat(),
+            'pickup_location': 'Garissa'
+        }, headers={'Authorization': f'Bearer {tokens[rng.choice(renter_ids)]}'})
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+    results.put(counts)
+
+
+def verify(database_url):
+    app = load_app(database_url)
+    from models import Car, Booking
+
+    problems = []
+    with app.app_context():
+        for car in Car.query:
+            bookings = Booking.query.filter(
+                Booking.car_id == car.id, Booking.status != 'Cancelled'
+            ).order_by(Booking.pickup_date).all()
+            for previous, current in zip(bookings, bookings[1:]):
+                if current.pickup_date < previous.return_date:
+                    problems.append(f'car {car.id}: bookings {previous.id} and {current.id} overlap')
+            if car.total_bookings != len(bookings):
+                problems.append(f'car {car.id}: total_bookings={car.total_bookings}, actual={len(bookings)}')
+            earnings = sum(b.total_amount for b in bookings)
+            if abs(car.total_earnings - earnings) > 0.01:
+                problems.append(f'car {car.id}: total_earnings={car.total_earnings}, actual={earnings}')
+        total = Booking.query.count()
+    return total, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help='bookings attempted per worker')
+    parser.add_argument('--cars', type=int, default=3)
+    parser.add_argument('--renters', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='vch-stress-')
+    database_url = f"sqlite:///{os.path.join(directory, 'stress.db')}"
+
+    ctx = multiprocessing.get_context('spawn')
+    setup = ctx.Pool(1)
+    renter_ids, car_ids = setup.apply(seed, (database_url, args.cars, args.renters))
+    setup.close()
+
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(database_url, renter_ids, car_ids, args.requests, i, results))
+        for i in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    counts = {}
+    for _ in processes:
+        for status, count in results.get().items():
+            counts[status] = counts.get(status, 0) + count
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    checker = ctx.Pool(1)
+    total, problems = checker.apply(verify, (database_url,))
+    checker.close()
+
+    print(f'{args.workers} workers x {args.requests} requests in {elapsed:.1f}s')
+    print(f'responses by status: {dict(sorted(counts.items()))}')
+    print(f'bookings stored: {total}')
+    if problems:
+        print('FAILED:')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1)
+    print('OK: no double bookings, no lost counter updates')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, request, current_app
+
+
+class CacheEntry:
+    def __init__(self, version, body, etag):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    # Bounded LRU of serialized responses, tagged with a catalogue version.
+    # Writes bump the version, which makes every older entry stale at once.
+    # With a version_file the version is that file's mtime, so a write in one
+    # gunicorn worker invalidates every worker's entries; without one it is
+    # per process. Entries also expire after `ttl` seconds either way.
+
+    def __init__(self, max_entries=512, ttl=30, version_file=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_file = version_file
+        self._local_version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        if self.version_file is None:
+            return self._local_version
+        try:
+            return os.stat(self.version_file).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def make_key(path, args):
+        # Normalize filters: drop empty values and ignore parameter order
+        params = sorted((k, v) for k, values in args.lists() for v in values if v != '')
+        return (path, tuple(params))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != self.version or time.monotonic() - entry.stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, version):
+        entry = CacheEntry(version, body, hashlib.sha1(body).hexdigest())
+        with self._lock:
+            # Skip responses built while a write was bumping the version
+            if version != self.version:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def bump(self):
+        with self._lock:
+            if self.version_file is not None:
+                # Set the mtime explicitly: coarse filesystem timestamps could
+                # leave two writes in a row with the same version
+                version = max(time.time_ns(), self.version + 1)
+                os.makedirs(os.path.dirname(os.path.abspath(self.version_file)), exist_ok=True)
+                with open(self.version_file, 'a'):
+                    pass
+                os.utime(self.version_file, ns=(version, version))
+            self._local_version += 1
+            self._entries.clear()
+
+
+def cached_response(cache):
+    # Serve anonymous GET views from `cache`, answering If-None-Match with 304
+    # so repeat polling never reaches the view or the database. A request
+    # ReplicaRouter pinned to the primary (its client just wrote) skips the
+    # cache, whose entries may have been filled from a lagging replica.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if g.get('use_replica') is False:
+                return view(*args, **kwargs)
+            key = cache.make_key(request.path, request.args)
+            entry = cache.get(key)
+
+            if entry is None:
+                version = cache.version
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = cache.set(key, response.get_data(), version)
+
+            if request.if_none_match.contains(entry.etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.response_class(entry.body, mimetype='application/json')
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
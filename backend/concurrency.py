@@ -0,0 +1,47 @@
+import random
+import time
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import db
+
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.01
+
+
+class ConcurrencyConflict(Exception):
+    pass
+
+
+def is_locked(error):
+    # A SQLite writer that gave up waiting for the lock (busy_timeout ran out,
+    # or a read transaction couldn't be upgraded to a write)
+    return isinstance(error, OperationalError) and 'locked' in str(error.orig)
+
+
+def is_conflict(error):
+    # Optimistic version mismatch, a racing insert on a unique key, or lock
+    # contention
+    if isinstance(error, StaleDataError):
+        return True
+    if isinstance(error, IntegrityError):
+        message = str(error.orig).lower()
+        return 'unique' in message or 'duplicate' in message
+    return is_locked(error)
+
+
+def run_with_retry(unit_of_work, attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, retry_if=is_conflict):
+    # Run a read-check-write transaction, rolling back and re-running it from
+    # scratch with jittered exponential backoff when it loses a race. Plain
+    # writes pass retry_if=is_locked so a unique violation still surfaces.
+    for attempt in range(attempts):
+        try:
+            return unit_of_work()
+        except (StaleDataError, IntegrityError, OperationalError) as e:
+            db.session.rollback()
+            if not retry_if(e):
+                raise
+            if attempt == attempts - 1:
+                raise ConcurrencyConflict('Too many concurrent updates, please retry') from e
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
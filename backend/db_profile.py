@@ -0,0 +1,92 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Connection-time settings for file-backed SQLite. WAL lets readers keep
+# reading while a writer commits; synchronous=NORMAL skips an fsync per
+# commit and in WAL mode never corrupts the file (a power cut can lose the
+# last few commits); busy_timeout makes a writer wait for the lock instead of
+# failing with "database is locked".
+SQLITE_DEFAULTS = {
+    'busy_timeout': 5000,       # ms; first, so switching to WAL waits too
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,       # KiB when negative: 64 MiB per connection
+    'mmap_size': 268435456,     # 256 MiB of the file read through mmap
+    'temp_store': 'MEMORY',
+}
+SQLITE_CONFIG = {
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT',
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'cache_size': 'SQLITE_CACHE_SIZE',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+}
+
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+POOL_RECYCLE = 1800
+POOL_TIMEOUT = 30
+
+
+def is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def sqlite_pragmas(config):
+    pragmas = dict(SQLITE_DEFAULTS)
+    for pragma, key in SQLITE_CONFIG.items():
+        if config.get(key) is not None:
+            pragmas[pragma] = config[key]
+    return pragmas
+
+
+def engine_options(url, config):
+    # Pool settings for the backend behind `url`. Server databases get a
+    # sized pool that recycles connections before the server drops them and
+    # pings them on checkout; SQLite files get a pool sized for the worker's
+    # threads. In-memory SQLite keeps SQLAlchemy's single-connection pool.
+    url = make_url(url)
+    if is_memory_sqlite(url):
+        return {}
+    options = {
+        'pool_size': config.get('DB_POOL_SIZE') or POOL_SIZE,
+        'max_overflow': config.get('DB_MAX_OVERFLOW', MAX_OVERFLOW),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT') or POOL_TIMEOUT,
+    }
+    if url.get_backend_name() != 'sqlite':
+        options['pool_recycle'] = config.get('DB_POOL_RECYCLE') or POOL_RECYCLE
+        options['pool_pre_ping'] = True
+    return options
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma}={value}')
+    finally:
+        cursor.close()
+
+
+class DatabaseProfile:
+    # Engine options and per-connection pragmas for the configured database.
+    # init_app() runs before db.init_app() so Flask-SQLAlchemy builds its
+    # engine with the pool options; attach() then adds the SQLite pragmas to
+    # an engine (the app's, and the async one in asgi.py).
+
+    def __init__(self, app=None):
+        self.pragmas = dict(SQLITE_DEFAULTS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.pragmas = sqlite_pragmas(app.config)
+        options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+        # Explicit SQLALCHEMY_ENGINE_OPTIONS win over the profile
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    def attach(self, engine):
+        if engine.dialect.name != 'sqlite' or is_memory_sqlite(engine.url):
+            return
+        event.listen(engine, 'connect', lambda dbapi_connection, record: apply_pragmas(dbapi_connection, self.pragmas))
@@ -0,0 +1,156 @@
+import codecs
+import csv
+import json
+
+from models import db, Car, CarFeature
+from search import uses_fts, index_cars
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_FIELDS = {
+    'name': str,
+    'brand': str,
+    'model_year': int,
+    'category': str,
+    'daily_rate': float,
+    'location': str,
+}
+
+OPTIONAL_FIELDS = {
+    'transmission': str,
+    'seats': int,
+    'fuel_type': str,
+    'luggage': int,
+    'description': str,
+    'image_url': str,
+}
+
+
+def iter_lines(stream, chunk_size=64 * 1024):
+    # Decode an upload into lines a chunk at a time. Only needs read(), so it
+    # works on gunicorn's wsgi.input as well as werkzeug's wrapped streams.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        lines = (pending + decoder.decode(chunk, final=not chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+        if not chunk:
+            if pending:
+                yield pending
+            return
+
+
+def iter_rows(stream, fmt):
+    # Yield (row_number, dict or parse error) one line at a time, never
+    # holding more than the current row of the upload in memory
+    text = iter_lines(stream)
+
+    if fmt == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, row
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, ValueError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield row_number, ValueError('Each line must be a JSON object')
+            continue
+        yield row_number, row
+
+
+def validate_car_row(row):
+    # Returns (car values, features, errors)
+    values = {}
+    errors = []
+
+    for fields, required in ((REQUIRED_FIELDS, True), (OPTIONAL_FIELDS, False)):
+        for field, cast in fields.items():
+            raw = row.get(field)
+            if raw is None or (isinstance(raw, str) and not raw.strip()):
+                if required:
+                    errors.append(f'{field} is required')
+                continue
+            try:
+                values[field] = cast(raw.strip() if isinstance(raw, str) else raw)
+            except (TypeError, ValueError):
+                errors.append(f'{field} must be {cast.__name__}')
+
+    if 'daily_rate' in values and values['daily_rate'] <= 0:
+        errors.append('daily_rate must be positive')
+
+    # CSV carries features as "AC|GPS|Bluetooth", NDJSON as a list
+    features = row.get('features') or []
+    if isinstance(features, str):
+        features = features.split('|')
+    if not isinstance(features, list):
+        errors.append('features must be a list')
+        features = []
+    features = [str(f).strip() for f in features if str(f).strip()]
+
+    return values, features, errors
+
+
+def _insert_batch(owner_id, batch):
+    cars = [dict(values, owner_id=owner_id) for values, _ in batch]
+    # One multi-row INSERT per batch. Rows get ascending ids in VALUES order,
+    # so sorting the returned ids lines them up with the batch; asking the
+    # driver to sort would make SQLite fall back to one INSERT per row.
+    car_ids = sorted(db.session.execute(db.insert(Car).returning(Car.id), cars).scalars().all())
+
+    feature_rows = [
+        {'car_id': car_id, 'feature': feature}
+        for car_id, (_, features) in zip(car_ids, batch)
+        for feature in features
+    ]
+    if feature_rows:
+        db.session.execute(db.insert(CarFeature), feature_rows)
+
+    # Core inserts skip the ORM flush hook, so index the new cars directly
+    connection = db.session.connection()
+    if uses_fts(connection):
+        index_cars(connection, car_ids)
+
+    db.session.commit()
+    return len(car_ids)
+
+
+def import_cars(owner_id, rows, batch_size=BATCH_SIZE):
+    # Insert valid rows in executemany batches, one transaction per batch
+    report = {'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    batch = []
+
+    for row_number, row in rows:
+        if isinstance(row, Exception):
+            values, features, errors = None, None, [str(row)]
+        else:
+            values, features, errors = validate_car_row(row)
+
+        if errors:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'row': row_number, 'errors': errors})
+            else:
+                report['errors_truncated'] = True
+            continue
+
+        batch.append((values, features))
+        if len(batch) >= batch_size:
+            report['imported'] += _insert_batch(owner_id, batch)
+            batch = []
+
+    if batch:
+        report['imported'] += _insert_batch(owner_id, batch)
+
+    return report
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from models import db, User
+
+
+class UserCache:
+    # Bounded LRU of user roles by id, so authorization checks for tokens
+    # without a role claim skip the users table. Entries are dropped when a
+    # User row is updated or deleted in this process; the TTL bounds how long
+    # another gunicorn worker's change can go unseen.
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user_type, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user_type
+
+    def set(self, user_id, user_type):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (user_type, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def user_type(self, user_id):
+        # Cached role, loading it on a miss; None if the user doesn't exist
+        user_type = self.get(user_id)
+        if user_type is None:
+            user_type = db.session.query(User.user_type).filter_by(id=user_id).scalar()
+            if user_type is not None:
+                self.set(user_id, user_type)
+        return user_type
+
+    def watch(self):
+        # Forget users as soon as their row changes
+        event.listen(User, 'after_update', lambda mapper, connection, user: self.invalidate(user.id))
+        event.listen(User, 'after_delete', lambda mapper, connection, user: self.invalidate(user.id))
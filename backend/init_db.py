@@ -1,13 +1,36 @@
 from app import app, db
-from models import User, Car, Booking, Review, Favorite, PaymentMethod, CarFeature
-from datetime import datetime, timedelta
+from models import User, Car, Booking, Review, Favorite, PaymentMethod, CarFeature, EarningsRollup
+from search import rebuild_index as rebuild_search_index
+from flask_migrate import stamp
+from passwords import hasher
+from datetime import date, datetime, timedelta
+import argparse
+import random
+import time
+
+# Row volumes generated per unit of --scale
+SCALE_UNIT = {
+    'owners': 100,
+    'renters': 2000,
+    'cars': 1000,
+    'bookings': 50000,
+    'reviews': 20000,
+    'favorites': 10000,
+}
+CHUNK_SIZE = 10000
+
+def recreate_schema():
+    # Build the current schema directly and mark it as migrated, so later
+    # `flask db upgrade` runs only apply newer migrations
+    db.drop_all()
+    db.create_all()
+    stamp()
 
 def init_database():
     with app.app_context():
         # Drop all tables and recreate
         print("Creating database tables...")
-        db.drop_all()
-        db.create_all()
+        recreate_schema()
         
         # Create sample users
         print("Creating sample users...")
@@ -259,15 +282,17 @@ def init_database():
         ]
         
         for booking_data in bookings_data:
-            booking = Booking(**booking_data)
+            car = Car.query.get(booking_data["car_id"])
+            booking = Booking(**booking_data, owner_id=car.owner_id)
             db.session.add(booking)
             
             # Update car stats for completed bookings
             if booking.status == "Completed":
-                car = Car.query.get(booking.car_id)
                 car.total_bookings += 1
                 car.total_earnings += booking.total_amount
         
+        db.session.flush()
+        EarningsRollup.rebuild()
         db.session.commit()
         
         print("Creating sample reviews...")
@@ -298,6 +323,8 @@ def init_database():
             review = Review(**review_data)
             db.session.add(review)
         
+        db.session.flush()
+        Car.rebuild_rating_aggregates()
         db.session.commit()
         
         print("Creating sample favorites...")
@@ -364,5 +391,203 @@ def init_database():
         print()
 
 
+def insert_rows(table, rows):
+    # Bulk Core insert (executemany) in fixed-size chunks from any iterable,
+    # on the session's connection so the ORM layer is bypassed entirely
+    connection = db.session.connection()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            connection.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        connection.execute(table.insert(), chunk)
+
+
+def generate_dataset(owners, renters, cars, bookings, reviews, favorites, seed=42, anchor=None):
+    # Generate a large synthetic dataset with bulk Core inserts. Output is
+    # deterministic for a given seed and anchor date. Returns the owner and
+    # renter id ranges.
+    rng = random.Random(seed)
+    if anchor is None:
+        anchor = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    # Hash once; hashing per user would dominate generation time. The salt
+    # comes from the seed so the hash is as reproducible as everything else.
+    password_hash = hasher.hash("password123", salt=f"seed{seed:012d}")
+    
+    owner_ids = range(1, owners + 1)
+    renter_ids = range(owners + 1, owners + renters + 1)
+    
+    def users():
+        for user_id in owner_ids:
+            yield {"id": user_id, "full_name": f"Owner {user_id}", "email": f"owner{user_id}@scale.vantage.test",
+                   "phone": f"+2547{user_id:08d}", "password_hash": password_hash, "user_type": "owner",
+                   "location": "Garissa, Kenya", "created_at": anchor - timedelta(days=rng.randint(400, 1500))}
+        for user_id in renter_ids:
+            yield {"id": user_id, "full_name": f"Renter {user_id}", "email": f"renter{user_id}@scale.vantage.test",
+                   "phone": f"+2547{user_id:08d}", "password_hash": password_hash, "user_type": "renter",
+                   "location": "Garissa, Kenya", "created_at": anchor - timedelta(days=rng.randint(1, 1500))}
+    
+    insert_rows(User.__table__, users())
+    
+    brands = {
+        "Toyota": ["Land Cruiser", "Prado", "Corolla", "Hilux", "RAV4"],
+        "Nissan": ["X-Trail", "Note", "Navara", "Patrol"],
+        "Mercedes-Benz": ["E-Class", "C-Class", "GLE"],
+        "Subaru": ["Forester", "Outback", "Impreza"],
+        "Mazda": ["CX-5", "Demio", "Axela"],
+        "Honda": ["Fit", "CR-V", "Vezel"],
+    }
+    categories = ["SUV", "Sedan", "Compact", "Luxury", "Van", "Pickup"]
+    locations = ["Garissa Town Center", "Garissa Airport", "Madogo", "Bura", "Dadaab", "Hola"]
+    all_features = ["GPS Navigation", "Bluetooth", "Backup Camera", "Sunroof", "Leather Seats", "4WD",
+                    "Air Conditioning", "USB Ports", "Cruise Control", "Heated Seats", "Apple CarPlay",
+                    "Parking Sensors", "Third Row Seating", "Roof Rails", "Wireless Charging"]
+    
+    # Spread bookings over cars: every car gets the base share, some get one more
+    per_car, extra = divmod(bookings, cars) if cars else (0, 0)
+    extra_cars = set(rng.sample(range(1, cars + 1), extra)) if cars else set()
+    # Roughly three quarters of bookings end up completed, and only those get reviewed
+    review_probability = min(1.0, reviews / (bookings * 0.75)) if bookings else 0
+    
+    booking_id = 0
+    review_id = 0
+    counts = {"features": 0, "bookings": 0, "reviews": 0}
+    
+    # Generate cars a chunk at a time along with their features, bookings and
+    # reviews, so memory stays bounded by the chunk rather than the dataset
+    for chunk_start in range(1, cars + 1, CHUNK_SIZE // 10):
+        car_rows, feature_rows, booking_rows, review_rows = [], [], [], []
+        
+        for car_id in range(chunk_start, min(chunk_start + CHUNK_SIZE // 10, cars + 1)):
+            brand = rng.choice(list(brands))
+            daily_rate = float(rng.randrange(2500, 25000, 500))
+            car = {"id": car_id, "owner_id": rng.choice(owner_ids), "name": f"{brand} {rng.choice(brands[brand])}",
+                   "brand": brand, "model_year": rng.randint(2012, 2025), "category": rng.choice(categories),
+                   "daily_rate": daily_rate, "location": rng.choice(locations),
+                   "transmission": rng.choice(["Automatic", "Manual"]), "seats": rng.choice([2, 4, 5, 7, 8]),
+                   "fuel_type": rng.choice(["Petrol", "Diesel", "Hybrid"]), "luggage": rng.randint(1, 6),
+                   "description": f"Well maintained {brand} available for hire in Garissa.",
+                   "status": "Available", "total_bookings": 0, "total_earnings": 0.0, "version": 1,
+                   "created_at": anchor - timedelta(days=rng.randint(365, 1200), seconds=car_id)}
+            
+            for feature in rng.sample(all_features, rng.randint(2, 6)):
+                feature_rows.append({"car_id": car_id, "feature": feature})
+            
+            # Bookings follow one another along the car's timeline, so no two
+            # overlap; the chain starts in the past and runs into the future
+            n = per_car + (1 if car_id in extra_cars else 0)
+            cursor = anchor - timedelta(days=int(n * 6 * 0.85), hours=rng.randrange(24))
+            for _ in range(n):
+                pickup = cursor + timedelta(days=rng.randint(0, 4), hours=rng.randrange(12))
+                days = rng.randint(1, 7)
+                return_date = pickup + timedelta(days=days)
+                cursor = return_date
+                
+                if return_date <= anchor:
+                    status = "Cancelled" if rng.random() < 0.08 else "Completed"
+                elif pickup <= anchor:
+                    status = "Active"
+                    car["status"] = "Rented"
+                else:
+                    status = "Cancelled" if rng.random() < 0.05 else "Confirmed"
+                
+                booking_id += 1
+                amount = daily_rate * days
+                created_at = min(pickup, anchor) - timedelta(days=rng.randint(1, 30), minutes=rng.randrange(1440))
+                booking_rows.append({"id": booking_id, "user_id": rng.choice(renter_ids), "car_id": car_id,
+                                     "owner_id": car["owner_id"], "pickup_date": pickup, "return_date": return_date,
+                                     "pickup_location": car["location"], "total_amount": amount, "status": status,
+                                     "payment_status": "Refunded" if status == "Cancelled" else "Paid",
+                                     "created_at": created_at, "updated_at": created_at})
+                if status != "Cancelled":
+                    car["total_bookings"] += 1
+                    car["total_earnings"] += amount
+                
+                # Renters review cars after completed rentals
+                if status == "Completed" and rng.random() < review_probability:
+                    review_id += 1
+                    review_rows.append({"id": review_id, "user_id": booking_rows[-1]["user_id"], "car_id": car_id,
+                                        "rating": float(rng.choices([1, 2, 3, 4, 5], weights=[2, 3, 10, 35, 50])[0]),
+                                        "comment": rng.choice(["Great car!", "Clean and reliable.", "Smooth ride.",
+                                                               "Would rent again.", "Good value for money."]),
+                                        "created_at": return_date + timedelta(hours=rng.randint(1, 72))})
+            
+            car_rows.append(car)
+        
+        insert_rows(Car.__table__, car_rows)
+        insert_rows(CarFeature.__table__, feature_rows)
+        insert_rows(Booking.__table__, booking_rows)
+        insert_rows(Review.__table__, review_rows)
+        counts["features"] += len(feature_rows)
+        counts["bookings"] += len(booking_rows)
+        counts["reviews"] += len(review_rows)
+    
+    # Favorites are unique (renter, car) pairs
+    favorite_count = min(favorites, renters * cars)
+    
+    def favorite_rows():
+        seen = set()
+        while len(seen) < favorite_count:
+            pair = (rng.choice(renter_ids), rng.randint(1, cars))
+            if pair not in seen:
+                seen.add(pair)
+                yield {"user_id": pair[0], "car_id": pair[1],
+                       "created_at": anchor - timedelta(days=rng.randint(0, 365), seconds=len(seen))}
+    
+    insert_rows(Favorite.__table__, favorite_rows())
+    counts["favorites"] = favorite_count
+    
+    # Derived data: rating aggregates, earnings rollups and the search index
+    Car.rebuild_rating_aggregates()
+    EarningsRollup.rebuild()
+    rebuild_search_index()
+    db.session.commit()
+    
+    return owner_ids, renter_ids, counts
+
+
+def init_scaled_database(scale, seed, anchor=None):
+    # anchor is the date bookings are laid out around (default today): the
+    # same seed and anchor give the same dataset
+    anchor = anchor or datetime.utcnow().date()
+    with app.app_context():
+        print(f"Creating database tables for a scale {scale} dataset (seed {seed}, anchor {anchor})...")
+        recreate_schema()
+        
+        volumes = {name: max(1, int(count * scale)) for name, count in SCALE_UNIT.items()}
+        started = time.perf_counter()
+        owner_ids, renter_ids, counts = generate_dataset(
+            seed=seed, anchor=datetime.combine(anchor, datetime.min.time()), **volumes
+        )
+        elapsed = time.perf_counter() - started
+        
+        print(f"\n✅ Generated in {elapsed:.1f}s")
+        print("\n📊 Summary:")
+        print(f"  - Users: {len(owner_ids) + len(renter_ids)} ({len(renter_ids)} renters, {len(owner_ids)} owners)")
+        print(f"  - Cars: {volumes['cars']}")
+        print(f"  - Car Features: {counts['features']}")
+        print(f"  - Bookings: {counts['bookings']}")
+        print(f"  - Reviews: {counts['reviews']}")
+        print(f"  - Favorites: {counts['favorites']}")
+        print("\n🔑 Every generated account uses the password: password123")
+        print(f"    e.g. owner1@scale.vantage.test, renter{len(owner_ids) + 1}@scale.vantage.test")
+        print()
+
+
 if __name__ == '__main__':
-    init_database()
+    parser = argparse.ArgumentParser(description="Initialize the Vantage Car Hire database")
+    parser.add_argument("--scale", type=float,
+                        help="generate a synthetic dataset instead of the sample data; "
+                             "1.0 = 1k cars, 50k bookings, 20k reviews")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for --scale (default: 42)")
+    parser.add_argument("--anchor", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="'today' for --scale: bookings before it are past, after it upcoming "
+                             "(default: today; fix it for identical datasets on any day)")
+    args = parser.parse_args()
+    
+    if args.scale:
+        init_scaled_database(args.scale, args.seed, args.anchor)
+    else:
+        init_database()
@@ -0,0 +1,75 @@
+import decimal
+from datetime import date, datetime, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    # Serializers hand over raw datetimes; encode them as ISO 8601 strings
+    # (Flask's default would use RFC 822 dates)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+def _orjson_default(o):
+    # orjson handles datetimes, dataclasses and UUIDs itself
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Encodes responses with orjson: datetimes, floats and nested dicts are
+    # handled in C, which matters for large list payloads. Output matches
+    # StdlibJSONProvider (sorted keys, ISO datetimes) apart from whitespace.
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Callers asking for stdlib options (indent, separators...) get stdlib
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_orjson_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_orjson_default, option=self._options())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+PROVIDERS = {'orjson': OrjsonProvider, 'stdlib': StdlibJSONProvider}
+
+
+def json_provider_class(name='auto'):
+    # 'auto' picks orjson when it is installed
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in PROVIDERS:
+        raise ValueError(f'Unknown JSON provider: {name}')
+    if name == 'orjson' and orjson is None:
+        raise ValueError('JSON_PROVIDER=orjson but orjson is not installed')
+    return PROVIDERS[name]
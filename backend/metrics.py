@@ -0,0 +1,276 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import g, request, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+FLUSH_INTERVAL = 5
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    # Per-label-set bucket counts (not cumulative) followed by the sum
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+
+class RequestMetrics:
+    # Request, SQL and connection-pool metrics in Prometheus text format.
+    # Counters live in process memory; with METRICS_DIR set every worker also
+    # writes a snapshot there from a background thread every FLUSH_INTERVAL
+    # seconds (and on scrape and exit), and a scrape sums all the snapshots.
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.requests = defaultdict(int)
+        self.db_statements = defaultdict(int)
+        self.db_time = defaultdict(float)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements_per_request = Histogram(STATEMENT_BUCKETS)
+        self.db = None
+        self._pool = {}
+        self._dirty = False
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        self.directory = app.config.get('METRICS_DIR') or self.directory
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+        self.db = db
+        app.before_request(self._start_request)
+        app.after_request(self._record_response)
+        app.teardown_request(self._record_failure)
+        _listen_for_statements()
+
+    def _start_request(self):
+        g.request_metrics = {'started': time.perf_counter(), 'statements': 0, 'db_time': 0.0, 'recorded': False}
+
+    def _record_response(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _record_failure(self, error):
+        # Unhandled exceptions skip after_request; count them as 500s
+        if error is not None:
+            self._record(500)
+
+    def _record(self, status):
+        state = g.get('request_metrics')
+        if state is None or state['recorded']:
+            return
+        state['recorded'] = True
+        elapsed = time.perf_counter() - state['started']
+        # Route templates, not raw paths, so ids don't explode the label set
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (request.method, endpoint)
+
+        with self._lock:
+            self.requests[labels + (str(status),)] += 1
+            self.db_statements[labels] += state['statements']
+            self.db_time[labels] += state['db_time']
+            self.latency.observe(labels, elapsed)
+            self.statements_per_request.observe(labels, state['statements'])
+            self._dirty = True
+        if self.directory:
+            # Refresh pool gauges for the flusher, which runs without the app
+            self.pool_stats()
+            if self._flusher_pid != os.getpid():
+                self._start_flusher()
+
+    def _start_flusher(self):
+        # One per process, started lazily so it exists in forked workers
+        self._flusher_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                if self._dirty:
+                    self.flush()
+
+        threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+    def pool_stats(self):
+        stats = {}
+        for bind_key, engine in self.db.engines.items():
+            pool = engine.pool
+            name = bind_key or 'default'
+            # Only QueuePool tracks checkouts; other pools report what they can
+            for stat in ('size', 'checkedin', 'checkedout', 'overflow'):
+                if hasattr(pool, stat):
+                    stats[f'{name}:{stat}'] = getattr(pool, stat)()
+            # QueuePool counts overflow from -size upwards
+            if f'{name}:overflow' in stats:
+                stats[f'{name}:overflow'] = max(0, stats[f'{name}:overflow'])
+        self._pool = stats
+        return stats
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'requests': [[list(k), v] for k, v in self.requests.items()],
+                'db_statements': [[list(k), v] for k, v in self.db_statements.items()],
+                'db_time': [[list(k), v] for k, v in self.db_time.items()],
+                'latency': [[list(k), v] for k, v in self.latency.series.items()],
+                'statements_per_request': [[list(k), v] for k, v in self.statements_per_request.series.items()],
+                # Engines are only reachable in an app context; the flusher
+                # thread reuses the stats from the last request
+                'pool': self.pool_stats() if has_app_context() else self._pool
+            }
+
+    def flush(self):
+        # Atomic replace, so a scrape never reads a half-written file
+        self._dirty = False
+        snapshot = self.snapshot()
+        path = os.path.join(self.directory, f"{snapshot['pid']}.json")
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def collect(self):
+        # This process's snapshot, or every worker's when METRICS_DIR is set
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        snapshots = self.collect()
+        requests = defaultdict(int)
+        db_statements = defaultdict(int)
+        db_time = defaultdict(float)
+        latency = {}
+        statements_per_request = {}
+        for snapshot in snapshots:
+            for totals, key in ((requests, 'requests'), (db_statements, 'db_statements'), (db_time, 'db_time')):
+                for labels, value in snapshot[key]:
+                    totals[tuple(labels)] += value
+            for totals, key in ((latency, 'latency'), (statements_per_request, 'statements_per_request')):
+                for labels, series in snapshot[key]:
+                    merged = totals.setdefault(tuple(labels), [0] * len(series))
+                    for i, value in enumerate(series):
+                        merged[i] += value
+
+        lines = []
+        _counter(lines, 'vantage_http_requests_total', 'HTTP requests by route and status.',
+                 ('method', 'endpoint', 'status'), requests)
+        _histogram(lines, 'vantage_http_request_duration_seconds', 'Time to build the response.',
+                   LATENCY_BUCKETS, latency)
+        _counter(lines, 'vantage_db_statements_total', 'SQL statements executed while handling requests.',
+                 ('method', 'endpoint'), db_statements)
+        _counter(lines, 'vantage_db_time_seconds_total', 'Time spent executing SQL while handling requests.',
+                 ('method', 'endpoint'), db_time)
+        _histogram(lines, 'vantage_db_statements_per_request', 'SQL statements per request.',
+                   STATEMENT_BUCKETS, statements_per_request)
+
+        # Pool gauges are per worker; files left by exited workers are skipped
+        pool_stats = defaultdict(dict)
+        for snapshot in snapshots:
+            if _alive(snapshot['pid']):
+                for key, value in snapshot['pool'].items():
+                    bind, stat = key.rsplit(':', 1)
+                    pool_stats[stat][(bind, str(snapshot['pid']))] = value
+        for stat, help_text in (('size', 'Configured pool size.'),
+                                ('checkedin', 'Idle connections in the pool.'),
+                                ('checkedout', 'Connections in use.'),
+                                ('overflow', 'Connections opened beyond the pool size.')):
+            if pool_stats[stat]:
+                _gauge(lines, f'vantage_db_pool_{stat}', help_text, ('bind', 'pid'), pool_stats[stat])
+        return '\n'.join(lines) + '\n'
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _counter(lines, name, help_text, label_names, values, metric_type='counter'):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {metric_type}')
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{{{_format_labels(label_names, labels)}}} {value}')
+
+
+def _gauge(lines, name, help_text, label_names, values):
+    _counter(lines, name, help_text, label_names, values, metric_type='gauge')
+
+
+def _histogram(lines, name, help_text, buckets, values):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, series in sorted(values.items()):
+        base = _format_labels(('method', 'endpoint'), labels)
+        cumulative = 0
+        for bound, count in zip(buckets + ('+Inf',), series[:-1]):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{base}}} {series[-1]}')
+        lines.append(f'{name}_count{{{base}}} {cumulative}')
+
+
+_listening = False
+
+
+def _listen_for_statements():
+    # Attribute every statement on any engine to the current request, if any
+    global _listening
+    if _listening:
+        return
+    _listening = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'request_metrics' in g:
+            conn.info['metrics_started'] = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('metrics_started', None)
+        if started is not None and has_request_context() and 'request_metrics' in g:
+            state = g.request_metrics
+            state['statements'] += 1
+            state['db_time'] += time.perf_counter() - started
@@ -0,0 +1,168 @@
+"""rating aggregates, earnings rollups and booking schedule index
+
+Revision ID: 0002_aggregates
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:41:17.535628
+
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_aggregates'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+MAX_REPORTED_OVERLAPS = 50
+
+
+def find_overlapping_bookings(bind):
+    # (booking id, earlier booking id, car id) for every live booking that
+    # overlaps a live booking of the same car made before it
+    bookings = sa.table(
+        'bookings', sa.column('id', sa.Integer()), sa.column('car_id', sa.Integer()),
+        sa.column('pickup_date', sa.DateTime()), sa.column('return_date', sa.DateTime()),
+        sa.column('status', sa.String())
+    )
+    schedules = defaultdict(list)
+    overlaps = []
+    for booking_id, car_id, pickup, return_date in bind.execute(
+        sa.select(bookings.c.id, bookings.c.car_id, bookings.c.pickup_date, bookings.c.return_date)
+        .where(bookings.c.status != 'Cancelled').order_by(bookings.c.id)
+    ):
+        # The schedule holds no overlaps, so sorted by pickup it is sorted by
+        # return too and only the last booking picked up before return_date
+        # can clash
+        schedule = schedules[car_id]
+        index = bisect_left(schedule, (return_date,))
+        if index and schedule[index - 1][1] > pickup:
+            overlaps.append((booking_id, schedule[index - 1][2], car_id))
+        else:
+            insort(schedule, (pickup, return_date, booking_id))
+    return overlaps
+
+
+def upgrade():
+    # Booking.find_conflict assumes live bookings of a car never overlap,
+    # which databases from before the conflict check can violate. Which
+    # booking to keep is a business decision, so stop before changing
+    # anything and list them for an operator to resolve.
+    overlaps = find_overlapping_bookings(op.get_bind())
+    if overlaps:
+        report = '; '.join(f'booking {booking_id} overlaps booking {earlier_id} (car {car_id})'
+                           for booking_id, earlier_id, car_id in overlaps[:MAX_REPORTED_OVERLAPS])
+        more = len(overlaps) - MAX_REPORTED_OVERLAPS
+        raise RuntimeError(
+            f'{len(overlaps)} live bookings overlap an earlier booking of the same car: {report}'
+            + (f'; and {more} more' if more > 0 else '')
+            + '. Cancel or reschedule them, then run the upgrade again.'
+        )
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('earnings_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('bookings_count', sa.Integer(), nullable=False),
+    sa.Column('earnings', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'period', 'period_start', name='uq_earnings_rollups_owner_period')
+    )
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_bookings_car_schedule', ['car_id', 'pickup_date', 'return_date'], unique=False, sqlite_where=sa.text("status != 'Cancelled'"), postgresql_where=sa.text("status != 'Cancelled'"))
+
+    with op.batch_alter_table('cars', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('stars_1', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('stars_2', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('stars_3', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('stars_4', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('stars_5', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    # ### end Alembic commands ###
+
+    # Backfill the review aggregates, star histogram buckets round half up
+    op.execute(
+        "UPDATE cars SET "
+        "rating_sum = coalesce((SELECT sum(r.rating) FROM reviews r WHERE r.car_id = cars.id), 0), "
+        "rating_count = (SELECT count(*) FROM reviews r WHERE r.car_id = cars.id), "
+        "stars_1 = (SELECT count(*) FROM reviews r WHERE r.car_id = cars.id AND r.rating < 1.5), "
+        "stars_2 = (SELECT count(*) FROM reviews r WHERE r.car_id = cars.id AND r.rating >= 1.5 AND r.rating < 2.5), "
+        "stars_3 = (SELECT count(*) FROM reviews r WHERE r.car_id = cars.id AND r.rating >= 2.5 AND r.rating < 3.5), "
+        "stars_4 = (SELECT count(*) FROM reviews r WHERE r.car_id = cars.id AND r.rating >= 3.5 AND r.rating < 4.5), "
+        "stars_5 = (SELECT count(*) FROM reviews r WHERE r.car_id = cars.id AND r.rating >= 4.5)"
+    )
+    op.execute("UPDATE cars SET rating = round(rating_sum / rating_count, 1) WHERE rating_count > 0")
+
+    bind = op.get_bind()
+
+    # Backfill the owner earnings rollups from booking history
+    rows = bind.execute(sa.text(
+        "SELECT c.owner_id, date(b.created_at) AS day, count(b.id), sum(b.total_amount) "
+        "FROM bookings b JOIN cars c ON c.id = b.car_id "
+        "WHERE b.status != 'Cancelled' GROUP BY c.owner_id, date(b.created_at)"
+    ))
+    totals = defaultdict(lambda: [0, 0.0])
+    for owner_id, booking_day, count, amount in rows:
+        if isinstance(booking_day, str):
+            booking_day = date.fromisoformat(booking_day)
+        for period, period_start in (('day', booking_day), ('month', booking_day.replace(day=1))):
+            totals[(owner_id, period, period_start)][0] += count
+            totals[(owner_id, period, period_start)][1] += amount
+    rollups = sa.table(
+        'earnings_rollups', sa.column('owner_id'), sa.column('period'), sa.column('period_start'),
+        sa.column('bookings_count'), sa.column('earnings')
+    )
+    if totals:
+        op.bulk_insert(rollups, [
+            {'owner_id': owner_id, 'period': period, 'period_start': period_start,
+             'bookings_count': count, 'earnings': amount}
+            for (owner_id, period, period_start), (count, amount) in totals.items()
+        ])
+
+    # Full-text index for /api/cars/search (SQLite only, see search.py)
+    if bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5("
+            "name, brand, description, location, features, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO cars_fts (rowid, name, brand, description, location, features) "
+            "SELECT c.id, c.name, c.brand, coalesce(c.description, ''), c.location, coalesce(f.features, '') "
+            "FROM cars c LEFT JOIN ("
+            "SELECT car_id, group_concat(feature, ' ') AS features FROM car_features GROUP BY car_id"
+            ") f ON f.car_id = c.id"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS cars_fts')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('cars', schema=None) as batch_op:
+        batch_op.drop_column('version')
+        batch_op.drop_column('stars_5')
+        batch_op.drop_column('stars_4')
+        batch_op.drop_column('stars_3')
+        batch_op.drop_column('stars_2')
+        batch_op.drop_column('stars_1')
+        batch_op.drop_column('rating_count')
+        batch_op.drop_column('rating_sum')
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookings_car_schedule', sqlite_where=sa.text("status != 'Cancelled'"), postgresql_where=sa.text("status != 'Cancelled'"))
+
+    op.drop_table('earnings_rollups')
+    # ### end Alembic commands ###
@@ -1,10 +1,15 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, date
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
+from passwords import hasher
+from serialization import Serializable, Shape
+from replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-class User(db.Model):
+class User(Serializable, db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -24,26 +29,32 @@ class User(db.Model):
     favorites = db.relationship('Favorite', back_populates='user', lazy='dynamic')
     payment_methods = db.relationship('PaymentMethod', back_populates='user', lazy='dynamic')
     
+    # Hashing runs on the shared pool and may raise passwords.HashingBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.generate(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-    
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'full_name': self.full_name,
-            'email': self.email,
-            'phone': self.phone,
-            'user_type': self.user_type,
-            'profile_picture': self.profile_picture,
-            'location': self.location,
-            'created_at': self.created_at.isoformat()
-        }
-
-
-class Car(db.Model):
+        return hasher.check(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return hasher.needs_rehash(self.password_hash)
+    
+    # Datetimes are returned as is; the app's JSON provider writes them as ISO 8601
+    FIELDS = {
+        'id': lambda u: u.id,
+        'full_name': lambda u: u.full_name,
+        'email': lambda u: u.email,
+        'phone': lambda u: u.phone,
+        'user_type': lambda u: u.user_type,
+        'profile_picture': lambda u: u.profile_picture,
+        'location': lambda u: u.location,
+        'created_at': lambda u: u.created_at
+    }
+    # What others see of a user embedded in public responses: no contact details
+    PUBLIC_FIELDS = ('id', 'full_name', 'profile_picture')
+
+
+class Car(Serializable, db.Model):
     __tablename__ = 'cars'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -61,10 +72,31 @@ class Car(db.Model):
     description = db.Column(db.Text)
     status = db.Column(db.String(20), default='Available')  # Available, Rented, Maintenance
     rating = db.Column(db.Float, default=0.0)
+    # Running review aggregates so rating updates never re-read all reviews
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
     total_bookings = db.Column(db.Integer, default=0)
     total_earnings = db.Column(db.Float, default=0.0)
     image_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Optimistic concurrency: every ORM update checks and bumps the version
+    version = db.Column(db.Integer, nullable=False, default=1)
+    
+    # Owner fleet pages and catalogue pages, newest first: by status, by status
+    # and category (price filters read daily_rate from the index), and for
+    # availability searches, which exclude a status, in creation order alone
+    __table_args__ = (
+        db.Index('ix_cars_owner_created', 'owner_id', 'created_at', 'id'),
+        db.Index('ix_cars_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_cars_status_category_created', 'status', 'category', 'created_at', 'id', 'daily_rate'),
+        db.Index('ix_cars_created', 'created_at', 'id'),
+    )
+    __mapper_args__ = {'version_id_col': version}
     
     # Relationships
     owner = db.relationship('User', back_populates='cars')
@@ -73,48 +105,163 @@ class Car(db.Model):
     favorites = db.relationship('Favorite', back_populates='car', lazy='dynamic')
     features = db.relationship('CarFeature', back_populates='car', lazy='dynamic')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'owner_id': self.owner_id,
-            'name': self.name,
-            'brand': self.brand,
-            'model_year': self.model_year,
-            'category': self.category,
-            'daily_rate': self.daily_rate,
-            'location': self.location,
-            'transmission': self.transmission,
-            'seats': self.seats,
-            'fuel_type': self.fuel_type,
-            'luggage': self.luggage,
-            'description': self.description,
-            'status': self.status,
-            'rating': self.rating,
-            'total_bookings': self.total_bookings,
-            'total_earnings': self.total_earnings,
-            'image_url': self.image_url,
-            'created_at': self.created_at.isoformat(),
-            'features': [f.feature for f in self.features.all()],
-            'reviews_count': self.reviews.count()
-        }
+    FIELDS = {
+        'id': lambda c: c.id,
+        'owner_id': lambda c: c.owner_id,
+        'name': lambda c: c.name,
+        'brand': lambda c: c.brand,
+        'model_year': lambda c: c.model_year,
+        'category': lambda c: c.category,
+        'daily_rate': lambda c: c.daily_rate,
+        'location': lambda c: c.location,
+        'transmission': lambda c: c.transmission,
+        'seats': lambda c: c.seats,
+        'fuel_type': lambda c: c.fuel_type,
+        'luggage': lambda c: c.luggage,
+        'description': lambda c: c.description,
+        'status': lambda c: c.status,
+        'rating': lambda c: c.rating,
+        'rating_count': lambda c: c.rating_count,
+        'rating_histogram': lambda c: {
+            '1': c.stars_1,
+            '2': c.stars_2,
+            '3': c.stars_3,
+            '4': c.stars_4,
+            '5': c.stars_5
+        },
+        'total_bookings': lambda c: c.total_bookings,
+        'total_earnings': lambda c: c.total_earnings,
+        'image_url': lambda c: c.image_url,
+        'created_at': lambda c: c.created_at,
+        'features': lambda c: [f.feature for f in c.features.all()],
+        'reviews_count': lambda c: c.reviews.count()
+    }
+    EMBEDDABLE = ('owner',)
+    EMBED_FIELDS = {'owner': User.PUBLIC_FIELDS}
+    FIELD_COLUMNS = {
+        'rating_histogram': ('stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5'),
+        'features': (),
+        'reviews_count': ()
+    }
+    
+    def to_dict(self, shape=None, features=None, reviews_count=None):
+        return (shape or Shape.default(Car)).render(self, precomputed={
+            'features': features,
+            'reviews_count': reviews_count
+        })
+    
+    @staticmethod
+    def star_bucket(rating):
+        # Histogram bucket (1-5) for a rating, rounding half up
+        return min(5, max(1, int(rating + 0.5)))
+    
+    @classmethod
+    def apply_review(cls, car_id, rating):
+        # Fold one new review into the car's aggregates with SQL-side increments,
+        # so concurrent reviews can't lose updates. Returns False if no such car.
+        stars = getattr(cls, f'stars_{cls.star_bucket(rating)}')
+        updated = cls.query.filter_by(id=car_id).update({
+            cls.rating_sum: cls.rating_sum + rating,
+            cls.rating_count: cls.rating_count + 1,
+            stars: stars + 1
+        }, synchronize_session=False)
+        if not updated:
+            return False
+        
+        # The row is write-locked by the update above until commit
+        rating_sum, rating_count = db.session.query(cls.rating_sum, cls.rating_count).filter_by(id=car_id).one()
+        cls.query.filter_by(id=car_id).update({
+            cls.rating: round(rating_sum / rating_count, 1)
+        }, synchronize_session=False)
+        return True
+    
+    @classmethod
+    def rebuild_rating_aggregates(cls):
+        # Recompute every car's aggregates from the reviews table. Cars without
+        # reviews keep their rating but have their counters reset.
+        totals = defaultdict(lambda: {'rating_sum': 0.0, 'rating_count': 0, 'stars_1': 0,
+                                      'stars_2': 0, 'stars_3': 0, 'stars_4': 0, 'stars_5': 0})
+        rows = db.session.query(Review.car_id, Review.rating, db.func.count(Review.id)).group_by(
+            Review.car_id, Review.rating
+        )
+        for car_id, rating, count in rows:
+            car_totals = totals[car_id]
+            car_totals['rating_sum'] += rating * count
+            car_totals['rating_count'] += count
+            car_totals[f'stars_{cls.star_bucket(rating)}'] += count
+        
+        cls.query.update({
+            cls.rating_sum: 0.0, cls.rating_count: 0, cls.stars_1: 0,
+            cls.stars_2: 0, cls.stars_3: 0, cls.stars_4: 0, cls.stars_5: 0
+        }, synchronize_session=False)
+        
+        # Core executemany keyed on id; ORM bulk updates would demand the version
+        updates = [
+            dict({f'new_{k}': v for k, v in car_totals.items()}, car_id=car_id,
+                 new_rating=round(car_totals['rating_sum'] / car_totals['rating_count'], 1))
+            for car_id, car_totals in totals.items()
+        ]
+        if updates:
+            columns = ['rating', 'rating_sum', 'rating_count', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+            table = cls.__table__
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('car_id')).values(
+                    {column: db.bindparam(f'new_{column}') for column in columns}
+                ),
+                updates
+            )
+        return len(updates)
+    
+    @classmethod
+    def to_dict_many(cls, cars, shape=None):
+        # Serialize a list of cars with a fixed number of queries: one for
+        # all features and one for all review counts, instead of two per car,
+        # each skipped when the shape leaves the field out
+        shape = shape or Shape.default(cls)
+        car_ids = [car.id for car in cars]
+        features = defaultdict(list)
+        reviews_count = {}
+        # Query through the cars' own session, which is the async session's
+        # sync facade when asgi.py serializes under run_sync()
+        session = object_session(cars[0]) if cars else db.session
+        
+        if car_ids and shape.wants('features'):
+            feature_rows = session.execute(db.select(CarFeature.car_id, CarFeature.feature).where(
+                CarFeature.car_id.in_(car_ids)
+            ).order_by(CarFeature.id))
+            for car_id, feature in feature_rows:
+                features[car_id].append(feature)
+        
+        if car_ids and shape.wants('reviews_count'):
+            reviews_count = dict(session.execute(db.select(Review.car_id, db.func.count(Review.id)).where(
+                Review.car_id.in_(car_ids)
+            ).group_by(Review.car_id)).all())
+        
+        return [
+            car.to_dict(shape, features=features[car.id], reviews_count=reviews_count.get(car.id, 0))
+            for car in cars
+        ]
 
 
 class CarFeature(db.Model):
     __tablename__ = 'car_features'
     
     id = db.Column(db.Integer, primary_key=True)
-    car_id = db.Column(db.Integer, db.ForeignKey('cars.id'), nullable=False)
+    car_id = db.Column(db.Integer, db.ForeignKey('cars.id'), nullable=False, index=True)
     feature = db.Column(db.String(100), nullable=False)
     
     car = db.relationship('Car', back_populates='features')
 
 
-class Booking(db.Model):
+class Booking(Serializable, db.Model):
     __tablename__ = 'bookings'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     car_id = db.Column(db.Integer, db.ForeignKey('cars.id'), nullable=False)
+    # The car's owner, copied at booking time (cars never change owner) so
+    # owner booking pages read one index instead of merging every car's
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     pickup_date = db.Column(db.DateTime, nullable=False)
     return_date = db.Column(db.DateTime, nullable=False)
     pickup_location = db.Column(db.String(100), nullable=False)
@@ -124,29 +271,171 @@ class Booking(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Schedule index: bookings for a car ordered by pickup date, ignoring
+    # cancelled ones, so overlap checks are a single index seek
+    __table_args__ = (
+        db.Index(
+            'ix_bookings_car_schedule', 'car_id', 'pickup_date', 'return_date',
+            sqlite_where=db.text("status != 'Cancelled'"),
+            postgresql_where=db.text("status != 'Cancelled'")
+        ),
+        # Fleet-wide calendar windows: bookings still running after a date
+        db.Index(
+            'ix_bookings_return_window', 'return_date', 'pickup_date', 'car_id',
+            sqlite_where=db.text("status != 'Cancelled'"),
+            postgresql_where=db.text("status != 'Cancelled'")
+        ),
+        # Renter and owner booking pages, newest first
+        db.Index('ix_bookings_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_bookings_owner_created', 'owner_id', 'created_at', 'id'),
+        db.Index('ix_bookings_car_created', 'car_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     user = db.relationship('User', back_populates='bookings', foreign_keys=[user_id])
     car = db.relationship('Car', back_populates='bookings')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'car_id': self.car_id,
-            'car': self.car.to_dict() if self.car else None,
-            'user': self.user.to_dict() if self.user else None,
-            'pickup_date': self.pickup_date.isoformat(),
-            'return_date': self.return_date.isoformat(),
-            'pickup_location': self.pickup_location,
-            'total_amount': self.total_amount,
-            'status': self.status,
-            'payment_status': self.payment_status,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
-
-
-class Review(db.Model):
+    @classmethod
+    def find_conflict(cls, car_id, pickup_date, return_date, exclude_id=None):
+        # Bookings of one car never overlap, so when ordered by pickup date their
+        # return dates are ordered too. The only booking that can clash with
+        # [pickup_date, return_date) is therefore the last one picked up before
+        # return_date, which is one descending seek on ix_bookings_car_schedule.
+        # exclude_id leaves out a booking being reinstated.
+        query = cls.query.filter(
+            cls.car_id == car_id,
+            cls.status != 'Cancelled',
+            cls.pickup_date < return_date
+        )
+        if exclude_id is not None:
+            query = query.filter(cls.id != exclude_id)
+        booking = query.order_by(cls.pickup_date.desc()).first()
+        
+        if booking and booking.return_date > pickup_date:
+            return booking
+        return None
+    
+    @classmethod
+    def overlapping(cls, start, end, car_ids=None):
+        # (car_id, pickup_date, return_date) of every live booking touching
+        # [start, end), for the given cars or the whole fleet, in one query
+        query = db.session.query(cls.car_id, cls.pickup_date, cls.return_date).filter(
+            cls.status != 'Cancelled',
+            cls.pickup_date < end,
+            cls.return_date > start
+        )
+        if car_ids is not None:
+            query = query.filter(cls.car_id.in_(car_ids))
+        return query.all()
+    
+    @classmethod
+    def busy_until(cls, before):
+        # Correlated subquery for car listings: return date of each car's last
+        # booking picked up before `before`, NULL if there is none
+        return db.select(cls.return_date).where(
+            cls.car_id == Car.id,
+            cls.status != 'Cancelled',
+            cls.pickup_date < before
+        ).order_by(cls.pickup_date.desc()).limit(1).correlate(Car).scalar_subquery()
+    
+    FIELDS = {
+        'id': lambda b: b.id,
+        'user_id': lambda b: b.user_id,
+        'car_id': lambda b: b.car_id,
+        'pickup_date': lambda b: b.pickup_date,
+        'return_date': lambda b: b.return_date,
+        'pickup_location': lambda b: b.pickup_location,
+        'total_amount': lambda b: b.total_amount,
+        'status': lambda b: b.status,
+        'payment_status': lambda b: b.payment_status,
+        'created_at': lambda b: b.created_at,
+        'updated_at': lambda b: b.updated_at
+    }
+    EMBEDDABLE = ('car', 'user')
+    DEFAULT_EXPAND = ('car', 'user')
+
+
+class EarningsRollup(db.Model):
+    __tablename__ = 'earnings_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    period = db.Column(db.String(10), nullable=False)  # day, month
+    period_start = db.Column(db.Date, nullable=False)
+    bookings_count = db.Column(db.Integer, nullable=False, default=0)
+    earnings = db.Column(db.Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('owner_id', 'period', 'period_start', name='uq_earnings_rollups_owner_period'),
+    )
+    
+    PERIODS = ('day', 'month')
+    
+    @staticmethod
+    def period_start_for(period, when):
+        if period == 'month':
+            return date(when.year, when.month, 1)
+        return date(when.year, when.month, when.day)
+    
+    @classmethod
+    def record(cls, owner_id, when, amount, count=1):
+        # Add (or with negative values, remove) a booking's earnings to the
+        # owner's day and month rows, creating them on first use
+        for period in cls.PERIODS:
+            period_start = cls.period_start_for(period, when)
+            values = {
+                cls.bookings_count: cls.bookings_count + count,
+                cls.earnings: cls.earnings + amount
+            }
+            row_filter = cls.query.filter_by(owner_id=owner_id, period=period, period_start=period_start)
+            if row_filter.update(values, synchronize_session=False):
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(owner_id=owner_id, period=period, period_start=period_start,
+                                       bookings_count=count, earnings=amount))
+            except IntegrityError:
+                # Another request created the row first
+                row_filter.update(values, synchronize_session=False)
+    
+    @classmethod
+    def total(cls, owner_id, period, when):
+        row = db.session.query(cls.earnings).filter_by(
+            owner_id=owner_id, period=period, period_start=cls.period_start_for(period, when)
+        ).first()
+        return row.earnings if row else 0
+    
+    @classmethod
+    def rebuild(cls):
+        # Recompute every rollup row from booking history
+        day = db.func.date(Booking.created_at)
+        rows = db.session.query(
+            Car.owner_id, day, db.func.count(Booking.id), db.func.sum(Booking.total_amount)
+        ).join(Car, Booking.car_id == Car.id).filter(
+            Booking.status != 'Cancelled'
+        ).group_by(Car.owner_id, day)
+        
+        totals = defaultdict(lambda: [0, 0.0])
+        for owner_id, booking_day, count, amount in rows:
+            if isinstance(booking_day, str):
+                booking_day = date.fromisoformat(booking_day)
+            for period in cls.PERIODS:
+                key = (owner_id, period, cls.period_start_for(period, booking_day))
+                totals[key][0] += count
+                totals[key][1] += amount
+        
+        cls.query.delete(synchronize_session=False)
+        rollups = [
+            {'owner_id': owner_id, 'period': period, 'period_start': period_start,
+             'bookings_count': count, 'earnings': amount}
+            for (owner_id, period, period_start), (count, amount) in totals.items()
+        ]
+        if rollups:
+            db.session.execute(db.insert(cls), rollups)
+        return len(rollups)
+
+
+class Review(Serializable, db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -156,24 +445,31 @@ class Review(db.Model):
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_reviews_car_created', 'car_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     user = db.relationship('User', back_populates='reviews')
     car = db.relationship('Car', back_populates='reviews')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'car_id': self.car_id,
-            'user_name': self.user.full_name if self.user else None,
-            'car_name': self.car.name if self.car else None,
-            'rating': self.rating,
-            'comment': self.comment,
-            'created_at': self.created_at.isoformat()
-        }
+    FIELDS = {
+        'id': lambda r: r.id,
+        'user_id': lambda r: r.user_id,
+        'car_id': lambda r: r.car_id,
+        'user_name': lambda r: r.user.full_name if r.user else None,
+        'car_name': lambda r: r.car.name if r.car else None,
+        'rating': lambda r: r.rating,
+        'comment': lambda r: r.comment,
+        'created_at': lambda r: r.created_at
+    }
+    EMBEDDABLE = ('car', 'user')
+    EMBED_FIELDS = {'user': User.PUBLIC_FIELDS}
+    FIELD_COLUMNS = {'user_name': ('user_id',), 'car_name': ('car_id',)}
+    FIELD_JOINS = {'user_name': 'user', 'car_name': 'car'}
 
 
-class Favorite(db.Model):
+class Favorite(Serializable, db.Model):
     __tablename__ = 'favorites'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -181,21 +477,27 @@ class Favorite(db.Model):
     car_id = db.Column(db.Integer, db.ForeignKey('cars.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # A car can be favourited once per user; the user's list, newest first
+    __table_args__ = (
+        db.Index('uq_favorites_user_car', 'user_id', 'car_id', unique=True),
+        db.Index('ix_favorites_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     # Relationships
     user = db.relationship('User', back_populates='favorites')
     car = db.relationship('Car', back_populates='favorites')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'car_id': self.car_id,
-            'car': self.car.to_dict() if self.car else None,
-            'created_at': self.created_at.isoformat()
-        }
+    FIELDS = {
+        'id': lambda f: f.id,
+        'user_id': lambda f: f.user_id,
+        'car_id': lambda f: f.car_id,
+        'created_at': lambda f: f.created_at
+    }
+    EMBEDDABLE = ('car',)
+    DEFAULT_EXPAND = ('car',)
 
 
-class PaymentMethod(db.Model):
+class PaymentMethod(Serializable, db.Model):
     __tablename__ = 'payment_methods'
     
     id = db.Column(db.Integer, primary_key=True)
@@ -210,13 +512,13 @@ class PaymentMethod(db.Model):
     # Relationships
     user = db.relationship('User', back_populates='payment_methods')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'card_type': self.card_type,
-            'last_four': self.last_four,
-            'expiry': f"{self.expiry_month:02d}/{self.expiry_year}",
-            'is_default': self.is_default,
-            'created_at': self.created_at.isoformat()
-        }
+    FIELDS = {
+        'id': lambda p: p.id,
+        'user_id': lambda p: p.user_id,
+        'card_type': lambda p: p.card_type,
+        'last_four': lambda p: p.last_four,
+        'expiry': lambda p: f"{p.expiry_month:02d}/{p.expiry_year}",
+        'is_default': lambda p: p.is_default,
+        'created_at': lambda p: p.created_at
+    }
+    FIELD_COLUMNS = {'expiry': ('expiry_month', 'expiry_year')}
@@ -0,0 +1,173 @@
+import base64
+import hashlib
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import bcrypt
+    from flask_bcrypt import Bcrypt
+except ImportError:
+    Bcrypt = None
+
+# Work factor per algorithm: PBKDF2 iterations, scrypt N, bcrypt log rounds.
+# scrypt 32768 is werkzeug's default, which every existing hash was made with.
+DEFAULT_COSTS = {'pbkdf2': 600000, 'scrypt': 32768, 'bcrypt': 12}
+DEFAULT_ALGORITHM = 'scrypt'
+DEFAULT_QUEUE = 16
+# Standard base64 alphabet -> the one bcrypt salts are written in
+BCRYPT_BASE64 = bytes.maketrans(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/',
+    b'./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+)
+
+
+class HashingBusy(Exception):
+    # Too many hashes in flight; retry_after is a whole number of seconds
+
+    def __init__(self, retry_after):
+        super().__init__('Server busy, please retry')
+        self.retry_after = retry_after
+
+
+def parse_hash(password_hash):
+    # (algorithm, cost) of a stored hash, or (None, None) if unrecognized
+    if password_hash.startswith('$2'):
+        # $2b$12$<salt and digest>
+        return 'bcrypt', int(password_hash.split('$')[2])
+    method = password_hash.split('$', 1)[0].split(':')
+    if method[0] == 'pbkdf2' and len(method) == 3:
+        return 'pbkdf2', int(method[2])
+    if method[0] == 'scrypt' and len(method) == 4:
+        return 'scrypt', int(method[1])
+    return None, None
+
+
+class PasswordHasher:
+    # Hashes and checks passwords on a bounded thread pool. The KDFs release
+    # the GIL, so up to `workers` hashes run in parallel while request threads
+    # wait; once `workers + queue` are in flight new ones fail fast with
+    # HashingBusy instead of piling up behind a login burst. Hashes made under
+    # a different algorithm or cost than the configured policy still verify,
+    # and needs_rehash() tells the caller to upgrade them.
+
+    def __init__(self, algorithm=DEFAULT_ALGORITHM, cost=None, workers=None, queue=DEFAULT_QUEUE):
+        self.configure(algorithm, cost, workers, queue)
+        self._bcrypt = Bcrypt() if Bcrypt is not None else None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._average_seconds = None
+
+    def configure(self, algorithm, cost=None, workers=None, queue=DEFAULT_QUEUE):
+        if algorithm not in DEFAULT_COSTS:
+            raise ValueError(f'Unknown password hash algorithm: {algorithm}')
+        if algorithm == 'bcrypt' and Bcrypt is None:
+            raise ValueError('PASSWORD_HASH_ALGORITHM=bcrypt but Flask-Bcrypt is not installed')
+        self.algorithm = algorithm
+        self.cost = cost or DEFAULT_COSTS[algorithm]
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.queue = queue
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get('PASSWORD_HASH_ALGORITHM', DEFAULT_ALGORITHM),
+            app.config.get('PASSWORD_HASH_COST'),
+            app.config.get('PASSWORD_HASH_WORKERS'),
+            app.config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE),
+        )
+        if self._bcrypt is not None:
+            self._bcrypt.init_app(app)
+        self.shutdown()
+
+    # Synchronous primitives, run on the pool by generate() and check()
+
+    def hash(self, password, salt=None):
+        # A fixed salt makes the hash reproducible; only seed data wants that
+        if salt is not None:
+            return self._salted_hash(password, salt)
+        if self.algorithm == 'bcrypt':
+            return self._bcrypt.generate_password_hash(password, rounds=self.cost).decode()
+        if self.algorithm == 'pbkdf2':
+            return generate_password_hash(password, method=f'pbkdf2:sha256:{self.cost}')
+        return generate_password_hash(password, method=f'scrypt:{self.cost}:8:1')
+    
+    def _salted_hash(self, password, salt):
+        # Same formats as hash(); bcrypt takes 16 salt bytes in its own base64
+        if self.algorithm == 'bcrypt':
+            encoded = base64.b64encode(hashlib.sha256(salt.encode()).digest()[:16])[:22].translate(BCRYPT_BASE64)
+            return bcrypt.hashpw(password.encode(), b'$2b$%02d$' % self.cost + encoded).decode()
+        if self.algorithm == 'pbkdf2':
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), self.cost)
+            return f'pbkdf2:sha256:{self.cost}${salt}${digest.hex()}'
+        digest = hashlib.scrypt(password.encode(), salt=salt.encode(), n=self.cost, r=8, p=1,
+                                maxmem=132 * self.cost * 8, dklen=64)
+        return f'scrypt:{self.cost}:8:1${salt}${digest.hex()}'
+
+    def verify(self, password_hash, password):
+        if password_hash.startswith('$2'):
+            if self._bcrypt is None:
+                raise ValueError('bcrypt password hash but Flask-Bcrypt is not installed')
+            return self._bcrypt.check_password_hash(password_hash, password)
+        return check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return parse_hash(password_hash) != (self.algorithm, self.cost)
+
+    # Pooled
+
+    def generate(self, password):
+        return self.run(self.hash, password)
+
+    def check(self, password_hash, password):
+        return self.run(self.verify, password_hash, password)
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue:
+                raise HashingBusy(self._retry_after())
+            self._in_flight += 1
+            executor = self._get_executor()
+        try:
+            return executor.submit(self._timed, fn, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                if self._average_seconds is None:
+                    self._average_seconds = elapsed
+                else:
+                    self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+
+    def _retry_after(self):
+        # Roughly how long the current backlog takes to drain
+        average = self._average_seconds or 0.1
+        return max(1, math.ceil(self._in_flight * average / self.workers))
+
+    def _get_executor(self):
+        # Threads don't survive fork; a gunicorn worker builds its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,153 @@
+from datetime import timedelta
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SATURDAY = 5
+MAX_QUOTE_DAYS = 366
+
+
+def parse_seasons(spec):
+    # '12-15:01-05:1.25,07-01:08-31:1.1' -> [(1215, 105, 1.25), (701, 831, 1.1)]:
+    # inclusive MM-DD ranges (wrapping past New Year when end < start) and
+    # the multiplier for rental days inside them
+    seasons = []
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        try:
+            start, end, multiplier = item.split(':')
+            seasons.append((_month_day(start), _month_day(end), float(multiplier)))
+        except ValueError:
+            raise ValueError(f'Invalid pricing season: {item!r} (expected e.g. 12-15:01-05:1.25)')
+    return seasons
+
+
+def _month_day(value):
+    month, day = (int(part) for part in value.split('-'))
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        raise ValueError(value)
+    return month * 100 + day
+
+
+def parse_discounts(spec):
+    # '7:0.1,28:0.2' -> [(28, 0.2), (7, 0.1)]: the largest tier whose minimum
+    # rental length is met applies, as a fraction off the whole rental
+    tiers = []
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        try:
+            min_days, fraction = item.split(':')
+            tier = (int(min_days), float(fraction))
+        except ValueError:
+            raise ValueError(f'Invalid long-rental discount: {item!r} (expected e.g. 7:0.1)')
+        if not 0 <= tier[1] < 1:
+            raise ValueError(f'Invalid long-rental discount: {item!r} (fraction must be in [0, 1))')
+        tiers.append(tier)
+    return sorted(tiers, reverse=True)
+
+
+def rental_days(pickup, return_date):
+    # Billable days: whole days from pickup, each charged at the rate of the
+    # calendar day it starts on
+    return (return_date - pickup).days
+
+
+class PricingEngine:
+    # Prices rentals from a car's daily rate: weekend days (Saturday, Sunday)
+    # and days in a season are multiplied, then a long-rental discount comes
+    # off the total. quote() prices many cars over many date ranges at once:
+    # per-day multipliers for the whole span, a prefix sum over them gives
+    # each range's weighted day count, and an outer product with the rates
+    # gives every total. NumPy does this in a few array operations when it is
+    # installed (PRICING_BACKEND=auto); the Python path gives the same totals.
+
+    def __init__(self, app=None):
+        self.weekend_multiplier = 1.0
+        self.seasons = []
+        self.discounts = []
+        self.use_numpy = np is not None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.weekend_multiplier = app.config.get('PRICING_WEEKEND_MULTIPLIER', 1.0)
+        self.seasons = parse_seasons(app.config.get('PRICING_SEASONS'))
+        self.discounts = parse_discounts(app.config.get('PRICING_LONG_RENTAL_DISCOUNTS'))
+        backend = app.config.get('PRICING_BACKEND', 'auto')
+        if backend not in ('auto', 'numpy', 'python'):
+            raise ValueError(f'Unknown PRICING_BACKEND: {backend!r} (expected auto, numpy or python)')
+        if backend == 'numpy' and np is None:
+            raise RuntimeError('PRICING_BACKEND=numpy but numpy is not installed')
+        self.use_numpy = np is not None and backend != 'python'
+
+    def discount(self, days):
+        for min_days, fraction in self.discounts:
+            if days >= min_days:
+                return fraction
+        return 0.0
+
+    def _season_multiplier(self, month_day):
+        multiplier = 1.0
+        for start, end, factor in self.seasons:
+            inside = start <= month_day <= end if start <= end else (month_day >= start or month_day <= end)
+            if inside:
+                multiplier *= factor
+        return multiplier
+
+    def _weighted_days_python(self, first_day, span, starts, ends):
+        multipliers = []
+        for offset in range(span):
+            day = first_day + timedelta(days=offset)
+            multiplier = self.weekend_multiplier if day.weekday() >= SATURDAY else 1.0
+            multipliers.append(multiplier * self._season_multiplier(day.month * 100 + day.day))
+        prefix = [0.0, *accumulate(multipliers)]
+        return [prefix[end] - prefix[start] for start, end in zip(starts, ends)]
+
+    def _weighted_days_numpy(self, first_day, span, starts, ends):
+        days = np.datetime64(first_day, 'D') + np.arange(span)
+        # 1970-01-01 was a Thursday; shift so Monday is 0 like date.weekday()
+        weekdays = (days.astype('int64') + 3) % 7
+        multipliers = np.where(weekdays >= SATURDAY, self.weekend_multiplier, 1.0)
+        if self.seasons:
+            month_starts = days.astype('datetime64[M]')
+            month_days = ((month_starts.astype('int64') % 12 + 1) * 100
+                          + (days - month_starts.astype('datetime64[D]')).astype('int64') + 1)
+            for start, end, factor in self.seasons:
+                if start <= end:
+                    inside = (month_days >= start) & (month_days <= end)
+                else:
+                    inside = (month_days >= start) | (month_days <= end)
+                multipliers = np.where(inside, multipliers * factor, multipliers)
+        prefix = np.concatenate(([0.0], np.cumsum(multipliers)))
+        return prefix[np.asarray(ends)] - prefix[np.asarray(starts)]
+
+    def quote(self, rates, ranges):
+        # Totals for every (range, car): rates is a sequence of daily rates,
+        # ranges of (pickup, return_date) datetimes. Returns one row per range
+        # of (days, discount, totals in the order of rates), totals rounded
+        # to cents.
+        if not ranges:
+            return []
+        first_day = min(pickup for pickup, _ in ranges).date()
+        days = [rental_days(pickup, return_date) for pickup, return_date in ranges]
+        starts = [(pickup.date() - first_day).days for pickup, _ in ranges]
+        ends = [start + count for start, count in zip(starts, days)]
+        span = max(ends)
+        discounts = [self.discount(count) for count in days]
+
+        if self.use_numpy:
+            weighted = self._weighted_days_numpy(first_day, span, starts, ends)
+            factors = weighted * (1 - np.asarray(discounts))
+            totals = (np.rint(np.outer(factors, np.asarray(rates, dtype=float)) * 100) / 100).tolist()
+        else:
+            weighted = self._weighted_days_python(first_day, span, starts, ends)
+            # Same rounding as the NumPy path: half to even, on the cents
+            totals = [[round(factor * (1 - discount) * rate * 100) / 100 for rate in rates]
+                      for factor, discount in zip(weighted, discounts)]
+        return list(zip(days, discounts, totals))
+
+    def total(self, daily_rate, pickup, return_date):
+        # One car, one rental: what create_booking charges
+        (_, _, (amount,)), = self.quote([daily_rate], [(pickup, return_date)])
+        return amount
@@ -0,0 +1,100 @@
+import re
+from datetime import datetime, timedelta
+
+from models import db, User, Car, Booking, Review, Favorite, CarFeature, EarningsRollup
+
+# "SCAN cars" or "SCAN cars USING INDEX ..." means SQLite walks the whole table
+# (or a whole index); SEARCH means it seeks. Subqueries and FTS are exempt.
+FULL_SCAN = re.compile(r'^SCAN (\w+)')
+# A keyset page that sorts every match before taking the first rows costs
+# O(matches), not O(limit)
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+KEYSET_PAGES = {'catalogue', 'catalogue by category', 'catalogue by category and price', 'catalogue by availability',
+                'owner fleet', 'car reviews', 'renter bookings', 'owner bookings', 'user favorites'}
+# Without an equality to seek on, a page can still walk an index in ORDER BY
+# order and stop once it has enough rows, so that scan is not a problem
+ORDERED_WALK = re.compile(r'^SCAN \w+ USING (COVERING )?INDEX ')
+
+
+def hot_queries():
+    # (name, statement) pairs mirroring the filters and orderings the routes
+    # use; the literal ids and dates are placeholders
+    now = datetime(2030, 1, 1)
+    newest = (Car.created_at.desc(), Car.id.desc())
+    return [
+        ('login by email', db.select(User).where(User.email == 'renter@example.com')),
+        ('catalogue', db.select(Car).where(Car.status == 'Available').order_by(*newest).limit(21)),
+        ('catalogue by category', db.select(Car).where(
+            Car.status == 'Available', Car.category == 'SUV'
+        ).order_by(*newest).limit(21)),
+        ('catalogue by category and price', db.select(Car).where(
+            Car.status == 'Available', Car.category == 'SUV',
+            Car.daily_rate >= 1000, Car.daily_rate <= 5000
+        ).order_by(*newest).limit(21)),
+        ('catalogue by availability', db.select(Car).where(
+            Car.status != 'Maintenance', db.func.coalesce(Booking.busy_until(now + timedelta(days=3)), now) <= now
+        ).order_by(*newest).limit(21)),
+        ('owner fleet', db.select(Car).where(Car.owner_id == 1).order_by(*newest).limit(21)),
+        ('car features', db.select(CarFeature.car_id, CarFeature.feature).where(CarFeature.car_id.in_([1, 2, 3]))),
+        ('car review counts', db.select(Review.car_id, db.func.count(Review.id)).where(
+            Review.car_id.in_([1, 2, 3])
+        ).group_by(Review.car_id)),
+        ('car reviews', db.select(Review).where(Review.car_id == 1).order_by(
+            Review.created_at.desc(), Review.id.desc()
+        ).limit(21)),
+        ('booking conflict', db.select(Booking).where(
+            Booking.car_id == 1, Booking.status != 'Cancelled', Booking.pickup_date < now
+        ).order_by(Booking.pickup_date.desc()).limit(1)),
+        ('car availability', db.select(Booking.car_id, Booking.pickup_date, Booking.return_date).where(
+            Booking.status != 'Cancelled', Booking.pickup_date < now, Booking.return_date > now,
+            Booking.car_id.in_([1, 2, 3])
+        )),
+        ('fleet availability', db.select(Booking.car_id, Booking.pickup_date, Booking.return_date).where(
+            Booking.status != 'Cancelled', Booking.pickup_date < now, Booking.return_date > now
+        )),
+        ('renter bookings', db.select(Booking).where(Booking.user_id == 1).order_by(
+            Booking.created_at.desc(), Booking.id.desc()
+        ).limit(21)),
+        ('owner bookings', db.select(Booking).where(Booking.owner_id == 1).order_by(
+            Booking.created_at.desc(), Booking.id.desc()
+        ).limit(21)),
+        ('owner booking export', db.select(Booking.id, Car.name).join(Car, Booking.car_id == Car.id).where(
+            Booking.owner_id == 1
+        ).order_by(Booking.created_at, Booking.id)),
+        ('owner earnings', db.select(EarningsRollup.earnings).where(
+            EarningsRollup.owner_id == 1, EarningsRollup.period == 'month',
+            EarningsRollup.period_start == now.date()
+        )),
+        ('favorite lookup', db.select(Favorite).where(Favorite.user_id == 1, Favorite.car_id == 1)),
+        ('user favorites', db.select(Favorite).where(Favorite.user_id == 1).order_by(
+            Favorite.created_at.desc(), Favorite.id.desc()
+        ).limit(21)),
+    ]
+
+
+def explain(connection, statement):
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+
+
+def check_query_plans():
+    # Returns [(name, plan lines, problems)] for every hot query, or None when
+    # the database isn't SQLite. Problems are full table scans, and temp sorts
+    # in the keyset-paginated queries (which may walk a whole index in order
+    # instead, since they stop at the page limit).
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        return None
+
+    tables = set(db.metadata.tables)
+    results = []
+    for name, statement in hot_queries():
+        plan = explain(connection, statement)
+        problems = [line for line in plan if (match := FULL_SCAN.match(line)) and match.group(1) in tables]
+        if name in KEYSET_PAGES:
+            if TEMP_SORT in plan:
+                problems += [TEMP_SORT]
+            else:
+                problems = [line for line in problems if not ORDERED_WALK.match(line)]
+        results.append((name, plan, problems))
+    return results
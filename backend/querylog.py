@@ -0,0 +1,105 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('vantage.queries')
+
+SLOW_QUERY_MS = 100
+N_PLUS_ONE_THRESHOLD = 5
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def statement_shape(statement):
+    # Collapse whitespace, numbers and expanded IN lists, so the same query
+    # issued for different ids counts as one shape
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _PLACEHOLDER_LIST.sub('(?)', shape)
+    return _NUMBER.sub('N', shape)
+
+
+def current_route():
+    if not has_request_context():
+        return '-'
+    return f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+
+
+class QueryLog:
+    # Opt-in query instrumentation (QUERY_LOG=true). Logs statements slower
+    # than SLOW_QUERY_MS with their route, warns when one statement shape
+    # repeats N_PLUS_ONE_THRESHOLD times in a request, and enforces an
+    # optional per-request QUERY_BUDGET, raising QueryBudgetExceeded at the
+    # end of the request when QUERY_BUDGET_RAISE is set (meant for tests).
+
+    def __init__(self, app=None):
+        self.slow_seconds = SLOW_QUERY_MS / 1000
+        self.n_plus_one_threshold = N_PLUS_ONE_THRESHOLD
+        self.budget = None
+        self.raise_on_budget = False
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('QUERY_LOG', False)
+        if not self.enabled:
+            return
+        self.slow_seconds = app.config.get('SLOW_QUERY_MS', SLOW_QUERY_MS) / 1000
+        self.n_plus_one_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+        self.budget = app.config.get('QUERY_BUDGET')
+        self.raise_on_budget = app.config.get('QUERY_BUDGET_RAISE', False)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+
+    def _start_request(self):
+        g.query_log = {'count': 0, 'shapes': Counter()}
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_log_started'] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('query_log_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.slow_seconds:
+            logger.warning('Slow query (%.1f ms) on %s: %s', elapsed * 1000, current_route(),
+                           _WHITESPACE.sub(' ', statement).strip())
+
+        if has_request_context() and 'query_log' in g:
+            state = g.query_log
+            state['count'] += 1
+            state['shapes'][statement_shape(statement)] += 1
+
+    def _finish_request(self, response):
+        state = g.get('query_log')
+        if state is None:
+            return response
+        route = current_route()
+        response.headers['X-Query-Count'] = str(state['count'])
+
+        for shape, count in state['shapes'].most_common():
+            if count < self.n_plus_one_threshold:
+                break
+            logger.warning('Possible N+1 on %s: %d x %s', route, count, shape)
+
+        if self.budget is not None and state['count'] > self.budget:
+            message = f"{route} ran {state['count']} queries, over the budget of {self.budget}"
+            if self.raise_on_budget:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
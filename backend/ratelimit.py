@@ -0,0 +1,153 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+logger = logging.getLogger('vantage.ratelimit')
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+MAX_KEYS = 10000
+
+
+def parse_rate(rate):
+    # '10/minute' -> (capacity 10, refill 10/60 tokens per second); a bucket
+    # holds up to `capacity` requests and refills continuously
+    count, _, period = rate.partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f'Invalid rate limit: {rate!r} (expected e.g. 10/minute)')
+    return int(count), int(count) / PERIODS[period]
+
+
+def _retry_after(tokens, refill):
+    return max(1, math.ceil((1 - tokens) / refill))
+
+
+class MemoryStore:
+    # Token buckets in a plain dict, one per worker process. Each bucket is an
+    # immutable (tokens, updated_at, full_at) tuple swapped in with a single
+    # assignment, so there is no lock; two threads racing on one key can both
+    # be admitted, which over-admits by at most the thread count.
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def hit(self, key, capacity, refill):
+        now = time.monotonic()
+        tokens, updated_at, _ = self._buckets.get(key, (capacity, now, None))
+        tokens = min(capacity, tokens + (now - updated_at) * refill)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Third item: when the bucket will be full again, for pruning
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return (True, 0) if allowed else (False, _retry_after(tokens, refill))
+
+    def _prune(self, now):
+        # A bucket that has refilled is the same as no bucket
+        for key, (_, _, full_at) in list(self._buckets.items()):
+            if full_at <= now:
+                self._buckets.pop(key, None)
+
+
+class SQLiteStore:
+    # Buckets in a SQLite file shared by every gunicorn worker on the host.
+    # One UPSERT ... RETURNING refills, takes a token and reports the result
+    # atomically, so limits hold across processes. Uses wall-clock time, since
+    # monotonic clocks aren't comparable between processes.
+
+    HIT = '''
+        INSERT INTO rate_buckets (key, tokens, updated_at, allowed) VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = MIN(:capacity, tokens + MAX(0, :now - updated_at) * :refill)
+                     - (MIN(:capacity, tokens + MAX(0, :now - updated_at) * :refill) >= 1),
+            allowed = MIN(:capacity, tokens + MAX(0, :now - updated_at) * :refill) >= 1,
+            updated_at = :now
+        RETURNING allowed, tokens
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, reopened after fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, allowed INTEGER NOT NULL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def hit(self, key, capacity, refill):
+        allowed, tokens = self._connection().execute(
+            self.HIT, {'key': key, 'capacity': capacity, 'refill': refill, 'now': time.time()}
+        ).fetchone()
+        if allowed:
+            return True, 0
+        return False, _retry_after(tokens, refill)
+
+
+class RateLimiter:
+    # Per-route token buckets (RATE_LIMIT_ENABLED). Buckets live in worker
+    # memory unless RATE_LIMIT_STORAGE names a SQLite file to share them
+    # between workers. If the shared store fails the request is let through.
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.store = MemoryStore()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        storage = app.config.get('RATE_LIMIT_STORAGE')
+        self.store = SQLiteStore(storage) if storage else MemoryStore()
+
+    def hit(self, key, capacity, refill):
+        try:
+            return self.store.hit(key, capacity, refill)
+        except sqlite3.Error as e:
+            logger.warning('Rate limit store unavailable, allowing request: %s', e)
+            return True, 0
+
+
+def client_key(by):
+    # 'user' needs a verified JWT, so put the decorator under @jwt_required
+    if by == 'user':
+        return f'user:{get_jwt_identity()}'
+    return f'ip:{request.remote_addr}'
+
+
+def rate_limited(limiter, rate, by='ip'):
+    # Answer 429 with Retry-After once a client has used up `rate` (e.g.
+    # '10/minute') on this route; a falsy rate leaves the route unlimited
+    def decorator(view):
+        if not rate:
+            return view
+        capacity, refill = parse_rate(rate)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if limiter.enabled:
+                allowed, retry_after = limiter.hit(f'{view.__name__}:{client_key(by)}', capacity, refill)
+                if not allowed:
+                    response = jsonify({'error': 'Too many requests, please retry later'})
+                    response.headers['Retry-After'] = str(retry_after)
+                    return response, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
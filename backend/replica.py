@@ -0,0 +1,115 @@
+import sqlite3
+import time
+
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+COOKIE_NAME = 'vch_primary_until'
+READ_YOUR_WRITES_SECONDS = 5
+
+
+class RoutingSession(Session):
+    # db.session for a primary plus an optional read replica bind. Reads in a
+    # request that ReplicaRouter marked read-only go to the replica; flushes
+    # and UPDATE/INSERT/DELETE statements always go to the primary, and once
+    # the session has written, its later reads stay on the primary too.
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif (not self.info.get('wrote') and has_request_context() and g.get('use_replica')
+                  and REPLICA_BIND in self._db.engines):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _query_only(dbapi_connection, connection_record):
+    # A write that slips through to the replica fails instead of diverging
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA query_only=ON')
+    finally:
+        cursor.close()
+
+
+def primary_until(cookies):
+    # When a client's read-your-writes window ends, from its cookie
+    try:
+        return float(cookies.get(COOKIE_NAME, 0))
+    except ValueError:
+        return 0
+
+
+def sqlite_path(engine):
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        raise ValueError(f'{engine.url} is not a SQLite file')
+    return engine.url.database
+
+
+def sync_replica(primary, replica, pages_per_step=1024):
+    # Copy the primary SQLite file over the replica with the online backup
+    # API: a consistent snapshot, taken while both stay open for traffic.
+    # Stands in for a real replication stream in development. Returns the
+    # number of pages copied.
+    source = sqlite3.connect(sqlite_path(primary))
+    target = sqlite3.connect(sqlite_path(replica), timeout=30)
+    try:
+        copied = {'pages': 0}
+
+        def progress(status, remaining, total):
+            copied['pages'] = total - remaining
+
+        source.backup(target, pages=pages_per_step, progress=progress)
+        return copied['pages']
+    finally:
+        target.close()
+        source.close()
+
+
+class ReplicaRouter:
+    # Read/write splitting (REPLICA_DATABASE_URL). init_app() runs before
+    # db.init_app() to add the replica bind; attach() then makes the replica
+    # engine read-only. GET and HEAD requests read from the replica, except
+    # for READ_YOUR_WRITES_SECONDS after a client's last write: a request that
+    # wrote sets a cookie that keeps that client on the primary until the
+    # replica has had time to catch up.
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.window = READ_YOUR_WRITES_SECONDS
+        self.db = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('REPLICA_DATABASE_URL')
+        self.enabled = bool(url)
+        if not self.enabled:
+            return
+        self.window = app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS') or READ_YOUR_WRITES_SECONDS
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = url
+        app.before_request(self._choose_bind)
+        app.after_request(self._remember_write)
+
+    def attach(self, db):
+        self.db = db
+        if self.enabled and db.engines[REPLICA_BIND].dialect.name == 'sqlite':
+            event.listen(db.engines[REPLICA_BIND], 'connect', _query_only)
+
+    def pins_primary(self, cookies):
+        # Whether a client is inside its read-your-writes window
+        return self.enabled and time.time() < primary_until(cookies)
+
+    def _choose_bind(self):
+        g.use_replica = request.method in READ_METHODS and not self.pins_primary(request.cookies)
+
+    def _remember_write(self, response):
+        session = self.db.session
+        if session.registry.has() and session.info.get('wrote'):
+            response.set_cookie(COOKIE_NAME, f'{time.time() + self.window:.3f}', max_age=int(self.window) + 1,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,129 @@
+import re
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import db, Car, CarFeature
+
+FTS_TABLE = 'cars_fts'
+SEARCHABLE_FIELDS = ('name', 'brand', 'description', 'location')
+
+# BM25 column weights, in FTS column order: name, brand, description, location, features
+BM25_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 3.0)
+
+CREATE_FTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, brand, description, location, features, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# Create/drop the FTS table alongside the cars table on SQLite
+event.listen(Car.__table__, 'after_create', db.DDL(CREATE_FTS).execute_if(dialect='sqlite'))
+event.listen(Car.__table__, 'before_drop', db.DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+_fts_ready = set()
+
+
+def uses_fts(bind):
+    return bind.dialect.name == 'sqlite'
+
+
+def _ensure_fts(connection):
+    # Databases created before search existed get the table on first write
+    key = str(connection.engine.url)
+    if key not in _fts_ready:
+        connection.execute(db.text(CREATE_FTS))
+        _fts_ready.add(key)
+
+
+def index_cars(connection, car_ids):
+    # Replace the FTS rows for the given cars from the current table contents
+    if not car_ids:
+        return
+    _ensure_fts(connection)
+    params = {f'id{i}': car_id for i, car_id in enumerate(car_ids)}
+    id_list = ', '.join(f':{name}' for name in params)
+    connection.execute(db.text(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({id_list})'), params)
+    connection.execute(db.text(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, brand, description, location, features) "
+        "SELECT c.id, c.name, c.brand, coalesce(c.description, ''), c.location, "
+        "coalesce((SELECT group_concat(f.feature, ' ') FROM car_features f WHERE f.car_id = c.id), '') "
+        f"FROM cars c WHERE c.id IN ({id_list})"
+    ), params)
+
+
+def rebuild_index():
+    connection = db.session.connection()
+    if not uses_fts(connection):
+        return 0
+    _ensure_fts(connection)
+    connection.execute(db.text(f'DELETE FROM {FTS_TABLE}'))
+    # One pass over cars and features, rather than a lookup per car
+    result = connection.execute(db.text(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, brand, description, location, features) "
+        "SELECT c.id, c.name, c.brand, coalesce(c.description, ''), c.location, coalesce(f.features, '') "
+        "FROM cars c LEFT JOIN ("
+        "SELECT car_id, group_concat(feature, ' ') AS features FROM car_features GROUP BY car_id"
+        ") f ON f.car_id = c.id"
+    ))
+    return result.rowcount
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    # Reindex cars whose searchable text changed in this flush, inside the
+    # same transaction. Counter updates (bookings, ratings) are skipped.
+    connection = session.connection()
+    if not uses_fts(connection):
+        return
+
+    car_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Car):
+            state = inspect(obj)
+            if obj in session.new or obj in session.deleted or any(
+                state.attrs[field].history.has_changes() for field in SEARCHABLE_FIELDS
+            ):
+                car_ids.add(obj.id)
+        elif isinstance(obj, CarFeature):
+            car_ids.add(obj.car_id)
+
+    car_ids.discard(None)
+    if car_ids:
+        index_cars(connection, sorted(car_ids))
+
+
+def match_expression(q):
+    # Quote each token and turn it into a prefix query: "toy" "cru" -> toy* AND cru*
+    tokens = re.findall(r'\w+', q)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_cars(q, limit):
+    tokens = re.findall(r'\w+', q)
+    if not tokens:
+        return []
+
+    if uses_fts(db.session.connection()):
+        _ensure_fts(db.session.connection())
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        rows = db.session.execute(db.text(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT :limit'
+        ), {'match': match_expression(q), 'limit': limit})
+        car_ids = [row[0] for row in rows]
+        cars = {car.id: car for car in Car.query.filter(Car.id.in_(car_ids))} if car_ids else {}
+        return [cars[car_id] for car_id in car_ids if car_id in cars]
+
+    # Fallback for other databases: every token must appear in some field
+    query = Car.query
+    for token in tokens:
+        pattern = f'%{token}%'
+        query = query.filter(db.or_(
+            Car.name.ilike(pattern),
+            Car.brand.ilike(pattern),
+            Car.description.ilike(pattern),
+            Car.location.ilike(pattern),
+            Car.features.any(CarFeature.feature.ilike(pattern))
+        ))
+    return query.order_by(Car.rating.desc(), Car.id.desc()).limit(limit).all()
@@ -0,0 +1,165 @@
+from sqlalchemy.orm import joinedload, load_only
+
+
+class InvalidShape(ValueError):
+    pass
+
+
+def _split(value):
+    if value is None:
+        return None
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class Shape:
+    # The requested shape of a serialized model: which fields to include
+    # (None means all of them) and which relations to embed, each with a
+    # Shape of its own. Built from ?fields=id,status,car.name&expand=user.
+
+    _defaults = {}
+
+    def __init__(self, model, fields=None, expand=None):
+        self.model = model
+        self.fields = fields
+        self.expand = expand or {}
+
+    @classmethod
+    def default(cls, model):
+        # The shape to_dict() has always produced; cached, it never changes
+        if model not in cls._defaults:
+            cls._defaults[model] = cls.parse(model)
+        return cls._defaults[model]
+
+    @classmethod
+    def parse(cls, model, fields=None, expand=None):
+        # Without either parameter, embed the model's DEFAULT_EXPAND. With
+        # ?fields= only the relations it names are embedded (car, car.name),
+        # and an explicit but empty ?expand= embeds nothing.
+        field_paths = _split(fields)
+        expand_paths = _split(expand)
+        if expand_paths is None:
+            expand_paths = list(model.DEFAULT_EXPAND) if field_paths is None else []
+        return cls._build(model, field_paths, expand_paths)
+
+    @classmethod
+    def _build(cls, model, field_paths, expand_paths):
+        relations = model.__mapper__.relationships
+        names = [path.split('.', 1)[0] for path in expand_paths]
+        names += [path.split('.', 1)[0] for path in field_paths or ()
+                  if '.' in path or path in model.EMBEDDABLE]
+
+        expand = {}
+        for name in names:
+            if name not in model.EMBEDDABLE:
+                raise InvalidShape(f"Cannot expand '{name}' on {model.__tablename__}")
+            if name in expand:
+                continue
+            prefix = f'{name}.'
+            sub_fields = [path[len(prefix):] for path in field_paths or () if path.startswith(prefix)]
+            sub_expand = [path[len(prefix):] for path in expand_paths if path.startswith(prefix)]
+            public = model.EMBED_FIELDS.get(name)
+            if public is not None:
+                # Only the public fields of this relation can be embedded
+                hidden = {path.split('.', 1)[0] for path in sub_fields + sub_expand} - set(public)
+                if hidden:
+                    raise InvalidShape(f"Cannot include {', '.join(sorted(hidden))} of '{name}' "
+                                       f"on {model.__tablename__}")
+                sub_fields = sub_fields or list(public)
+            expand[name] = cls._build(relations[name].mapper.class_, sub_fields or None, sub_expand)
+
+        fields = None
+        if field_paths is not None:
+            fields = {path for path in field_paths if '.' not in path and path not in model.EMBEDDABLE}
+            unknown = fields - set(model.FIELDS)
+            if unknown:
+                raise InvalidShape(f"Unknown fields for {model.__tablename__}: {', '.join(sorted(unknown))}")
+        return cls(model, fields, expand)
+
+    def wants(self, name):
+        return self.fields is None or name in self.fields
+
+    def render(self, obj, precomputed=None, embedded=None):
+        # precomputed: field -> value already fetched in bulk; embedded:
+        # relation -> {related id: rendered dict} from to_dict_many
+        data = {}
+        for name, getter in self.model.FIELDS.items():
+            if self.wants(name):
+                if precomputed and precomputed.get(name) is not None:
+                    data[name] = precomputed[name]
+                else:
+                    data[name] = getter(obj)
+        for name, shape in self.expand.items():
+            related = getattr(obj, name)
+            if related is None:
+                data[name] = None
+            elif embedded and name in embedded:
+                data[name] = embedded[name][related.id]
+            else:
+                data[name] = related.to_dict(shape)
+        return data
+
+    def columns(self):
+        # Columns to load: the requested ones, whatever computed fields and
+        # embedded relations need, and the id/created_at pagination keys
+        mapper = self.model.__mapper__
+        names = {'id', 'created_at'}
+        for name in self.fields:
+            names.update(self.model.FIELD_COLUMNS.get(name, (name,)))
+        for name in self.expand:
+            names.update(column.key for column in mapper.relationships[name].local_columns)
+        if mapper.version_id_col is not None:
+            names.add(mapper.version_id_col.key)
+        return [getattr(self.model, name) for name in sorted(names) if name in mapper.columns]
+
+    def loader_options(self, path=None):
+        # Query options matching the shape: load_only the needed columns and
+        # joinedload embedded (many-to-one) relations in the same SELECT
+        options = []
+        if self.fields is not None:
+            columns = self.columns()
+            options.append(path.load_only(*columns) if path is not None else load_only(*columns))
+            joins = {self.model.FIELD_JOINS[name] for name in self.fields if name in self.model.FIELD_JOINS}
+        else:
+            joins = set(self.model.FIELD_JOINS.values())
+        for name in sorted(joins - set(self.expand)):
+            attribute = getattr(self.model, name)
+            options.append(path.joinedload(attribute) if path is not None else joinedload(attribute))
+        for name, shape in self.expand.items():
+            attribute = getattr(self.model, name)
+            loader = path.joinedload(attribute) if path is not None else joinedload(attribute)
+            options.extend(shape.loader_options(loader) or [loader])
+        return options
+
+
+class Serializable:
+    # Mixin for models serialized through FIELDS (output name -> getter).
+    # EMBEDDABLE relations can be nested with ?expand=, DEFAULT_EXPAND are
+    # nested when the client doesn't ask for a shape. EMBED_FIELDS limits an
+    # embedded relation to the fields anyone may see (e.g. a car's owner on
+    # the public catalogue). FIELD_COLUMNS maps computed fields to the
+    # columns they read, FIELD_JOINS to the relation they read through.
+
+    FIELDS = {}
+    EMBEDDABLE = ()
+    DEFAULT_EXPAND = ()
+    EMBED_FIELDS = {}
+    FIELD_COLUMNS = {}
+    FIELD_JOINS = {}
+
+    def to_dict(self, shape=None):
+        return (shape or Shape.default(type(self))).render(self)
+
+    @classmethod
+    def to_dict_many(cls, objects, shape=None):
+        # Render each embedded object once, however many rows share it
+        shape = shape or Shape.default(cls)
+        embedded = {}
+        for name, sub_shape in shape.expand.items():
+            related = {}
+            for obj in objects:
+                target = getattr(obj, name)
+                if target is not None:
+                    related[target.id] = target
+            rendered = sub_shape.model.to_dict_many(list(related.values()), sub_shape)
+            embedded[name] = dict(zip(related, rendered))
+        return [shape.render(obj, embedded=embedded) for obj in objects]
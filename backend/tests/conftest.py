@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time
+TEST_DIR = tempfile.mkdtemp(prefix='vch-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEST_DIR, 'test.db')
+os.environ['CATALOGUE_CACHE_VERSION_FILE'] = os.path.join(TEST_DIR, 'catalogue_cache.version')
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['CATALOGUE_CACHE_SIZE'] = '0'
+os.environ['PROXY_FIX_X_FOR'] = '1'
+os.environ['PASSWORD_HASH_ALGORITHM'] = 'pbkdf2'
+os.environ['PASSWORD_HASH_COST'] = '1000'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import app as flask_app, db, issue_access_token  # noqa: E402
+from models import User, Car, CarFeature, Review  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    # Counts SQL statements run between reset() and the read of .count
+    class Counter:
+        count = 0
+
+        def reset(self):
+            self.count = 0
+
+    counter = Counter()
+
+    def count(*args):
+        counter.count += 1
+
+    event.listen(db.engine, 'after_cursor_execute', count)
+    yield counter
+    event.remove(db.engine, 'after_cursor_execute', count)
+
+
+def make_user(email, user_type='owner'):
+    user = User(full_name=email.split('@')[0], email=email, phone='0700000000', user_type=user_type)
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(user):
+    return {'Authorization': f'Bearer {issue_access_token(user)}'}
+
+
+def make_cars(owner, count, reviewer=None):
+    # Cars with features and a review each, so serialization has relations to load
+    cars = [Car(owner_id=owner.id, name=f'Car {i}', brand='Toyota', model_year=2020, category='SUV',
+                daily_rate=5000, location='Garissa, Kenya', status='Available') for i in range(count)]
+    db.session.add_all(cars)
+    db.session.flush()
+    for car in cars:
+        db.session.add_all([CarFeature(car_id=car.id, feature='AC'), CarFeature(car_id=car.id, feature='GPS')])
+        if reviewer is not None:
+            db.session.add(Review(user_id=reviewer.id, car_id=car.id, rating=4, comment='Good'))
+    db.session.commit()
+    return cars
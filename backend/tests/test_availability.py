@@ -0,0 +1,36 @@
+import base64
+
+import pytest
+
+from conftest import make_user, make_cars, auth_headers
+from test_bookings import book
+
+
+def test_availability_bitmaps(client):
+    owner = make_user('owner@example.com')
+    renter = make_user('renter@example.com', 'renter')
+    booked, free = make_cars(owner, 2)
+    book(client, auth_headers(renter), booked.id, '2030-01-03T10:00:00', '2030-01-05T10:00:00')
+
+    response = client.get(f'/api/cars/availability?month=2030-01&car_ids={booked.id},{free.id}')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['start'], body['days']) == ('2030-01-01', 31)
+    assert base64.b64decode(body['cars'][str(booked.id)]) == bytes([0b11100, 0, 0, 0])
+    assert base64.b64decode(body['cars'][str(free.id)]) == bytes(4)
+
+
+@pytest.mark.parametrize('query', [
+    'month=2030-13', 'month=January', 'month=2030-01&months=4', 'month=9999-12', 'month=9999-11&months=2',
+    'month=2030-01&car_ids=1,x',
+])
+def test_availability_rejects_bad_windows(client, query):
+    response = client.get(f'/api/cars/availability?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_availability_window_may_reach_the_last_representable_month(client):
+    response = client.get('/api/cars/availability?month=9999-09&months=3')
+    assert response.status_code == 200
+    assert response.get_json()['days'] == 91
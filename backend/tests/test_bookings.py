@@ -0,0 +1,57 @@
+from conftest import make_user, make_cars, auth_headers
+
+
+def book(client, headers, car_id, pickup, return_date):
+    return client.post('/api/bookings', headers=headers, json={
+        'car_id': car_id, 'pickup_date': pickup, 'return_date': return_date, 'pickup_location': 'Garissa'
+    })
+
+
+def set_status(client, headers, booking_id, status):
+    return client.put(f'/api/bookings/{booking_id}/status', headers=headers, json={'status': status})
+
+
+def test_reinstating_a_booking_rejects_overlaps(client):
+    owner = make_user('owner@example.com')
+    renter = make_user('renter@example.com', 'renter')
+    car, = make_cars(owner, 1)
+    headers = auth_headers(renter)
+
+    first = book(client, headers, car.id, '2030-01-01T10:00:00', '2030-01-05T10:00:00').get_json()['booking']
+    assert set_status(client, headers, first['id'], 'Cancelled').status_code == 200
+    assert book(client, headers, car.id, '2030-01-03T10:00:00', '2030-01-07T10:00:00').status_code == 201
+
+    response = set_status(client, headers, first['id'], 'Confirmed')
+    assert response.status_code == 409
+    assert response.get_json()['conflict']['pickup_date'] == '2030-01-03T10:00:00'
+
+
+def test_reinstating_a_booking_without_overlaps(client):
+    owner = make_user('owner@example.com')
+    renter = make_user('renter@example.com', 'renter')
+    car, = make_cars(owner, 1)
+    headers = auth_headers(renter)
+
+    first = book(client, headers, car.id, '2030-01-01T10:00:00', '2030-01-05T10:00:00').get_json()['booking']
+    assert set_status(client, headers, first['id'], 'Cancelled').status_code == 200
+    assert book(client, headers, car.id, '2030-01-05T10:00:00', '2030-01-07T10:00:00').status_code == 201
+
+    response = set_status(client, headers, first['id'], 'Confirmed')
+    assert response.status_code == 200
+    assert response.get_json()['booking']['status'] == 'Confirmed'
+
+
+def test_availability_search_rejects_malformed_dates(client):
+    response = client.get('/api/cars?pickup_date=tomorrow&return_date=2030-01-05T10:00:00')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid date')
+
+
+def test_export_rejects_malformed_dates(client):
+    headers = auth_headers(make_user('owner@example.com'))
+
+    assert client.get('/api/owner/bookings/export?from=2030-01-01', headers=headers).status_code == 200
+    for query in ('from=yesterday', 'to=2030-13-01'):
+        response = client.get(f'/api/owner/bookings/export?{query}', headers=headers)
+        assert response.status_code == 400
+        assert response.get_json()['error'].startswith('Invalid date')
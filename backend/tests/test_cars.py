@@ -0,0 +1,43 @@
+from sqlalchemy import event
+
+from conftest import make_user, make_cars, auth_headers
+from models import db
+
+
+def test_update_car_retries_a_version_race(client):
+    owner = make_user('owner@example.com')
+    car, = make_cars(owner, 1)
+    raced = []
+
+    def race(session, flush_context, instances):
+        # Another writer updates the car between this request's read and write
+        if not raced:
+            raced.append(True)
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(f'UPDATE cars SET version = version + 1 WHERE id = {car.id}')
+
+    event.listen(db.session, 'before_flush', race)
+    try:
+        response = client.put(f'/api/cars/{car.id}', headers=auth_headers(owner), json={'daily_rate': 6500})
+    finally:
+        event.remove(db.session, 'before_flush', race)
+
+    assert raced
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['car']['daily_rate'] == 6500
+
+
+def test_update_car_ignores_server_maintained_fields(client):
+    owner = make_user('owner@example.com')
+    car, = make_cars(owner, 1)
+
+    response = client.put(f'/api/cars/{car.id}', headers=auth_headers(owner), json={
+        'name': 'Renamed', 'rating': 5.0, 'rating_sum': 500.0, 'rating_count': 100, 'stars_5': 100,
+        'total_bookings': 1000, 'total_earnings': 1e9
+    })
+
+    assert response.status_code == 200
+    updated = response.get_json()['car']
+    assert updated['name'] == 'Renamed'
+    assert updated['rating'] == 0.0
+    assert updated['total_bookings'] == 0
@@ -0,0 +1,77 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from app import catalogue_cache
+from cache import ResponseCache
+from conftest import make_user, make_cars, auth_headers
+from test_bookings import book
+
+
+@pytest.fixture
+def cached(app, monkeypatch):
+    # conftest disables the catalogue cache; give it room for these tests
+    monkeypatch.setattr(catalogue_cache, 'max_entries', 100)
+    catalogue_cache.bump()
+    return catalogue_cache
+
+
+def test_repeat_request_with_etag_is_a_304_without_queries(client, cached, statements):
+    make_cars(make_user('owner@example.com'), 2)
+    first = client.get('/api/cars')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    statements.reset()
+    again = client.get('/api/cars', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert statements.count == 0
+
+
+def test_filters_are_normalized_into_one_key(client, cached, statements):
+    client.get('/api/cars?category=SUV&min_price=100')
+    statements.reset()
+    assert client.get('/api/cars?min_price=100&location=&category=SUV').status_code == 200
+    assert statements.count == 0
+
+
+def test_writes_invalidate_cached_listings(client, cached):
+    owner = make_user('owner@example.com')
+    etag = client.get('/api/cars').headers['ETag']
+
+    client.post('/api/cars', headers=auth_headers(owner), json={
+        'name': 'New Car', 'brand': 'Toyota', 'model_year': 2020, 'category': 'SUV',
+        'daily_rate': 5000, 'location': 'Garissa, Kenya'
+    })
+    response = client.get('/api/cars', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [car['name'] for car in response.get_json()['items']] == ['New Car']
+
+
+def test_bookings_invalidate_cached_availability(client, cached):
+    car, = make_cars(make_user('owner@example.com'), 1)
+    path = f'/api/cars/availability?month=2030-01&car_ids={car.id}'
+    free = client.get(path).get_json()['cars'][str(car.id)]
+
+    book(client, auth_headers(make_user('renter@example.com', 'renter')), car.id,
+         '2030-01-03T10:00:00', '2030-01-05T10:00:00')
+    assert client.get(path).get_json()['cars'][str(car.id)] != free
+
+
+def test_version_file_is_shared_between_caches(tmp_path):
+    # Two gunicorn workers: a write in one invalidates the other's entries
+    first = ResponseCache(ttl=3600, version_file=str(tmp_path / 'version'))
+    second = ResponseCache(ttl=3600, version_file=str(tmp_path / 'version'))
+    key = ResponseCache.make_key('/api/cars', MultiDict())
+    second.set(key, b'[]', second.version)
+    assert second.get(key) is not None
+
+    first.bump()
+    assert second.get(key) is None
+    assert first.version == second.version
+
+
+def test_version_without_a_file_is_per_process():
+    first, second = ResponseCache(ttl=3600), ResponseCache(ttl=3600)
+    first.bump()
+    assert (first.version, second.version) == (1, 0)
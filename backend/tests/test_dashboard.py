@@ -0,0 +1,37 @@
+from conftest import make_user, make_cars, auth_headers
+from models import db, EarningsRollup
+from test_bookings import book, set_status
+
+
+def monthly_earnings(client, headers):
+    return client.get('/api/dashboard/owner/stats', headers=headers).get_json()['monthly_earnings']
+
+
+def test_owner_earnings_follow_bookings_and_cancellations(client):
+    owner = make_user('owner@example.com')
+    first, second = make_cars(owner, 2)
+    owner_headers, renter_headers = auth_headers(owner), auth_headers(make_user('renter@example.com', 'renter'))
+
+    kept = book(client, renter_headers, first.id, '2030-01-01T10:00:00', '2030-01-03T10:00:00').get_json()['booking']
+    cancelled = book(client, renter_headers, second.id, '2030-02-01T10:00:00', '2030-02-04T10:00:00').get_json()['booking']
+    assert monthly_earnings(client, owner_headers) == kept['total_amount'] + cancelled['total_amount']
+
+    assert set_status(client, owner_headers, cancelled['id'], 'Cancelled').status_code == 200
+    assert monthly_earnings(client, owner_headers) == kept['total_amount']
+
+    assert set_status(client, owner_headers, cancelled['id'], 'Confirmed').status_code == 200
+    assert monthly_earnings(client, owner_headers) == kept['total_amount'] + cancelled['total_amount']
+
+
+def test_rebuild_recomputes_rollups_from_history(app, client):
+    owner = make_user('owner@example.com')
+    car, = make_cars(owner, 1)
+    booking = book(client, auth_headers(make_user('renter@example.com', 'renter')), car.id,
+                   '2030-01-01T10:00:00', '2030-01-03T10:00:00').get_json()['booking']
+    EarningsRollup.query.delete()
+    db.session.commit()
+    assert monthly_earnings(client, auth_headers(owner)) == 0
+
+    result = app.test_cli_runner().invoke(args=['rebuild-earnings-rollups'])
+    assert 'Rebuilt 2 earnings rollup rows' in result.output
+    assert monthly_earnings(client, auth_headers(owner)) == booking['total_amount']
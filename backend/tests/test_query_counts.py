@@ -0,0 +1,25 @@
+import pytest
+
+from conftest import make_user, make_cars, auth_headers
+
+
+def statements_for(client, statements, path, headers=None):
+    statements.reset()
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return statements.count
+
+
+@pytest.mark.parametrize('path', ['/api/cars', '/api/cars?limit=100', '/api/owner/cars?limit=100'])
+def test_car_listing_queries_do_not_grow_with_fleet(client, statements, path):
+    owner = make_user('owner@example.com')
+    renter = make_user('renter@example.com', 'renter')
+    headers = auth_headers(owner)
+
+    make_cars(owner, 3, reviewer=renter)
+    small = statements_for(client, statements, path, headers)
+
+    make_cars(owner, 27, reviewer=renter)
+    large = statements_for(client, statements, path, headers)
+
+    assert small == large
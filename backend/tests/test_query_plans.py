@@ -0,0 +1,9 @@
+from query_plans import check_query_plans
+
+
+def test_hot_queries_use_an_index(app):
+    results = check_query_plans()
+    assert results, 'query plan checks only run against SQLite'
+
+    slow = {name: plan for name, plan, problems in results if problems}
+    assert not slow
@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import make_user, make_cars
+
+RANGE = {'pickup_date': '2030-01-01T10:00:00', 'return_date': '2030-01-04T10:00:00'}
+
+
+def test_quotes_for_given_cars(client):
+    owner = make_user('owner@example.com')
+    cars = make_cars(owner, 3)
+
+    response = client.post('/api/quotes', json={**RANGE, 'car_ids': [cars[0].id, cars[2].id]})
+
+    assert response.status_code == 200
+    quote, = response.get_json()['quotes']
+    assert quote['days'] == 3
+    assert [item['car_id'] for item in quote['items']] == [cars[0].id, cars[2].id]
+
+
+@pytest.mark.parametrize('car_ids', [['a'], [1, '2'], [1.5], [True], [None], 'abc'])
+def test_quotes_reject_non_integer_car_ids(client, car_ids):
+    response = client.post('/api/quotes', json={**RANGE, 'car_ids': car_ids})
+    assert response.status_code == 400
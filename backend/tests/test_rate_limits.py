@@ -0,0 +1,28 @@
+import pytest
+
+from app import app as flask_app, rate_limiter
+from ratelimit import MemoryStore
+
+
+@pytest.fixture
+def limited(client):
+    rate_limiter.enabled, rate_limiter.store = True, MemoryStore()
+    yield client
+    rate_limiter.enabled = flask_app.config['RATE_LIMIT_ENABLED']
+
+
+def login_statuses(client, count, forwarded_for):
+    return [client.post('/api/auth/login', json={}, headers={'X-Forwarded-For': forwarded_for}).status_code
+            for _ in range(count)]
+
+
+def test_login_limit_keys_on_forwarded_client_address(limited):
+    # PROXY_FIX_X_FOR=1 (conftest): one trusted proxy in front of the app
+    assert login_statuses(limited, 11, '203.0.113.7')[-1] == 429
+    assert login_statuses(limited, 1, '203.0.113.8') == [400]
+
+
+def test_login_limit_ignores_spoofed_hops(limited):
+    # Only the address the trusted proxy appended counts, not what the client sent
+    login_statuses(limited, 10, '198.51.100.1, 203.0.113.9')
+    assert login_statuses(limited, 1, '198.51.100.2, 203.0.113.9') == [429]
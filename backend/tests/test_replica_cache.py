@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+# The replica bind is set up when app.py is imported, so the scenario runs in
+# a fresh interpreter with REPLICA_DATABASE_URL set
+SCENARIO = '''
+import json
+from app import app, db
+from models import Car
+from replica import sync_replica, REPLICA_BIND
+
+with app.app_context():
+    db.create_all()
+writer, reader = app.test_client(), app.test_client()
+token = writer.post('/api/auth/signup', json={
+    'full_name': 'Owner', 'email': 'owner@example.com', 'phone': '0700000000',
+    'password': 'password123', 'user_type': 'owner'
+}).get_json()['access_token']
+with app.app_context():
+    sync_replica(db.engine, db.engines[REPLICA_BIND])
+
+# The writer adds a car; the replica hasn't caught up when the reader's
+# request refills the catalogue cache from it
+writer.post('/api/cars', headers={'Authorization': f'Bearer {token}'}, json={
+    'name': 'New Car', 'brand': 'Toyota', 'model_year': 2020, 'category': 'SUV',
+    'daily_rate': 5000, 'location': 'Garissa, Kenya'
+})
+reader_names = [car['name'] for car in reader.get('/api/cars').get_json()['items']]
+writer_names = [car['name'] for car in writer.get('/api/cars').get_json()['items']]
+print(json.dumps({'reader': reader_names, 'writer': writer_names}))
+'''
+
+
+def test_writer_does_not_read_a_replica_filled_cache_entry(tmp_path):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'primary.db'}",
+        REPLICA_DATABASE_URL=f"sqlite:///{tmp_path / 'replica.db'}",
+        CATALOGUE_CACHE_SIZE='100',
+        RATE_LIMIT_ENABLED='false',
+        PASSWORD_HASH_ALGORITHM='pbkdf2',
+        PASSWORD_HASH_COST='1000',
+    )
+    result = subprocess.run([sys.executable, '-c', SCENARIO], cwd=backend, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+    seen = json.loads(result.stdout.strip().splitlines()[-1])
+    assert seen['reader'] == []
+    assert seen['writer'] == ['New Car']
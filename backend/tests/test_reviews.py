@@ -0,0 +1,47 @@
+from conftest import make_user, make_cars, auth_headers
+from models import db, Review
+
+
+def review(client, headers, car_id, rating):
+    return client.post('/api/reviews', headers=headers, json={'car_id': car_id, 'rating': rating, 'comment': 'ok'})
+
+
+def rating_fields(client, car_id):
+    car = client.get(f'/api/cars/{car_id}?fields=rating,rating_count,rating_histogram').get_json()
+    return car['rating'], car['rating_count'], car['rating_histogram']
+
+
+def test_reviews_update_rating_aggregates(client):
+    car, = make_cars(make_user('owner@example.com'), 1)
+    headers = auth_headers(make_user('renter@example.com', 'renter'))
+
+    for rating in (5, 4, 2):
+        assert review(client, headers, car.id, rating).status_code == 201
+    assert rating_fields(client, car.id) == (3.7, 3, {'1': 0, '2': 1, '3': 0, '4': 1, '5': 1})
+
+
+def test_review_cost_does_not_grow_with_existing_reviews(client, statements):
+    renter = make_user('renter@example.com', 'renter')
+    few, many = make_cars(make_user('owner@example.com'), 2)
+    db.session.add_all([Review(user_id=renter.id, car_id=many.id, rating=3) for _ in range(50)])
+    db.session.commit()
+    headers = auth_headers(renter)
+
+    counts = []
+    for car in (few, many):
+        statements.reset()
+        assert review(client, headers, car.id, 4).status_code == 201
+        counts.append(statements.count)
+    assert counts[0] == counts[1]
+
+
+def test_backfill_recomputes_aggregates(app, client):
+    renter = make_user('renter@example.com', 'renter')
+    car, = make_cars(make_user('owner@example.com'), 1, reviewer=renter)
+    db.session.add(Review(user_id=renter.id, car_id=car.id, rating=1))
+    db.session.commit()
+    assert rating_fields(client, car.id)[1] == 0
+
+    result = app.test_cli_runner().invoke(args=['backfill-ratings'])
+    assert 'for 1 cars' in result.output
+    assert rating_fields(client, car.id) == (2.5, 2, {'1': 1, '2': 0, '3': 0, '4': 1, '5': 0})
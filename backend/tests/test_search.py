@@ -0,0 +1,61 @@
+import pytest
+
+import search
+from conftest import make_user, make_cars, auth_headers
+from models import db, Car, CarFeature
+
+
+@pytest.fixture
+def fleet(app):
+    owner = make_user('owner@example.com')
+    cars = [Car(owner_id=owner.id, name=name, brand=brand, model_year=2020, category='SUV', daily_rate=5000,
+                location='Garissa, Kenya', status='Available', description=description)
+            for name, brand, description in [
+                ('Land Cruiser', 'Toyota', 'Seven seats'),
+                ('Corolla', 'Toyota', 'Has a sunroof'),
+                ('C-Class', 'Mercedes', 'Toyota-level reliability'),
+            ]]
+    db.session.add_all(cars)
+    db.session.flush()
+    db.session.add(CarFeature(car_id=cars[2].id, feature='Leather'))
+    db.session.commit()
+    return owner, cars
+
+
+def search_names(client, q):
+    response = client.get(f'/api/cars/search?q={q}')
+    assert response.status_code == 200
+    return [car['name'] for car in response.get_json()['items']]
+
+
+def test_search_ranks_name_and_brand_matches_first(client, fleet):
+    names = search_names(client, 'toyota')
+    assert set(names[:2]) == {'Land Cruiser', 'Corolla'}
+    assert names[2] == 'C-Class'
+
+
+def test_search_matches_prefixes_descriptions_and_features(client, fleet):
+    assert search_names(client, 'cruis') == ['Land Cruiser']
+    assert search_names(client, 'sunroof') == ['Corolla']
+    assert search_names(client, 'leath merc') == ['C-Class']
+    assert search_names(client, 'leath toyota') == ['C-Class']
+
+
+def test_search_index_follows_car_updates(client, fleet):
+    owner, cars = fleet
+    response = client.put(f'/api/cars/{cars[1].id}', headers=auth_headers(owner), json={'description': 'Hatchback'})
+    assert response.status_code == 200
+    assert search_names(client, 'sunroof') == []
+    assert search_names(client, 'hatch') == ['Corolla']
+
+
+def test_search_requires_a_query(client):
+    assert client.get('/api/cars/search?q=%20').status_code == 400
+
+
+def test_search_fallback_without_fts(client, fleet, monkeypatch):
+    # Other databases filter with LIKE on every searchable field
+    monkeypatch.setattr(search, 'uses_fts', lambda bind: False)
+    assert search_names(client, 'sunroof') == ['Corolla']
+    assert sorted(search_names(client, 'leath')) == ['C-Class']
+    assert sorted(search_names(client, 'toyota')) == ['C-Class', 'Corolla', 'Land Cruiser']
@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import make_user, make_cars, auth_headers
+from test_bookings import book
+
+
+@pytest.fixture
+def catalogue(client):
+    owner = make_user('owner@example.com')
+    renter = make_user('renter@example.com', 'renter')
+    car, = make_cars(owner, 1, reviewer=renter)
+    return owner, renter, car
+
+
+def test_sparse_fields(client, catalogue):
+    item, = client.get('/api/cars?fields=id,name,daily_rate').get_json()['items']
+    assert set(item) == {'id', 'name', 'daily_rate'}
+
+
+def test_expand_with_nested_fields(client, catalogue):
+    owner, _, _ = catalogue
+    item, = client.get('/api/cars?fields=id,owner.full_name').get_json()['items']
+    assert item == {'id': item['id'], 'owner': {'full_name': owner.full_name}}
+
+
+@pytest.mark.parametrize('query', ['fields=id,colour', 'expand=bookings', 'fields=id,owner.nickname'])
+def test_unknown_fields_and_relations_are_rejected(client, catalogue, query):
+    response = client.get(f'/api/cars?{query}')
+    assert response.status_code == 400
+
+
+def test_expanded_car_owner_is_redacted(client, catalogue):
+    item, = client.get('/api/cars?expand=owner').get_json()['items']
+    assert set(item['owner']) == {'id', 'full_name', 'profile_picture'}
+
+    for query in ('fields=id,owner.email,owner.phone', 'expand=owner.email'):
+        assert client.get(f'/api/cars?{query}').status_code == 400
+
+
+def test_expanded_reviewer_is_redacted(client, catalogue):
+    _, renter, car = catalogue
+    review, = client.get(f'/api/cars/{car.id}/reviews?expand=user').get_json()['items']
+    assert review['user'] == {'id': renter.id, 'full_name': renter.full_name, 'profile_picture': None}
+
+    assert client.get(f'/api/cars/{car.id}/reviews?fields=id,user.email').status_code == 400
+    assert client.get(f'/api/cars/{car.id}/reviews?expand=car.owner.phone').status_code == 400
+
+
+def test_owner_still_sees_renter_contact_on_bookings(client, catalogue):
+    owner, renter, car = catalogue
+    book(client, auth_headers(renter), car.id, '2030-01-01T10:00:00', '2030-01-03T10:00:00')
+
+    booking, = client.get('/api/bookings/owner', headers=auth_headers(owner)).get_json()['items']
+    assert booking['user']['email'] == renter.email
+    assert 'email' not in client.get('/api/bookings/owner?expand=car.owner',
+                                     headers=auth_headers(owner)).get_json()['items'][0]['car']['owner']
@@ -1,11 +1,14 @@
 import axios from 'axios';
 
-// Create axios instance with base configuration
+// Create axios instance with base configuration. The API is on another
+// origin, so send cookies: the read-replica cookie keeps a client reading
+// from the primary right after its own writes.
 const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL || 'http://localhost:5000/api',
   headers: {
     'Content-Type': 'application/json',
   },
+  withCredentials: true,
 });
 
 // Request interceptor to add auth token
@@ -79,6 +82,9 @@ export const authAPI = {
   },
 };
 
+// List helpers return one page, { items, next_cursor }: pass next_cursor back
+// as params.cursor for the next page (it is null on the last one).
+
 // ===================== CAR API =====================
 
 export const carAPI = {
@@ -102,13 +108,13 @@ export const carAPI = {
     return response.data;
   },
 
-  getOwnerCars: async () => {
-    const response = await api.get('/owner/cars');
+  getOwnerCars: async (params = {}) => {
+    const response = await api.get('/owner/cars', { params });
     return response.data;
   },
 
-  getReviews: async (carId) => {
-    const response = await api.get(`/cars/${carId}/reviews`);
+  getReviews: async (carId, params = {}) => {
+    const response = await api.get(`/cars/${carId}/reviews`, { params });
     return response.data;
   },
 };
@@ -121,13 +127,13 @@ export const bookingAPI = {
     return response.data;
   },
 
-  getUserBookings: async () => {
-    const response = await api.get('/bookings/user');
+  getUserBookings: async (params = {}) => {
+    const response = await api.get('/bookings/user', { params });
     return response.data;
   },
 
-  getOwnerBookings: async () => {
-    const response = await api.get('/bookings/owner');
+  getOwnerBookings: async (params = {}) => {
+    const response = await api.get('/bookings/owner', { params });
     return response.data;
   },
 
@@ -154,8 +160,8 @@ export const favoriteAPI = {
     return response.data;
   },
 
-  getAll: async () => {
-    const response = await api.get('/favorites');
+  getAll: async (params = {}) => {
+    const response = await api.get('/favorites', { params });
     return response.data;
   },
 
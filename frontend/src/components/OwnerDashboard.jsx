@@ -21,7 +21,9 @@ const OwnerDashboard = () => {
     avg_rating: 0
   });
   const [cars, setCars] = useState([]);
+  const [carsCursor, setCarsCursor] = useState(null);
   const [bookings, setBookings] = useState([]);
+  const [bookingsCursor, setBookingsCursor] = useState(null);
 
   useEffect(() => {
     loadOwnerData();
@@ -68,13 +70,15 @@ const OwnerDashboard = () => {
       const statsData = await dashboardAPI.getOwnerStats();
       setStats(statsData);
 
-      // Load owner's cars
-      const carsData = await carAPI.getOwnerCars();
-      setCars(carsData);
+      // Load the first page of the owner's cars
+      const carsPage = await carAPI.getOwnerCars();
+      setCars(carsPage.items);
+      setCarsCursor(carsPage.next_cursor);
 
-      // Load owner's bookings
-      const bookingsData = await bookingAPI.getOwnerBookings();
-      setBookings(bookingsData);
+      // Load the first page of the owner's bookings
+      const bookingsPage = await bookingAPI.getOwnerBookings();
+      setBookings(bookingsPage.items);
+      setBookingsCursor(bookingsPage.next_cursor);
 
       setLoading(false);
     } catch (error) {
@@ -86,6 +90,26 @@ const OwnerDashboard = () => {
     }
   };
 
+  const loadMoreCars = async () => {
+    try {
+      const carsPage = await carAPI.getOwnerCars({ cursor: carsCursor });
+      setCars((current) => [...current, ...carsPage.items]);
+      setCarsCursor(carsPage.next_cursor);
+    } catch (error) {
+      console.error('Error loading more cars:', error);
+    }
+  };
+
+  const loadMoreBookings = async () => {
+    try {
+      const bookingsPage = await bookingAPI.getOwnerBookings({ cursor: bookingsCursor });
+      setBookings((current) => [...current, ...bookingsPage.items]);
+      setBookingsCursor(bookingsPage.next_cursor);
+    } catch (error) {
+      console.error('Error loading more bookings:', error);
+    }
+  };
+
   const formatDate = (dateString) => {
     const date = new Date(dateString);
     return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric', year: 'numeric' });
@@ -352,6 +376,16 @@ const OwnerDashboard = () => {
                       ))}
                     </div>
                   )}
+                  {carsCursor && (
+                    <div className="text-center mt-6">
+                      <button
+                        onClick={loadMoreCars}
+                        className="px-6 py-2 bg-slate-100 hover:bg-slate-200 text-slate-700 font-bold rounded-lg transition-all"
+                      >
+                        Load More
+                      </button>
+                    </div>
+                  )}
                 </div>
               </div>
             )}
@@ -482,6 +516,16 @@ const OwnerDashboard = () => {
                       ))}
                     </div>
                   )}
+                  {bookingsCursor && (
+                    <div className="text-center mt-6">
+                      <button
+                        onClick={loadMoreBookings}
+                        className="px-6 py-2 bg-slate-100 hover:bg-slate-200 text-slate-700 font-bold rounded-lg transition-all"
+                      >
+                        Load More
+                      </button>
+                    </div>
+                  )}
                 </div>
               </div>
             )}
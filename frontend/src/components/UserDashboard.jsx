@@ -20,7 +20,9 @@ const UserDashboard = () => {
     loyalty_points: 0
   });
   const [bookings, setBookings] = useState([]);
+  const [bookingsCursor, setBookingsCursor] = useState(null);
   const [favorites, setFavorites] = useState([]);
+  const [favoritesCursor, setFavoritesCursor] = useState(null);
   const [paymentMethods, setPaymentMethods] = useState([]);
 
   useEffect(() => {
@@ -63,15 +65,17 @@ const UserDashboard = () => {
       console.log('User stats:', statsData);
       setStats(statsData);
 
-      // Load bookings
-      const bookingsData = await bookingAPI.getUserBookings();
-      console.log('User bookings:', bookingsData);
-      setBookings(bookingsData);
+      // Load the first page of bookings
+      const bookingsPage = await bookingAPI.getUserBookings();
+      console.log('User bookings:', bookingsPage.items);
+      setBookings(bookingsPage.items);
+      setBookingsCursor(bookingsPage.next_cursor);
 
-      // Load favorites
-      const favoritesData = await favoriteAPI.getAll();
-      console.log('User favorites:', favoritesData);
-      setFavorites(favoritesData);
+      // Load the first page of favorites
+      const favoritesPage = await favoriteAPI.getAll();
+      console.log('User favorites:', favoritesPage.items);
+      setFavorites(favoritesPage.items);
+      setFavoritesCursor(favoritesPage.next_cursor);
 
       // Load payment methods
       const paymentsData = await paymentAPI.getMethods();
@@ -92,14 +96,35 @@ const UserDashboard = () => {
   const handleRemoveFavorite = async (carId) => {
     try {
       await favoriteAPI.remove(carId);
-      // Reload favorites
-      const favoritesData = await favoriteAPI.getAll();
-      setFavorites(favoritesData);
+      // Reload favorites from the first page
+      const favoritesPage = await favoriteAPI.getAll();
+      setFavorites(favoritesPage.items);
+      setFavoritesCursor(favoritesPage.next_cursor);
     } catch (error) {
       console.error('Error removing favorite:', error);
     }
   };
 
+  const loadMoreBookings = async () => {
+    try {
+      const bookingsPage = await bookingAPI.getUserBookings({ cursor: bookingsCursor });
+      setBookings((current) => [...current, ...bookingsPage.items]);
+      setBookingsCursor(bookingsPage.next_cursor);
+    } catch (error) {
+      console.error('Error loading more bookings:', error);
+    }
+  };
+
+  const loadMoreFavorites = async () => {
+    try {
+      const favoritesPage = await favoriteAPI.getAll({ cursor: favoritesCursor });
+      setFavorites((current) => [...current, ...favoritesPage.items]);
+      setFavoritesCursor(favoritesPage.next_cursor);
+    } catch (error) {
+      console.error('Error loading more favorites:', error);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen bg-gradient-to-br from-slate-50 to-slate-100 flex items-center justify-center">
@@ -329,6 +354,16 @@ const UserDashboard = () => {
                       ))}
                     </div>
                   )}
+                  {bookingsCursor && (
+                    <div className="text-center mt-6">
+                      <button
+                        onClick={loadMoreBookings}
+                        className="px-6 py-2 bg-slate-100 hover:bg-slate-200 text-slate-700 font-bold rounded-lg transition-all"
+                      >
+                        Load More
+                      </button>
+                    </div>
+                  )}
                 </div>
               </div>
             )}
@@ -387,6 +422,16 @@ const UserDashboard = () => {
                       ))}
                     </div>
                   )}
+                  {favoritesCursor && (
+                    <div className="text-center mt-6">
+                      <button
+                        onClick={loadMoreFavorites}
+                        className="px-6 py-2 bg-slate-100 hover:bg-slate-200 text-slate-700 font-bold rounded-lg transition-all"
+                      >
+                        Load More
+                      </button>
+                    </div>
+                  )}
                 </div>
               </div>
             )}